@@ -5,6 +5,7 @@ date range and insert the data into the bars_minute PostgreSQL table in RDS.
 
 Usage:
 $ python load-bars-minute.py -t/--ticker INTC -s/--start 20220314 -e/--end 20220420
+$ python load-bars-minute.py -t INTC,NVDA -s 20220101 -e 20221231 -b/--backfill [-w/--workers 4] [-c/--checkpoint bars-minute.checkpoint]
 
 Required Environment Variables:
 ALPACA_API_KEY_ID, ALPACA_SECRET_KEY, PG_HOST, PG_PORT, PG_DB_NAME, 
@@ -14,11 +15,19 @@ Details:
 Each weekday bars will be collected from 8:00AM to 6:00PM EST, except on 
 holidays where no bars will be collected, and early-close holidays where bars 
 will be collected from 8:00AM to 1:00PM EST.
+
+Rows are bulk loaded with COPY into a staging table and merged into 
+bars_minute with ON CONFLICT (symbol, timestamp), so re-running a date range 
+updates existing rows instead of duplicating them.
+
+In backfill mode the date range is split into per-ticker chunks which are 
+fetched concurrently by a bounded, rate-limited worker pool. Every committed 
+(ticker, day) is appended to the checkpoint file, so re-running the same 
+command after a killed run only loads the days that were never committed.
 '''
 
 import argparse
 import datetime
-import json
 import os
 import sys
 
@@ -28,6 +37,10 @@ from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from sqlalchemy import create_engine, sql
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import backfill, bulk_load, trading_calendar
+
 def main() -> int:
     #--------------------------------------------------------------------------
     # Collect arguments
@@ -42,12 +55,16 @@ def main() -> int:
     parser.add_argument('-t', '--tickers', dest='tickers', action='store', required=True, help='Comma separated list of ticker symbol(s) (e.g. INTC,NVDA,WM)')
     parser.add_argument('-s', '--start', dest='start', action='store', required=True, help='Start date in YYYYMMDD format (inclusive).')
     parser.add_argument('-e', '--end', dest='end', action='store', required=True, help='End date in YYYYMMDD format (inclusive).')
+    parser.add_argument('-b', '--backfill', dest='backfill', action='store_true', help='Fetch chunks concurrently and checkpoint committed days so the run can be resumed.')
+    parser.add_argument('-w', '--workers', dest='workers', action='store', type=int, default=backfill.DEFAULT_WORKERS, help='Number of concurrent fetch workers in backfill mode.')
+    parser.add_argument('-c', '--checkpoint', dest='checkpoint', action='store', default='bars-minute.checkpoint', help='Checkpoint file of committed (ticker, day) pairs in backfill mode.')
+    parser.add_argument('--chunk-days', dest='chunk_days', action='store', type=int, default=backfill.DEFAULT_CHUNK_DAYS, help='Trading days per request in backfill mode.')
+    parser.add_argument('--rate', dest='rate', action='store', type=int, default=backfill.DEFAULT_REQUESTS_PER_MINUTE, help='Maximum Alpaca requests per minute in backfill mode.')
 
     args = parser.parse_args()
 
     tickers = args.tickers.split(",")
     start = YYYYMMDDtoDate(args.start)
-    current = start
     end = YYYYMMDDtoDate(args.end)
 
     #--------------------------------------------------------------------------
@@ -77,8 +94,8 @@ def main() -> int:
         print('[ INFO ] Exiting with code -1.')
         return -1
 
-    # load holidays from properties
-    holidays = loadHolidays('../properties/market-holidays.json')
+    # load the precomputed trading calendar from properties
+    calendar = trading_calendar.load_calendar()
 
     # hard-code table name
     PG_TABLE = 'bars_minute'
@@ -95,28 +112,36 @@ def main() -> int:
     db = create_engine(conn_string)
     conn = db.connect()
 
+    # upserts need a unique (symbol, timestamp) index
+    bulk_load.ensure_unique_index(conn, PG_TABLE)
+    writer = bulk_load.BulkWriter(conn, PG_TABLE)
+
+    #------------------------------------------------------------------------------
+    # Collect trading day windows
+    #------------------------------------------------------------------------------
+
+    # holidays are skipped, early closes are collected until 1:00PM EST
+    windows = [getWindow(session) for session in calendar.sessions_between(start, end)]
+
+    #------------------------------------------------------------------------------
+    # Backfill mode
+    #------------------------------------------------------------------------------
+
+    if args.backfill:
+        # each chunk is upserted and committed before it is checkpointed
+        checkpoint = backfill.Checkpoint(args.checkpoint)
+        rows = backfill.run_backfill(stock_client, tickers, windows, writer.write, checkpoint, max_workers=args.workers, requests_per_minute=args.rate, chunk_days=args.chunk_days)
+        print(f'[ INFO ] Backfill loaded {rows} rows.')
+
     #------------------------------------------------------------------------------
     # Data loading loop
     #------------------------------------------------------------------------------
 
-    # loop from start to end dates one day at a time
-    delta = datetime.timedelta(days=1)
-    while current <= end:
-        # skip weekends
-        if isWeekend(current):
-            current += delta
-            continue
-
-        # skip holidays
-        if isHoliday(current, holidays):
-            current += delta
-            continue
-
-        # pull minute bars for tickers from 8:00AM to 6:00PM EST
-        start_dt = getUTCfromEST(datetime.datetime(current.year, current.month, current.day, 8, 00, tzinfo=datetime.timezone.utc))
-        end_dt = getUTCfromEST(datetime.datetime(current.year, current.month, current.day, 18, 00, tzinfo=datetime.timezone.utc))
-        print(f'[ INFO ] Fetching minute bars for {tickers} from 08:00 to 18:00 EST on {current}')
-        request_params = StockBarsRequest(symbol_or_symbols=tickers, timeframe=TimeFrame.Minute, start=start_dt, end=end_dt)
+    # loop over trading days one day at a time
+    for window in ([] if args.backfill else windows):
+        # pull minute bars for tickers from 8:00AM to 6:00PM EST (1:00PM on early closes)
+        print(f'[ INFO ] Fetching minute bars for {tickers} from {window.start} to {window.end} on {window.day}')
+        request_params = StockBarsRequest(symbol_or_symbols=tickers, timeframe=TimeFrame.Minute, start=window.start, end=window.end)
         stock_bars_minute = stock_client.get_stock_bars(request_params)
 
         # convert alpaca data to DataFrame and fix columns to match db
@@ -125,17 +150,15 @@ def main() -> int:
         stock_bars_minute_df.drop('trade_count', axis=1, inplace=True)
         stock_bars_minute_df.drop('vwap', axis=1, inplace=True)
 
-        # insert rows and commit
-        stock_bars_minute_df.to_sql(name=PG_TABLE, con=conn, if_exists='append', index=False)
-        conn.commit()
-
-        # go to next day
-        current += delta
+        # upsert rows and commit
+        writer.write(stock_bars_minute_df)
     
     #--------------------------------------------------------------------------
     # Close connections
     #--------------------------------------------------------------------------
 
+    print(f'[ INFO ] Loaded {writer.rows} rows at {writer.rows_per_second():,.0f} rows/sec.')
+
     # rollback any uncommited transactions
     conn.rollback()
 
@@ -159,63 +182,15 @@ def YYYYMMDDtoDate(input: str) -> datetime.date:
     day = int(input[6:8])
     return datetime.date(year, month, day)
 
-def isWeekend(date: datetime.date) -> bool:
-    return date.weekday() >= 5
-
-def isHoliday(date: datetime.date, holidays: dict[str, list]) -> bool:
-    for holiday in holidays[str(date.year)]:
-        if date.month == holiday['month'] and date.day == holiday['day']:
-            return True
-
-    return False
-
-def loadHolidays(path: str) -> dict:
-    # open market-holidays.json file
-    file = open(path)
-
-    # read json into dictionary
-    holidays = json.load(file)
-
-    return holidays
-
-def getUTCfromEST(estDatetime: datetime.datetime) -> datetime.datetime:
-    if isDST(datetime.date(estDatetime.year, estDatetime.month, estDatetime.day)):
-        return estDatetime.astimezone(datetime.timezone.utc) + datetime.timedelta(hours=4)
-    else:
-        return estDatetime.astimezone(datetime.timezone.utc) + datetime.timedelta(hours=5)
-    
-'''
-During DST, clocks are moved forward 1 hr (e.g. 13:00 —> 14:00).
-DST begins at 02:00 on the second Sunday of March.
-DST ends at 02:00 on the first Sunday of November.
-'''
-def isDST(date: datetime.date) -> bool:
-    if date.month < 3 or date.month > 11:
-        return False
-    elif date.month > 3 and date.month < 11:
-        return True
-    elif date.month == 3:
-        return date.day >= getDayOfSecondSundayOfMarch(date.year)
-    else: # date.month == 11
-        return date.day < getDayOfFirstSundayOfNovember(date.year)
-
-def getDayOfSecondSundayOfMarch(year: int) -> int:
-    return getDayOfOrdinalWeekdayOfMonthOfYear(2, 6, 3, year)
-
-def getDayOfFirstSundayOfNovember(year: int) -> int:
-    return getDayOfOrdinalWeekdayOfMonthOfYear(1, 6, 11, year)
-
 '''
-ordinal (int: first -> 1 ... fourth -> 4)
-weekday (int: Monday -> 0 ... Sunday -> 6)
-month (int: January -> 1 ... December -> 12)
+Returns the UTC window bars are collected in on a trading session: 8:00AM to 
+6:00PM EST, or 8:00AM to 1:00PM EST on early-close days.
 '''
-def getDayOfOrdinalWeekdayOfMonthOfYear(ordinal: int, weekday: int, month: int, year: int) -> int:
-    first = datetime.date(year, month, 1)
-    firstDayOfWeek = first.weekday()
-    firstWeekday = weekday - firstDayOfWeek + 1
-    ordinalWeekday = firstWeekday + (7 * (ordinal - 1))
-    return ordinalWeekday
+def getWindow(session: trading_calendar.Session) -> backfill.Window:
+    end_time = datetime.time(13, 00) if session.early_close else datetime.time(18, 00)
+    start_dt = trading_calendar.to_utc(session.date, datetime.time(8, 00))
+    end_dt = trading_calendar.to_utc(session.date, end_time)
+    return backfill.Window(session.date, start_dt, end_dt)
 
 if __name__ == '__main__':
     sys.exit(main())
@@ -0,0 +1,117 @@
+'''
+Description:
+This script backtests the gap-day strategy of gap-day-trader.py over historical
+minute bars and prints its trades' P&L per ticker and month.
+
+Usage:
+$ python backtest-gap-day.py [-t/--tickers AAPL,NVDA] [-s/--start 20230101] [-e/--end 20230731] [--source files|db] [-o/--output trades.csv]
+
+Required Environment Variables (--source db only):
+PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, PG_PASSWORD
+
+Details:
+With --source files (the default) the data/tickers minute files are replayed,
+with --source db the bars_minute table is streamed in chunks. No Alpaca calls
+are made. Gap orders are filled by a simulated limit-order fill model and
+positions are closed at the last bar of the session (or at --stop-loss).
+'''
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import gap_backtest
+from dogtrader.tickers_manifest import TickersManifest
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'backtest-gap-day.py',
+        description = 'This script backtests the gap-day strategy over historical minute bars.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    defaults = gap_backtest.GapParams()
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-s', '--start', dest='start', action='store', default=None, help='First date in YYYYMMDD format.')
+    parser.add_argument('-e', '--end', dest='end', action='store', default=None, help='Last date in YYYYMMDD format.')
+    parser.add_argument('--source', dest='source', action='store', choices=['files', 'db'], default='files', help='Replay data/tickers files or the bars_minute table.')
+    parser.add_argument('--gap-up', dest='gap_up', action='store', type=float, default=defaults.gap_up, help='Minimum gap above the previous high to sell (fraction).')
+    parser.add_argument('--gap-down', dest='gap_down', action='store', type=float, default=defaults.gap_down, help='Minimum gap below the previous low to buy (fraction).')
+    parser.add_argument('--offset', dest='offset', action='store', type=float, default=defaults.limit_offset, help='Limit price offset from the previous high/low in dollars.')
+    parser.add_argument('--qty', dest='qty', action='store', type=int, default=defaults.qty, help='Shares per order.')
+    parser.add_argument('--stop-loss', dest='stop_loss', action='store', type=float, default=None, help='Stop loss as a fraction of the entry price (default: hold until the close).')
+    parser.add_argument('--fill-on-touch', dest='fill_on_touch', action='store_true', help='Fill limit orders when a bar touches the limit price.')
+    parser.add_argument('-o', '--output', dest='output', action='store', default=None, help='Write the trades to this CSV file.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    start = datetime.datetime.strptime(args.start, '%Y%m%d').date() if args.start else None
+    end = datetime.datetime.strptime(args.end, '%Y%m%d').date() if args.end else None
+    params = gap_backtest.GapParams(args.gap_up, args.gap_down, args.offset, args.qty, defaults.cancel_minute, args.stop_loss)
+
+    #--------------------------------------------------------------------------
+    # Select data source
+    #--------------------------------------------------------------------------
+
+    conn = None
+    if args.source == 'db':
+        # get postgres environment variables
+        PG_HOST = os.getenv('PG_HOST')
+        PG_PORT = os.getenv('PG_PORT')
+        PG_DB_NAME = os.getenv('PG_DB_NAME')
+        PG_USERNAME = os.getenv('PG_USERNAME')
+        PG_PASSWORD = os.getenv('PG_PASSWORD')
+
+        # check for missing environment variables
+        if PG_HOST == None or PG_PORT == None or PG_DB_NAME == None or PG_USERNAME == None or PG_PASSWORD == None:
+            print('[ ERROR ] Environment variables PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, or PG_PASSWORD not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        conn_string = "postgresql://{}:{}@{}:{}/{}".format(PG_USERNAME, PG_PASSWORD, PG_HOST, PG_PORT, PG_DB_NAME)
+        conn = create_engine(conn_string).connect()
+        days = gap_backtest.db_days(conn, tickers, start, end)
+    else:
+        # only new or changed day files are read to update the manifest
+        manifest = TickersManifest()
+        manifest.refresh(tickers)
+        days = gap_backtest.corpus_days(tickers, start, end, manifest=manifest)
+
+    #--------------------------------------------------------------------------
+    # Run backtest
+    #--------------------------------------------------------------------------
+
+    started = time.perf_counter()
+    trades = gap_backtest.run_backtest(days, params, fill_on_touch=args.fill_on_touch)
+    print(f'[ INFO ] Backtest finished with {len(trades)} trade(s) in {time.perf_counter() - started:.2f}s')
+
+    print(gap_backtest.summarize(trades).to_string(index=False))
+
+    if args.output:
+        trades.to_csv(args.output, index=False)
+        print(f'[ INFO ] Wrote trades to {args.output}')
+
+    if conn is not None:
+        conn.close()
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,8 +2,8 @@
 __author__ = "Ethan Chang", "Leo Battalora"
 __email__ = "ethanchang34@yahoo.com"
 
+import asyncio
 import datetime
-import time
 import os
 import sys
 
@@ -12,14 +12,16 @@ from alpaca.data.live.stock import StockDataStream
 from alpaca.trading.client import TradingClient
 from alpaca.trading.requests import LimitOrderRequest
 from alpaca.trading.enums import OrderSide, TimeInForce
+from alpaca.trading.stream import TradingStream
 
-all_gaps_checked = False
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import latency, order_manager, quote_dispatcher, rollups, trading_calendar
+from dogtrader.market_state import MarketStateReader
 
 def main():
     """Gap Day Trading Bot"""
-    # TODO: Loop over gap_orders array to cancel them at 10:00, 10:15, or 10:30
     # TODO: Profit-locking orders and stop losses
-    # TODO: Holiday edge cases on previous weekday function
     # TODO: Display trading results/graph
     # TODO: If generalizable, add scanner implementation to generate ticker list
     # TODO: Understand which market conditions this work for/stick to one market
@@ -28,6 +30,15 @@ def main():
     # Tickers: AAPL, SBUX, TSLA, NVDA, GOOG, GOOGL, MSFT, AMZN, META, JNJ, JPM, XOM, PG, COST, AMD
     tickers = ['AAPL', 'SBUX']
 
+    # Unfilled gap orders are canceled at 10:00, 10:15, or 10:30 (New York time)
+    cancel_time = order_manager.CANCEL_TIMES[-1]
+
+    # Set DOGTRADER_LATENCY=1 to time quote -> order ack (summary every minute, metrics on localhost:9464)
+    tracker = latency.LatencyTracker() if os.getenv('DOGTRADER_LATENCY') else None
+
+    # Set DOGTRADER_MARKET_STATE to the name of a running data/tools/market-data-service.py block to read its quotes instead of opening a stream
+    market_state_name = os.getenv('DOGTRADER_MARKET_STATE')
+
 
     # ------------------------------------------------------------------------------
     # Environment Setup
@@ -49,7 +60,9 @@ def main():
     # Create Alpaca clients
     stock_client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
     trading_client = TradingClient(API_KEY, SECRET_KEY, paper=True)
-    stock_stream = StockDataStream(API_KEY, SECRET_KEY)
+    stock_stream = StockDataStream(API_KEY, SECRET_KEY) if market_state_name is None else None
+    market_state = MarketStateReader(market_state_name) if market_state_name is not None else None
+    trading_stream = TradingStream(API_KEY, SECRET_KEY, paper=True)
     # Add this to StockDataStream params and test during trading hours to see if we can reduce the speed of each response
     # websocket_params={"ping_interval": 10, "ping_timeout": 180, "max_queue": 1024,} # No success in slowing responses
     
@@ -62,107 +75,106 @@ def main():
     #------------------------------------------------------------------------------
     # Get Previous Trading Day's High/Low
     #------------------------------------------------------------------------------
-    start_dt = get_last_weekday()
-    end_dt = start_dt + datetime.timedelta(days=1)
-    print("[ INFO ] Fetching previous day bar for", ", ".join(tickers))
-    request_params = StockBarsRequest(symbol_or_symbols=tickers, start=start_dt, end=end_dt, timeframe=TimeFrame.Day)
-    previous_day_bar = stock_client.get_stock_bars(request_params)
-    # print('Previous day bar:', previous_day_bar)
+    # Read from the daily rollups (data/tools/refresh-rollups.py); tickers without the previous session there are fetched from Alpaca
+    previous_day = rollups.RollupStore().previous_day(tickers, datetime.date.today())
+    previous_highs = previous_day['high'].to_dict()
+    previous_lows = previous_day['low'].to_dict()
+
+    missing = [ticker for ticker in tickers if ticker not in previous_highs]
+    if missing:
+        start_dt = get_previous_session_day()
+        end_dt = start_dt + datetime.timedelta(days=1)
+        print("[ INFO ] Fetching previous day bar for", ", ".join(missing))
+        request_params = StockBarsRequest(symbol_or_symbols=missing, start=start_dt, end=end_dt, timeframe=TimeFrame.Day)
+        previous_day_bar = stock_client.get_stock_bars(request_params)
+        # print('Previous day bar:', previous_day_bar)
+        for ticker in missing:
+            previous_highs[ticker] = previous_day_bar[ticker][0].high
+            previous_lows[ticker] = previous_day_bar[ticker][0].low
 
 
     #------------------------------------------------------------------------------
-    # Create Ticker Objects and Store in Dictionary
+    # Store Previous High/Low in the Gap Book
     #------------------------------------------------------------------------------
-    tickers_dict = {} # Dictionary with key as ticker symbol and value as the ticker object
-    for ticker in tickers:
-        previous_high = previous_day_bar[ticker][0].high
-        previous_low = previous_day_bar[ticker][0].low
-        ticker_obj = Tickers(ticker, previous_high, previous_low) # Store high/low values into ticker objects
-        tickers_dict[ticker_obj.symbol] = ticker_obj # Add ticker object to dictionary
-        # print(f'\033[1m---{ticker}---\033[0m\nPrevious day high: {previous_high} \nPrevious day low: {previous_low}')
-        
+    previous_highs = [previous_highs[ticker] for ticker in tickers]
+    previous_lows = [previous_lows[ticker] for ticker in tickers]
+    gap_book = quote_dispatcher.GapBook(tickers, previous_highs, previous_lows, gap_up=0.03, gap_down=0.02) # Only consider a 3% gap up or 2% gap down
+
 
     #------------------------------------------------------------------------------
     # Stream Real-Time Stock Market Data
     # Check for Gaps and Create Limit Orders
     #------------------------------------------------------------------------------
-    gap_orders = [] # The limit orders that get opened at 9:30 if there's a gap and used later to close any unfilled gap orders
-    # Async handler
-    async def quote_data_handler(data):
-        global all_gaps_checked
-        
-        # If all gaps are checked, there's no need to check each ticker again
-        if not all_gaps_checked:
-
-            # If the ticker has already been checked, we don't need to check it again
-            if not tickers_dict[data.symbol].gap_check:
-                market_price = data.ask_price # Assume market price is the ask price since that's what we'd buy at
-
-                if market_price > 1.03 * tickers_dict[data.symbol].high: # Only consider a 3% gap up
-
-                    tickers_dict[data.symbol].gap_up = True # [COULD BE REDUNDANT]
-
-                    # Request sell limit order
-                    order_data = LimitOrderRequest(symbol=data.symbol, limit_price=previous_high-0.02, qty=100, side=OrderSide.SELL, time_in_force=TimeInForce.DAY)
-                    limit_order = trading_client.submit_order(order_data=order_data)
-                    gap_orders.append(limit_order.id)
-
-                elif market_price < 0.98 * tickers_dict[data.symbol].low: # Only consider a 2% gap down
-
-                    tickers_dict[data.symbol].gap_down = True # [COULD BE REDUNDANT]
-
-                    # Request buy limit order
-                    order_data = LimitOrderRequest(symbol=data.symbol, limit_price=previous_low+0.02, qty=100, side=OrderSide.BUY, time_in_force=TimeInForce.DAY)
-                    limit_order = trading_client.submit_order(order_data=order_data)
-                    gap_orders.append(limit_order.id) # Store order_id to cancel the order if it's not filled
-                    
-                print(f'{data.symbol} is checked')
-                tickers_dict[data.symbol].gap_check = True
-            
-            # Check if all_gaps_checked should now be True
-            all_gaps_checked = True
-            for t_obj in tickers_dict.values():
-
-                # If a ticker's gap is not checked, then all_gaps_checked is False
-                if not t_obj.gap_check:
-                    print('Not all gaps checked')
-                    all_gaps_checked = False
-
-        # If all tickers are checked, we can close the real-time data stream       
+    # Orders are submitted from a queue so the handler never waits on the REST API, and canceled by a timer if unfilled
+    orders = order_manager.OrderManager(trading_client, tracker=tracker)
+    trading_stream.subscribe_trade_updates(orders.handle_trade_update)
+    cancel_at = orders.cancel_time(cancel_time)
+
+    # Called with each ticker whose first ask (assumed market price since that's what we'd buy at) gapped
+    def on_gap(symbol, side, market_price):
+        row = gap_book.index[symbol]
+        if side == quote_dispatcher.GAP_UP:
+            # Request sell limit order
+            order_data = LimitOrderRequest(symbol=symbol, limit_price=round(gap_book.prev_high[row]-0.02, 2), qty=100, side=OrderSide.SELL, time_in_force=TimeInForce.DAY)
         else:
-            print("Stock stream close")
-            stock_stream.close()
-
-
-        print(data) # Quote data
-    stock_stream.subscribe_quotes(quote_data_handler, 'AAPL', 'SBUX')
-    # stock_stream.subscribe_quotes(quote_data_handler, *tickers)
-    stock_stream.run()
+            # Request buy limit order
+            order_data = LimitOrderRequest(symbol=symbol, limit_price=round(gap_book.prev_low[row]+0.02, 2), qty=100, side=OrderSide.BUY, time_in_force=TimeInForce.DAY)
+        orders.submit(order_data, cancel_at=cancel_at) # Canceled at cancel_at if it's not filled
+        print(f'[ INFO ] {symbol} gapped {"up" if side == quote_dispatcher.GAP_UP else "down"} to {market_price}')
+
+    # If all tickers are checked, we can close the real-time data stream
+    async def on_all_checked():
+        print("[ INFO ] All gaps checked, closing stock stream")
+        if market_state is not None:
+            quote_watch.cancel()
+        else:
+            await stock_stream.stop_ws()
 
+    # Quotes arriving within a few milliseconds are checked together in one batch
+    dispatcher = quote_dispatcher.QuoteDispatcher(gap_book, on_gap, on_all_checked, tracker=tracker)
+    if market_state is None:
+        stock_stream.subscribe_quotes(dispatcher.handle_quote, *tickers)
+        if tracker is not None:
+            tracker.attach(stock_stream)
 
 
     #------------------------------------------------------------------------------
-    # Close Unfilled Gap Orders
+    # Run Streams and Order Manager Until Unfilled Gap Orders Are Canceled
     #------------------------------------------------------------------------------
-    close_gap_orders = False
-    while not close_gap_orders:
-        current_time = datetime.datetime.now().strftime("%H%M")
-        print('current time:', current_time)
-
-        if current_time == "13:30": # UTC
-            time.sleep(3600)
-
-        elif current_time == "14:30":
-            print('current time:', current_time)
+    quote_watch = None
+
+    async def run_session():
+        nonlocal quote_watch
+        await orders.warm_up()
+        if market_state is not None:
+            # quotes come from the shared market state, only trade updates are streamed
+            quote_watch = asyncio.ensure_future(market_state.watch_quotes(dispatcher.handle_quote, tickers))
+            streams = asyncio.gather(trading_stream._run_forever())
+        else:
+            streams = asyncio.gather(stock_stream._run_forever(), trading_stream._run_forever())
+        if tracker is not None:
+            metrics = asyncio.gather(tracker.log_periodically(), tracker.serve_metrics())
+        await orders.run_until(cancel_at)
+        if market_state is not None:
+            quote_watch.cancel()
+        else:
+            await stock_stream.stop_ws()
+        await trading_stream.stop_ws()
+        await streams
+        if tracker is not None:
+            metrics.cancel()
+            for line in tracker.summary(symbols=True):
+                print(f'[ INFO ] latency {line}')
 
-            for id in gap_orders:
-                trading_client.cancel_order_by_id(id)
+    asyncio.run(run_session())
 
-                # TODO: Need to store info on which tickers did not get their orders canceled so subsequent orders can be made
+    # TODO: Need to store info on which tickers did not get their orders canceled so subsequent orders can be made
+    for order in orders.orders.values():
+        print(f'{order.symbol} order {order.id}: {order.status}, filled {order.filled_qty}')
 
 
     print('OUTSIDE WEBSOCKET~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~')
-    for t_obj in tickers_dict.values():
+    for ticker in tickers:
         #------------------------------------------------------------------------------
         # TRADE CONDITIONS AND EXECUTIONS
         # TODO: Set custom time expiration on limit orders
@@ -176,24 +188,16 @@ def main():
 
 
 
-class Tickers:
-    """Ticker Object"""
-    def __init__(self, symbol, high, low):
-        self.symbol = symbol
-        self.high = high
-        self.low = low
-    gap_up = False
-    gap_down = False
-    gap_check = False
-    order_id = ""
-
-
-def get_last_weekday() -> datetime.datetime:
-    """Get the last weekday"""
-    today = datetime.datetime.today()
-    offset = max(1, (today.weekday() + 6) % 7 - 3)
-    last_weekday = today - datetime.timedelta(days=offset)
-    return last_weekday.replace(hour=0, minute=0, second=0, microsecond=0)
+def get_previous_session_day() -> datetime.datetime:
+    """Get midnight of the previous trading session (skipping weekends and holidays)"""
+    today = datetime.date.today()
+    try:
+        previous_date = trading_calendar.load_calendar().previous_session(today).date
+    except ValueError as e:
+        # outside of the holiday calendar, only weekends are skipped
+        print(f'[ WARN ] {e}; using the last weekday')
+        previous_date = today - datetime.timedelta(days=max(1, (today.weekday() + 6) % 7 - 3))
+    return datetime.datetime.combine(previous_date, datetime.time())
 
 
 if __name__ == '__main__':
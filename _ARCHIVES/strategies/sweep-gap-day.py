@@ -0,0 +1,96 @@
+'''
+Description:
+This script grid-searches the gap-day strategy parameters over the data/tickers
+minute files and prints the best parameter combinations.
+
+Usage:
+$ python sweep-gap-day.py [-t/--tickers AAPL,NVDA] [-s/--start 20230101] [-e/--end 20230731] [--gap-up 0.01:0.05:0.005] [--gap-down 0.01:0.05:0.005] [--offset 0:0.1:0.01] [--cancel 10:00,10:15,10:30] [--qty 100] [-n/--top 20] [-o/--output sweep.csv]
+
+Details:
+Values are given as comma separated lists or inclusive start:stop:step ranges.
+Each ticker is evaluated in its own process and every combination is scored
+with the same fill model as backtest-gap-day.py (without a stop loss), so a
+combination can be checked trade by trade there. Like the backtest, days whose
+previous trading session has no day file are skipped.
+'''
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import corpus, gap_sweep
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'sweep-gap-day.py',
+        description = 'This script grid-searches the gap-day strategy parameters over the data/tickers minute files.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-s', '--start', dest='start', action='store', default=None, help='First date in YYYYMMDD format.')
+    parser.add_argument('-e', '--end', dest='end', action='store', default=None, help='Last date in YYYYMMDD format.')
+    parser.add_argument('--gap-up', dest='gap_up', action='store', default='0.01:0.05:0.005', help='Gap up thresholds (fractions).')
+    parser.add_argument('--gap-down', dest='gap_down', action='store', default='0.01:0.05:0.005', help='Gap down thresholds (fractions).')
+    parser.add_argument('--offset', dest='offset', action='store', default='0:0.1:0.01', help='Limit price offsets in dollars.')
+    parser.add_argument('--cancel', dest='cancel', action='store', default='10:00,10:15,10:30', help='Comma separated HH:MM cancel times (New York time).')
+    parser.add_argument('--qty', dest='qty', action='store', default='100', help='Shares per order.')
+    parser.add_argument('--fill-on-touch', dest='fill_on_touch', action='store_true', help='Fill limit orders when a bar touches the limit price.')
+    parser.add_argument('-w', '--workers', dest='workers', action='store', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('-n', '--top', dest='top', action='store', type=int, default=20, help='Number of combinations to print.')
+    parser.add_argument('-o', '--output', dest='output', action='store', default=None, help='Write every ranked combination to this CSV file.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else corpus.list_symbols()
+    start = datetime.datetime.strptime(args.start, '%Y%m%d').date() if args.start else None
+    end = datetime.datetime.strptime(args.end, '%Y%m%d').date() if args.end else None
+
+    cancel_minutes = [datetime.datetime.strptime(value, '%H:%M') for value in args.cancel.split(',')]
+    grid = gap_sweep.SweepGrid(
+        gap_sweep.parse_values(args.gap_up),
+        gap_sweep.parse_values(args.gap_down),
+        gap_sweep.parse_values(args.offset),
+        np.array([value.hour * 60 + value.minute for value in cancel_minutes]),
+        gap_sweep.parse_values(args.qty, int),
+    )
+    combinations = np.prod([len(values) for values in grid])
+
+    #--------------------------------------------------------------------------
+    # Run sweep
+    #--------------------------------------------------------------------------
+
+    print(f'[ INFO ] Sweeping {combinations} combination(s) over {len(tickers)} ticker(s).')
+    started = time.perf_counter()
+    totals = gap_sweep.run_sweep(tickers, grid, start, end, args.fill_on_touch, args.workers)
+    results = gap_sweep.ranked_results(totals, grid)
+    print(f'[ INFO ] Sweep finished in {time.perf_counter() - started:.2f}s')
+
+    # show cancel times as HH:MM
+    table = results.head(args.top).copy()
+    table['cancel_minute'] = table['cancel_minute'].map(lambda minute: f'{minute // 60:02d}:{minute % 60:02d}')
+    print(table.to_string())
+
+    if args.output:
+        results.to_csv(args.output, index=False)
+        print(f'[ INFO ] Wrote ranked results to {args.output}')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
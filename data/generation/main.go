@@ -82,7 +82,7 @@ func main() {
 	fmt.Println("[ INFO ] Stating data generation loop...")
 
 	for current := start; !current.After(end); current = current.AddDate(0, 0, 1) {
-		// skip weekends and holidays (including early closes)
+		// skip weekends and every date in market-holidays.json (full closures and early closes)
 		if isWeekend(current) || isHoliday(current, holidays) {
 			continue
 		}
@@ -0,0 +1,171 @@
+'''
+Description:
+This script validates the data/tickers day files (or the bars_minute table)
+against the trading calendar, writes a quality manifest of every (ticker, day)
+to data/store and optionally refetches the bad days from Alpaca.
+
+Usage:
+$ python check-data-quality.py [-t/--tickers AAPL,MSFT] [-s/--start 20230101] [-e/--end 20231231] [--source files|db] [-r/--repair] [-w/--workers 4] [--rate 180] [-v/--verbose]
+
+Required Environment Variables:
+ALPACA_API_KEY_ID, ALPACA_SECRET_KEY (--repair only)
+PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, PG_PASSWORD (--source db only)
+
+Details:
+Day files are expected on every full session (the generator skips holidays and
+early closes) with one row per minute from 9:00 AM to 4:00 PM. bars_minute is
+expected to hold every regular session minute and nothing outside the
+load-bars-minute.py window. Both are checked for duplicate minutes, OHLC
+consistency, and (files only) meta prev_* values which are stale or disagree
+with the day's bars. See dogtrader.data_quality for the manifest columns and
+flags.
+
+With --repair, only the flagged days are refetched, consecutive days of a
+ticker in one request, and checked again before the manifest is written.
+Repaired day files are padded to 4:00 PM. Days on which the generator's rules
+skip a ticker (no first bar with volume before 8:05 AM) stay missing.
+'''
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+from alpaca.data import StockHistoricalDataClient
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import backfill, corpus, data_quality, tickers_manifest, trading_calendar
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'check-data-quality.py',
+        description = 'This script validates minute bar days and writes a quality manifest.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-s', '--start', dest='start', action='store', default=None, help='Start date in YYYYMMDD format (inclusive, default: first day of each ticker).')
+    parser.add_argument('-e', '--end', dest='end', action='store', default=None, help='End date in YYYYMMDD format (inclusive, default: last day of each ticker).')
+    parser.add_argument('--source', dest='source', action='store', choices=['files', 'db'], default='files', help='Check the data/tickers files or the bars_minute table.')
+    parser.add_argument('-r', '--repair', dest='repair', action='store_true', help='Refetch the flagged days from Alpaca.')
+    parser.add_argument('-w', '--workers', dest='workers', action='store', type=int, default=backfill.DEFAULT_WORKERS, help='Number of concurrent fetch workers when repairing.')
+    parser.add_argument('--rate', dest='rate', action='store', type=int, default=backfill.DEFAULT_REQUESTS_PER_MINUTE, help='Maximum Alpaca requests per minute when repairing.')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='store_true', help='List every flagged day.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    start = datetime.datetime.strptime(args.start, '%Y%m%d').date() if args.start else None
+    end = datetime.datetime.strptime(args.end, '%Y%m%d').date() if args.end else None
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    stock_client = None
+    if args.repair:
+        # get alpaca environment variables
+        API_KEY = os.getenv('ALPACA_API_KEY_ID')
+        SECRET_KEY = os.getenv('ALPACA_SECRET_KEY')
+
+        # check for missing environment variables
+        if API_KEY == None or SECRET_KEY == None:
+            print('[ ERROR ] Environment variables ALPACA_API_KEY_ID or ALPACA_SECRET_KEY not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        stock_client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
+
+    conn = None
+    if args.source == 'db':
+        # get postgres environment variables
+        PG_HOST = os.getenv('PG_HOST')
+        PG_PORT = os.getenv('PG_PORT')
+        PG_DB_NAME = os.getenv('PG_DB_NAME')
+        PG_USERNAME = os.getenv('PG_USERNAME')
+        PG_PASSWORD = os.getenv('PG_PASSWORD')
+
+        # check for missing environment variables
+        if PG_HOST == None or PG_PORT == None or PG_DB_NAME == None or PG_USERNAME == None or PG_PASSWORD == None:
+            print('[ ERROR ] Environment variables PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, or PG_PASSWORD not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        conn_string = "postgresql://{}:{}@{}:{}/{}".format(PG_USERNAME, PG_PASSWORD, PG_HOST, PG_PORT, PG_DB_NAME)
+        conn = create_engine(conn_string).connect()
+        check = lambda: data_quality.check_db(conn, tickers, start, end)
+        output_path = data_quality.db_manifest_path()
+    else:
+        check = lambda: data_quality.check_corpus(tickers, start, end)
+        output_path = data_quality.manifest_path(corpus.DEFAULT_VERSION)
+
+    #--------------------------------------------------------------------------
+    # Check days
+    #--------------------------------------------------------------------------
+
+    started = time.perf_counter()
+    manifest = check()
+    print(f'[ INFO ] Checked {len(manifest)} day(s) in {time.perf_counter() - started:.2f}s')
+
+    #--------------------------------------------------------------------------
+    # Repair days
+    #--------------------------------------------------------------------------
+
+    if args.repair:
+        if args.source == 'db':
+            rows = data_quality.repair_db(stock_client, conn, manifest, max_workers=args.workers, requests_per_minute=args.rate)
+            print(f'[ INFO ] Upserted {rows} bar(s)')
+        else:
+            written = data_quality.repair_files(stock_client, manifest, max_workers=args.workers, requests_per_minute=args.rate)
+            print(f'[ INFO ] Rewrote {len(written)} day file(s)')
+
+            # keep the day file manifest in step with the rewritten files
+            day_manifest = tickers_manifest.TickersManifest()
+            day_manifest.refresh(sorted({day_file.symbol for day_file in written}))
+            day_manifest.close()
+
+        manifest = check()
+        print(f'[ INFO ] Checked {len(manifest)} day(s) again after repairing')
+
+    #--------------------------------------------------------------------------
+    # Report and write manifest
+    #--------------------------------------------------------------------------
+
+    for name, count in data_quality.flag_counts(manifest).items():
+        if count:
+            print(f'[ INFO ] {count} day(s) with {name}')
+
+    outside = int(((manifest['flags'] & data_quality.OUTSIDE_CALENDAR) != 0).sum())
+    if outside:
+        calendar = trading_calendar.load_calendar()
+        print(f'[ WARN ] {outside} day(s) are outside of the holiday calendar ({calendar.first_date} to {calendar.last_date}): their sessions and missing days are not checked, add their years to properties/market-holidays.json')
+
+    if args.verbose:
+        for row in manifest[manifest['flags'] != 0].itertuples(index=False):
+            print(f'{row.symbol:<8}{row.date}  rows {row.rows:>4}  missing {row.missing:>4}  {data_quality.describe_flags(row.flags)}')
+
+    print(f'[ INFO ] {len(data_quality.clean_days(manifest))} of {len(manifest)} day(s) are clean')
+
+    # days outside of the checked tickers and dates keep their previous rows
+    manifest = data_quality.update_manifest(manifest, output_path, tickers, start, end)
+    print(f'[ INFO ] Manifest of {len(manifest)} day(s) written to {output_path}')
+
+    if conn is not None:
+        conn.close()
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
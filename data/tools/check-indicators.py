@@ -0,0 +1,226 @@
+'''
+Description:
+This script checks that dogtrader.indicators reproduces the indicator columns
+of the checked-in data/tickers files written by the Go generator.
+
+Usage:
+$ python check-indicators.py [-t/--tickers AAPL,MSFT] [-s/--start 20230101] [-e/--end 20231231] [-w/--warmup 120] [--tolerance 0.0015] [--rsi-tolerance 0.25]
+$ python check-indicators.py --raw [-t/--tickers AAPL,MSFT] [-s/--start 20230101] [-e/--end 20231231] [--workers 4] [--rate 180] [--tolerance 0.0015] [--rsi-tolerance 0.25]
+
+Required Environment Variables:
+ALPACA_API_KEY_ID, ALPACA_SECRET_KEY (--raw only)
+
+Details:
+The data files start at 9:00 AM, so the pre-market bars the recursive
+indicators are seeded from are not available. Each day is therefore
+recomputed from its own OHLCV rows, continuing the EMAs, MACD signal and RSI
+averages from the first row's values. SMAs and VWAP are exact; the recursive
+columns are compared after --warmup rows, once the seed rounding error has
+decayed. Days of the same length are checked together as one batch.
+
+With --raw, whole days are recomputed instead: the generator's 6:00 AM to
+4:00 PM minute bars of every day are fetched from Alpaca (consecutive days of a
+ticker in one request), padded to 4:00 PM like repaired day files and run
+through dogtrader.indicators.compute_frame, and every indicator column is
+compared from 9:00 AM with the same tolerances. Days without a file row for
+every computed minute (or skipped by the generator's rules) are reported.
+
+RSI gets its own, looser tolerance: it is driven by minute-to-minute close
+changes, and the files round closes to 3 decimals while Alpaca prices have
+up to 4, so the changes recomputed from the files are slightly off.
+
+The session rollover of dogtrader.streaming_indicators.IndicatorBank is also
+checked: a post-market bar (7:30 PM EST, already the next UTC day) followed by
+the next morning's bars must start a new session.
+
+Exits with code 1 if any value differs from the file by more than the
+tolerance, if a day could not be compared with --raw, or if the rollover check
+fails.
+'''
+
+import argparse
+import collections
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from alpaca.data import StockHistoricalDataClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import backfill, corpus, data_quality, indicators, streaming_indicators, trading_calendar
+from dogtrader.trading_calendar import NEW_YORK
+
+# rows of the RSI column used to recover its gain/loss averages
+RSI_SEED_ROWS = 30
+
+def check_rollover() -> bool:
+    """Feed a full day, a post-market bar and the next morning; the next day must be a new session."""
+    bank = streaming_indicators.IndicatorBank(['TEST'])
+    first, second = datetime.date(2023, 1, 9), datetime.date(2023, 1, 10)
+
+    def bar(date, hour, minute, close):
+        timestamp = datetime.datetime.combine(date, datetime.time(hour, minute), NEW_YORK).astimezone(datetime.timezone.utc)
+        return bank.update('TEST', timestamp, close, close, close, 100)
+
+    for minute in range(6 * 60, 16 * 60 + 1):
+        bar(first, minute // 60, minute % 60, 10.0)
+    bar(first, 19, 30, 10.0)
+    state = bar(second, 6, 0, 20.0)
+    if state.day != second.toordinal() or state.minute != 6 * 60:
+        return False
+
+    for minute in range(6 * 60 + 1, 9 * 60 + 1):
+        state = bar(second, minute // 60, minute % 60, 20.0)
+    return state.ready and state.sma5 == 20.0
+
+def continued_differences(day_files: list[corpus.DayFile], warmup: int, exact_from: dict[str, int]) -> dict[str, float]:
+    """Largest difference per column of each day continued from its first row's values."""
+    # group days by row count so each group is one time-major batch
+    days_by_length = collections.defaultdict(list)
+    for day_file in day_files:
+        day = pd.read_csv(day_file.data_path)
+        days_by_length[len(day)].append(day)
+
+    worst = collections.defaultdict(float)
+    for length, days in days_by_length.items():
+        if length <= warmup:
+            continue
+
+        stacked = {column: np.stack([day[column].to_numpy(dtype=np.float64) for day in days], axis=1) for column in corpus.DATA_COLUMNS[1:]}
+        seeds = {column: stacked[column][0] for column in ('12EMA', '26EMA', 'MACDS')}
+        seeds['RSI'] = stacked['RSI'][:RSI_SEED_ROWS]
+        computed = indicators.continue_v000(stacked['high'], stacked['low'], stacked['close'], stacked['volume'], seeds)
+
+        for column in indicators.INDICATOR_COLUMNS:
+            start = exact_from.get(column, warmup)
+            difference = np.abs(computed[column][start:].round(3) - stacked[column][start:])
+            worst[column] = max(worst[column], float(np.nanmax(difference)))
+    return worst
+
+def recomputed_differences(client, day_files: list[corpus.DayFile], workers: int, rate: int) -> tuple[dict[str, float], list]:
+    """
+    Largest difference per column of each day recomputed from its raw
+    6:00 AM to 4:00 PM bars, and the dates which could not be compared.
+    """
+    files = {(day_file.symbol, day_file.date): day_file for day_file in day_files}
+    bad = collections.defaultdict(list)
+    for symbol, date in files:
+        bad[symbol].append(date)
+    chunks = data_quality.plan_repairs(bad, data_quality.file_window, trading_calendar.load_calendar())
+
+    worst = collections.defaultdict(float)
+    compared = set()
+    for chunk, bars in backfill.fetch_chunks(client, chunks, workers, rate):
+        if bars.empty:
+            continue
+        rows = indicators.compute_frame(data_quality.pad_to_close(bars))
+        for (symbol, date), day_rows in rows.groupby(['symbol', 'date'], sort=True):
+            if (symbol, date) not in files:
+                continue
+            day = pd.read_csv(files[(symbol, date)].data_path)
+            merged = day_rows.merge(day, on='time', how='left', suffixes=('', '_file'))
+            if merged['close_file'].isna().any():
+                continue
+            for column in indicators.INDICATOR_COLUMNS:
+                difference = np.abs(merged[column].to_numpy(dtype=np.float64) - merged[f'{column}_file'].to_numpy(dtype=np.float64))
+                worst[column] = max(worst[column], float(np.nanmax(difference)))
+            compared.add((symbol, date))
+    return worst, sorted(date for _, date in set(files) - compared)
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'check-indicators.py',
+        description = 'This script checks dogtrader.indicators against the indicator columns of the data/tickers files.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-s', '--start', dest='start', action='store', default=None, help='First day in YYYYMMDD format.')
+    parser.add_argument('-e', '--end', dest='end', action='store', default=None, help='Last day in YYYYMMDD format.')
+    parser.add_argument('--raw', dest='raw', action='store_true', help='Recompute whole days from the raw Alpaca minute bars.')
+    parser.add_argument('--workers', dest='workers', action='store', type=int, default=backfill.DEFAULT_WORKERS, help='Concurrent Alpaca requests with --raw.')
+    parser.add_argument('--rate', dest='rate', action='store', type=int, default=backfill.DEFAULT_REQUESTS_PER_MINUTE, help='Maximum Alpaca requests per minute with --raw.')
+    parser.add_argument('-w', '--warmup', dest='warmup', action='store', type=int, default=120, help='Rows to skip before comparing the recursive columns.')
+    parser.add_argument('--tolerance', dest='tolerance', action='store', type=float, default=0.0015, help='Maximum allowed absolute difference.')
+    parser.add_argument('--rsi-tolerance', dest='rsi_tolerance', action='store', type=float, default=0.25, help='Maximum allowed absolute RSI difference.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else corpus.list_symbols()
+    start = datetime.datetime.strptime(args.start, '%Y%m%d').date() if args.start else None
+    end = datetime.datetime.strptime(args.end, '%Y%m%d').date() if args.end else None
+
+    # columns which do not depend on seeds are compared from the first row they are exact
+    exact_from = {'VWAP': indicators.VWAP_RESET_INDEX - indicators.OUTPUT_INDEX, '5SMA': 12, '8SMA': 12, '13SMA': 12}
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    stock_client = None
+    if args.raw:
+        # get alpaca environment variables
+        API_KEY = os.getenv('ALPACA_API_KEY_ID')
+        SECRET_KEY = os.getenv('ALPACA_SECRET_KEY')
+
+        # check for missing environment variables
+        if API_KEY == None or SECRET_KEY == None:
+            print('[ ERROR ] Environment variables ALPACA_API_KEY_ID or ALPACA_SECRET_KEY not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        stock_client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
+
+    #--------------------------------------------------------------------------
+    # Check each ticker
+    #--------------------------------------------------------------------------
+
+    failures = 0
+    for ticker in tickers:
+        day_files = [day_file for day_file in corpus.list_day_files(ticker) if (start is None or day_file.date >= start) and (end is None or day_file.date <= end)]
+
+        if args.raw:
+            worst, skipped = recomputed_differences(stock_client, day_files, args.workers, args.rate)
+            if skipped:
+                failures += 1
+                print(f'[ WARN ] {ticker:5} {len(skipped)} day(s) not compared: {", ".join(date.strftime("%Y%m%d") for date in skipped)}')
+        else:
+            worst = continued_differences(day_files, args.warmup, exact_from)
+
+        for column in indicators.INDICATOR_COLUMNS:
+            tolerance = args.rsi_tolerance if column == 'RSI' else args.tolerance
+            status = 'OK' if worst[column] <= tolerance else 'MISMATCH'
+            failures += status != 'OK'
+            print(f'[ INFO ] {ticker:5} {column:6} max abs diff {worst[column]:.4f} {status}')
+
+    #--------------------------------------------------------------------------
+    # Check streaming session rollover
+    #--------------------------------------------------------------------------
+
+    if check_rollover():
+        print('[ INFO ] streaming session rollover after a post-market bar OK')
+    else:
+        failures += 1
+        print('[ INFO ] streaming session rollover after a post-market bar MISMATCH')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    if failures:
+        print(f'[ ERROR ] {failures} check(s) failed.')
+        print('[ INFO ] Exiting with code 1.')
+        return 1
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
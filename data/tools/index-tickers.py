@@ -0,0 +1,70 @@
+'''
+Description:
+This script updates the SQLite manifest of the data/tickers day files in
+data/store, which loaders and backtests query instead of listing directories
+and opening meta files.
+
+Usage:
+$ python index-tickers.py [-t/--tickers AAPL,MSFT] [-v/--version v000] [-f/--full]
+
+Details:
+Only day files which were added or changed (by size or modification time)
+since the last run are read, and rows of deleted files are removed, so run
+this after generating or repairing days. --full rebuilds the manifest from
+scratch. Without --tickers every symbol directory in data/tickers is indexed.
+'''
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import tickers_manifest
+from dogtrader.paths import TICKERS_MANIFEST_PATH
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'index-tickers.py',
+        description = 'This script updates the manifest of the data/tickers day files.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-v', '--version', dest='version', action='store', default=None, help='Data file version to index (default: all versions).')
+    parser.add_argument('-f', '--full', dest='full', action='store_true', help='Rebuild the manifest from scratch.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    versions = [args.version] if args.version else None
+
+    #--------------------------------------------------------------------------
+    # Update manifest
+    #--------------------------------------------------------------------------
+
+    if args.full and os.path.exists(TICKERS_MANIFEST_PATH):
+        os.remove(TICKERS_MANIFEST_PATH)
+
+    manifest = tickers_manifest.TickersManifest()
+    started = time.perf_counter()
+    counts = manifest.refresh(tickers, versions)
+    manifest.close()
+
+    print(f'[ INFO ] {counts["added"]} day(s) added, {counts["updated"]} updated, {counts["removed"]} removed and {counts["unchanged"]} unchanged in {time.perf_counter() - started:.2f}s')
+    print(f'[ INFO ] Manifest written to {TICKERS_MANIFEST_PATH}')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+'''
+Description:
+This script is the single market-data process of a deployment: it subscribes to
+quotes and minute bars of the inputted tickers once and keeps their latest
+values and v000 indicators in a shared memory block that strategy processes
+read with dogtrader.market_state.MarketStateReader.
+
+Usage:
+$ python market-data-service.py -t/--tickers AAPL,SBUX [-n/--name dogtrader-market-state] [--no-warm-up] [-s/--status 60]
+
+Required Environment Variables:
+ALPACA_API_KEY_ID, ALPACA_SECRET_KEY
+
+Details:
+List every ticker any strategy needs. Strategies attach with the block name
+(e.g. gap-day-trader.py with DOGTRADER_MARKET_STATE set) instead of opening
+their own streams. Unless --no-warm-up is given, today's bars since 6:00 AM
+are fetched first so the indicators are correct when starting mid-session.
+The block is removed when the service exits.
+'''
+
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+
+from alpaca.data import StockHistoricalDataClient, StockBarsRequest, TimeFrame
+from alpaca.data.live.stock import StockDataStream
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import market_state, trading_calendar
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'market-data-service.py',
+        description = 'This script streams market data for all strategies into shared memory.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', required=True, help='Comma separated list of ticker symbol(s).')
+    parser.add_argument('-n', '--name', dest='name', action='store', default=market_state.DEFAULT_NAME, help='Name of the shared memory block.')
+    parser.add_argument('--no-warm-up', dest='warm_up', action='store_false', help="Do not load today's bars before streaming.")
+    parser.add_argument('-s', '--status', dest='status', action='store', type=float, default=60, help='Seconds between status lines.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',')
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    # get alpaca environment variables
+    API_KEY = os.getenv('ALPACA_API_KEY_ID')
+    SECRET_KEY = os.getenv('ALPACA_SECRET_KEY')
+
+    # check for missing environment variables
+    if API_KEY == None or SECRET_KEY == None:
+        print('[ ERROR ] Environment variables ALPACA_API_KEY_ID or ALPACA_SECRET_KEY not found.')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+
+    # only one service may own a block, so each symbol is subscribed to once
+    try:
+        writer = market_state.MarketStateWriter(args.name, tickers)
+    except FileExistsError:
+        print(f'[ ERROR ] Shared memory block {args.name} already exists (is another market-data service running?).')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+
+    feed = market_state.MarketDataFeed(writer)
+
+    #--------------------------------------------------------------------------
+    # Warm up indicators
+    #--------------------------------------------------------------------------
+
+    if args.warm_up:
+        today = datetime.datetime.now(trading_calendar.NEW_YORK).date()
+        stock_client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
+        request = StockBarsRequest(symbol_or_symbols=tickers, start=trading_calendar.to_utc(today, datetime.time(6, 0)), timeframe=TimeFrame.Minute)
+        bars = stock_client.get_stock_bars(request).df
+        if not bars.empty:
+            feed.warm_up(bars.reset_index())
+        print(f'[ INFO ] Warmed up with {len(bars)} bar(s) since 6:00 AM')
+
+    #--------------------------------------------------------------------------
+    # Stream market data
+    #--------------------------------------------------------------------------
+
+    stock_stream = StockDataStream(API_KEY, SECRET_KEY, raw_data=True)
+    feed.subscribe(stock_stream)
+
+    async def log_status():
+        while True:
+            await asyncio.sleep(args.status)
+            quotes_per_second, bars_per_second = feed.rates()
+            print(f'[ INFO ] {feed.quotes} quote(s) ({quotes_per_second:.1f}/s), {feed.bars} bar(s) ({bars_per_second:.2f}/s)')
+
+    async def serve():
+        await asyncio.gather(stock_stream._run_forever(), log_status())
+
+    print(f'[ INFO ] Serving {", ".join(tickers)} in shared memory block {writer.name}')
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+        writer.unlink()
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,61 @@
+'''
+Description:
+This script packs the per-day CSV and meta JSON files in data/tickers into
+zstd-compressed ticker-month Parquet files in data/store, which are read with
+dogtrader.columnar_store.load_bars.
+
+Usage:
+$ python pack-tickers.py [-t/--tickers AAPL,MSFT] [-v/--version v000] [-f/--force]
+
+Details:
+Without --tickers every symbol directory in data/tickers is packed. Months
+whose Parquet file is newer than all of their day files are skipped unless
+--force is given, so re-running after generating new days is cheap.
+'''
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import columnar_store, corpus
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'pack-tickers.py',
+        description = 'This script packs the data/tickers CSV corpus into compressed ticker-month Parquet files.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-v', '--version', dest='version', action='store', default=corpus.DEFAULT_VERSION, help='Data file version to pack (default: v000).')
+    parser.add_argument('-f', '--force', dest='force', action='store_true', help='Rewrite months even if they are up to date.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else corpus.list_symbols()
+
+    #--------------------------------------------------------------------------
+    # Pack tickers
+    #--------------------------------------------------------------------------
+
+    for ticker in tickers:
+        started = time.perf_counter()
+        written = columnar_store.pack_symbol(ticker, version=args.version, force=args.force)
+        print(f'[ INFO ] Packed {len(written)} month(s) for {ticker} in {time.perf_counter() - started:.2f}s')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
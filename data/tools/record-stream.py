@@ -0,0 +1,112 @@
+'''
+Description:
+This script records live StockDataStream messages (quotes, bars and/or trades)
+for the inputted tickers into a binary stream log, which replay-stream.py and
+dogtrader.stream_log.replay feed back to the trading handlers offline.
+
+Usage:
+$ python record-stream.py -t/--tickers AAPL,SBUX -o/--output session.dtsl [--quotes] [--bars] [--trades] [-d/--duration 3600]
+
+Required Environment Variables:
+ALPACA_API_KEY_ID, ALPACA_SECRET_KEY
+
+Details:
+Without --quotes, --bars or --trades all three are recorded. Messages are
+appended to the output file, so recording into an existing log continues it.
+'''
+
+import argparse
+import asyncio
+import os
+import sys
+
+from alpaca.data.live.stock import StockDataStream
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import stream_log
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'record-stream.py',
+        description = 'This script records live stock stream messages into a binary stream log.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', required=True, help='Comma separated list of ticker symbol(s).')
+    parser.add_argument('-o', '--output', dest='output', action='store', required=True, help='Stream log file to append to.')
+    parser.add_argument('--quotes', dest='quotes', action='store_true', help='Record quotes.')
+    parser.add_argument('--bars', dest='bars', action='store_true', help='Record minute bars.')
+    parser.add_argument('--trades', dest='trades', action='store_true', help='Record trades.')
+    parser.add_argument('-d', '--duration', dest='duration', action='store', type=float, default=None, help='Seconds to record for (default: until interrupted).')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',')
+    if not (args.quotes or args.bars or args.trades):
+        args.quotes = args.bars = args.trades = True
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    # get alpaca environment variables
+    API_KEY = os.getenv('ALPACA_API_KEY_ID')
+    SECRET_KEY = os.getenv('ALPACA_SECRET_KEY')
+
+    # check for missing environment variables
+    if API_KEY == None or SECRET_KEY == None:
+        print('[ ERROR ] Environment variables ALPACA_API_KEY_ID or ALPACA_SECRET_KEY not found.')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+
+    #--------------------------------------------------------------------------
+    # Record stream
+    #--------------------------------------------------------------------------
+
+    stock_stream = StockDataStream(API_KEY, SECRET_KEY)
+    recorder = stream_log.StreamRecorder(args.output)
+    recorder.attach(stock_stream)
+
+    # the handlers only need to exist for the messages to be subscribed to and dispatched
+    async def ignore(data):
+        pass
+
+    if args.quotes:
+        stock_stream.subscribe_quotes(ignore, *tickers)
+    if args.bars:
+        stock_stream.subscribe_bars(ignore, *tickers)
+    if args.trades:
+        stock_stream.subscribe_trades(ignore, *tickers)
+
+    async def record():
+        stream = asyncio.ensure_future(stock_stream._run_forever())
+        try:
+            await asyncio.wait_for(asyncio.shield(stream), args.duration)
+        except asyncio.TimeoutError:
+            await stock_stream.stop_ws()
+            await stream
+
+    print(f'[ INFO ] Recording {", ".join(tickers)} into {args.output}')
+    try:
+        asyncio.run(record())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        recorder.close()
+
+    print(f'[ INFO ] Recorded {recorder.messages} message(s).')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
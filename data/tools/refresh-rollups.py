@@ -0,0 +1,105 @@
+'''
+Description:
+This script refreshes the 5m/15m/1h/1d rollups in data/store/rollups from the
+data/tickers minute files or the bars_minute table.
+
+Usage:
+$ python refresh-rollups.py [-t/--tickers AAPL,MSFT] [--source files|db] [--timeframes 5m,15m,1h,1d] [-f/--full]
+
+Required Environment Variables (--source db only):
+PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, PG_PASSWORD
+
+Details:
+Only the sessions since the last stored one are aggregated (the last stored
+session is recomputed), so running this after every ingestion is cheap.
+--full rebuilds the rollups from all minute bars. Without --tickers every
+data/tickers symbol (or every bars_minute symbol with --source db) is refreshed.
+'''
+
+import argparse
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import corpus, rollups
+from dogtrader.bulk_load import PG_TABLE
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'refresh-rollups.py',
+        description = 'This script refreshes the multi-timeframe rollups of the minute bars.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('--source', dest='source', action='store', choices=['files', 'db'], default='files', help='Read minute bars from data/tickers files or the bars_minute table.')
+    parser.add_argument('--timeframes', dest='timeframes', action='store', default=','.join(rollups.TIMEFRAMES), help='Comma separated list of timeframes.')
+    parser.add_argument('-f', '--full', dest='full', action='store_true', help='Rebuild the rollups from all minute bars.')
+
+    args = parser.parse_args()
+
+    timeframes = args.timeframes.split(',')
+    unknown = [timeframe for timeframe in timeframes if timeframe not in rollups.TIMEFRAMES]
+    if unknown:
+        print(f'[ ERROR ] Unknown timeframe(s): {", ".join(unknown)}')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+
+    #--------------------------------------------------------------------------
+    # Select data source
+    #--------------------------------------------------------------------------
+
+    conn = None
+    if args.source == 'db':
+        # get postgres environment variables
+        PG_HOST = os.getenv('PG_HOST')
+        PG_PORT = os.getenv('PG_PORT')
+        PG_DB_NAME = os.getenv('PG_DB_NAME')
+        PG_USERNAME = os.getenv('PG_USERNAME')
+        PG_PASSWORD = os.getenv('PG_PASSWORD')
+
+        # check for missing environment variables
+        if PG_HOST == None or PG_PORT == None or PG_DB_NAME == None or PG_USERNAME == None or PG_PASSWORD == None:
+            print('[ ERROR ] Environment variables PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, or PG_PASSWORD not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        conn_string = "postgresql://{}:{}@{}:{}/{}".format(PG_USERNAME, PG_PASSWORD, PG_HOST, PG_PORT, PG_DB_NAME)
+        conn = create_engine(conn_string).connect()
+        tickers = args.tickers.split(',') if args.tickers else [row[0] for row in conn.exec_driver_sql(f'SELECT DISTINCT symbol FROM {PG_TABLE} ORDER BY symbol')]
+        source = rollups.db_source(conn)
+    else:
+        tickers = args.tickers.split(',') if args.tickers else corpus.list_symbols()
+        source = rollups.corpus_source()
+
+    #--------------------------------------------------------------------------
+    # Refresh rollups
+    #--------------------------------------------------------------------------
+
+    store = rollups.RollupStore(timeframes=timeframes)
+    started = time.perf_counter()
+    for ticker in tickers:
+        updated = store.refresh([ticker], source, full=args.full)
+        print(f'[ INFO ] {ticker}: ' + ', '.join(f'{count} {timeframe} bar(s)' for timeframe, count in updated.items()))
+    print(f'[ INFO ] Refreshed {len(tickers)} ticker(s) in {time.perf_counter() - started:.2f}s')
+
+    if conn is not None:
+        conn.close()
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
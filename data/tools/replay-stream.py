@@ -0,0 +1,81 @@
+'''
+Description:
+This script replays a stream log written by record-stream.py through
+StockDataStream handlers without any network access and reports the message
+counts and throughput.
+
+Usage:
+$ python replay-stream.py -i/--input session.dtsl [-s/--speed 10 | --max]
+
+Details:
+By default messages are replayed at the recorded pace; --speed replays N times
+faster and --max as fast as possible. The handlers only count messages, which
+makes the replay a baseline for benchmarking the trading handlers the same way
+(see dogtrader.stream_log).
+'''
+
+import argparse
+import asyncio
+import collections
+import os
+import sys
+
+from alpaca.data.live.stock import StockDataStream
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import stream_log
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'replay-stream.py',
+        description = 'This script replays a binary stream log through StockDataStream handlers.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-i', '--input', dest='input', action='store', required=True, help='Stream log file to replay.')
+    parser.add_argument('-s', '--speed', dest='speed', action='store', type=float, default=1.0, help='Multiple of the recorded pace (default: 1).')
+    parser.add_argument('--max', dest='max', action='store_true', help='Replay as fast as possible.')
+
+    args = parser.parse_args()
+
+    #--------------------------------------------------------------------------
+    # Replay stream
+    #--------------------------------------------------------------------------
+
+    # the stream is never connected, it only dispatches the logged messages
+    stock_stream = StockDataStream('replay', 'replay')
+    counts = collections.Counter()
+
+    async def count_quote(data):
+        counts['quotes'] += 1
+
+    async def count_bar(data):
+        counts['bars'] += 1
+
+    async def count_trade(data):
+        counts['trades'] += 1
+
+    stock_stream.subscribe_quotes(count_quote, '*')
+    stock_stream.subscribe_bars(count_bar, '*')
+    stock_stream.subscribe_trades(count_trade, '*')
+
+    messages, elapsed = asyncio.run(stream_log.replay(stock_stream, args.input, None if args.max else args.speed))
+
+    print(f'[ INFO ] Replayed {messages} message(s) in {elapsed:.3f}s ({messages / max(elapsed, 1e-9):.0f} msg/s)')
+    for kind, count in sorted(counts.items()):
+        print(f'[ INFO ] {kind}: {count}')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+'''
+Description:
+This script benchmarks the data ingestion, feature generation and strategy
+replay paths on a synthetic corpus and compares the results against a stored
+baseline.
+
+Usage:
+$ python run-benchmarks.py [-c/--cases csv_load,gap_replay] [-s/--symbols 8] [-d/--days 40] [--seed 0] [-r/--repeat 3] [--db-url postgresql+psycopg2://...] [-b/--baseline properties/benchmark-baseline.json] [--tolerance 0.25] [--ignore-environment] [--save-baseline] [-o/--output results.json] [-w/--work-dir DIR]
+
+Details:
+Everything runs offline: the corpus is generated from --seed into a work
+directory (a temporary one unless --work-dir is given) and the database cases
+use a SQLite file there unless --db-url points at a local PostgreSQL. Exits
+with code 1 when a case is more than --tolerance slower (or bigger in peak RSS)
+than the baseline. --save-baseline overwrites the baseline with this run.
+
+Timings are only compared against a baseline from the same Python version,
+platform and CPU count; otherwise the script exits with code -1, and with
+--ignore-environment it warns about the differences and compares anyway.
+'''
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from dogtrader import benchmarks
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'run-benchmarks.py',
+        description = 'This script benchmarks the data, feature and strategy paths on a synthetic corpus.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-c', '--cases', dest='cases', action='store', default=None, help=f'Comma separated list of cases (default: all of {",".join(benchmarks.CASES)}).')
+    parser.add_argument('-s', '--symbols', dest='symbols', action='store', type=int, default=benchmarks.DEFAULT_SYMBOLS, help='Number of synthetic tickers.')
+    parser.add_argument('-d', '--days', dest='days', action='store', type=int, default=benchmarks.DEFAULT_DAYS, help='Number of trading days per ticker.')
+    parser.add_argument('--seed', dest='seed', action='store', type=int, default=benchmarks.DEFAULT_SEED, help='Random seed of the synthetic corpus.')
+    parser.add_argument('-r', '--repeat', dest='repeat', action='store', type=int, default=benchmarks.DEFAULT_REPEAT, help='Runs per case (the fastest is kept).')
+    parser.add_argument('--db-url', dest='db_url', action='store', default=None, help='SQLAlchemy URL of a local PostgreSQL database (default: SQLite in the work directory).')
+    parser.add_argument('-b', '--baseline', dest='baseline', action='store', default=benchmarks.BASELINE_PATH, help='Baseline JSON file.')
+    parser.add_argument('--tolerance', dest='tolerance', action='store', type=float, default=benchmarks.DEFAULT_TOLERANCE, help='Allowed slowdown as a fraction of the baseline.')
+    parser.add_argument('--ignore-environment', dest='ignore_environment', action='store_true', help='Compare against a baseline from another machine (with a warning).')
+    parser.add_argument('--save-baseline', dest='save_baseline', action='store_true', help='Write this run to the baseline file.')
+    parser.add_argument('-o', '--output', dest='output', action='store', default=None, help='Also write this run to a JSON file.')
+    parser.add_argument('-w', '--work-dir', dest='work_dir', action='store', default=None, help='Keep the generated corpus in this directory.')
+
+    args = parser.parse_args()
+
+    cases = args.cases.split(',') if args.cases else list(benchmarks.CASES)
+    unknown = [case for case in cases if case not in benchmarks.CASES]
+    if unknown:
+        print(f'[ ERROR ] Unknown case(s): {", ".join(unknown)}')
+        print('[ INFO ] Exiting...')
+        return -1
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='dogtrader-bench-')
+    os.makedirs(work_dir, exist_ok=True)
+
+    #--------------------------------------------------------------------------
+    # Run benchmarks
+    #--------------------------------------------------------------------------
+
+    try:
+        print(f'[ INFO ] Generating {args.symbols} ticker(s) x {args.days} day(s) in {work_dir}...')
+        context = benchmarks.prepare(work_dir, args.symbols, args.days, args.seed, args.db_url)
+        results = benchmarks.run_cases(context, cases, args.repeat)
+        report = benchmarks.to_json(results, context)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f'[ INFO ] Wrote {args.output}')
+
+    #--------------------------------------------------------------------------
+    # Compare against baseline
+    #--------------------------------------------------------------------------
+
+    exit_code = 0
+    if args.save_baseline:
+        benchmarks.write_baseline(report, args.baseline)
+        print(f'[ INFO ] Saved baseline {args.baseline}')
+    elif not os.path.exists(args.baseline):
+        print(f'[ INFO ] No baseline at {args.baseline}, run with --save-baseline to create one.')
+    else:
+        baseline = benchmarks.read_baseline(args.baseline)
+        if args.ignore_environment:
+            for difference in benchmarks.environment_differences(report, baseline):
+                print(f'[ WARN ] Baseline from another machine: {difference}')
+        try:
+            regressions = benchmarks.compare(report, baseline, args.tolerance, check_environment=not args.ignore_environment)
+        except ValueError as e:
+            print(f'[ ERROR ] {e}')
+            return -1
+
+        for regression in regressions:
+            print(f'[ ERROR ] Regression: {regression}')
+        if regressions:
+            exit_code = 1
+        else:
+            print(f'[ INFO ] No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print(f'[ INFO ] Exiting normally with code {exit_code}.')
+    return exit_code
+
+if __name__ == '__main__':
+    sys.exit(main())
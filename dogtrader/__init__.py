@@ -0,0 +1,6 @@
+'''
+Shared Python library for the dog-trader scripts.
+
+The scripts in this repository are run from their own directories, so they add
+the repository root to sys.path before importing from this package.
+'''
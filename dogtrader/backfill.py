@@ -0,0 +1,185 @@
+'''
+Parallel, resumable minute bar backfill.
+
+The requested (symbol, day) pairs are split into per-symbol chunks of
+consecutive trading days. Chunks are fetched concurrently by a bounded thread
+pool that shares a rate limiter, while results are written on the calling
+thread (database connections are not shared between threads). After a chunk
+has been written, its (symbol, day) pairs are appended to a checkpoint file so
+a killed run resumes with only the pairs that were never committed.
+
+The client only needs a get_stock_bars(StockBarsRequest) method, so a local
+fake can stand in for StockHistoricalDataClient.
+'''
+
+import collections
+import concurrent.futures
+import datetime
+import os
+import threading
+import time
+
+import pandas as pd
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+
+# Alpaca allows 200 data API requests per minute on the free plan
+DEFAULT_REQUESTS_PER_MINUTE = 180
+DEFAULT_WORKERS = 4
+DEFAULT_CHUNK_DAYS = 20
+DEFAULT_RETRIES = 3
+
+# a trading day and the UTC datetimes to collect bars between (inclusive)
+Window = collections.namedtuple('Window', ['day', 'start', 'end'])
+
+Chunk = collections.namedtuple('Chunk', ['symbol', 'windows'])
+
+
+class Checkpoint:
+    """Append-only file of committed (symbol, day) pairs, one SYMBOL,YYYYMMDD per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        self.lock = threading.Lock()
+
+        if os.path.exists(path):
+            with open(path) as file:
+                for line in file:
+                    line = line.strip()
+                    if line:
+                        symbol, day = line.split(',')
+                        self.done.add((symbol, datetime.datetime.strptime(day, '%Y%m%d').date()))
+
+    def is_done(self, symbol: str, day: datetime.date) -> bool:
+        return (symbol, day) in self.done
+
+    def mark_done(self, symbol: str, days: list[datetime.date]):
+        """Record days of a symbol as committed, syncing the file before returning."""
+        with self.lock:
+            with open(self.path, 'a') as file:
+                for day in days:
+                    file.write(f'{symbol},{day.strftime("%Y%m%d")}\n')
+                file.flush()
+                os.fsync(file.fileno())
+            self.done.update((symbol, day) for day in days)
+
+
+class RateLimiter:
+    """Thread-safe limiter which spaces acquire() calls evenly over a minute."""
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute
+        self.next_time = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            wait = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+
+        if wait > 0:
+            time.sleep(wait)
+
+
+def plan_chunks(tickers: list[str], windows: list[Window], checkpoint: Checkpoint, chunk_days: int = DEFAULT_CHUNK_DAYS) -> list[Chunk]:
+    """
+    Split the pending (symbol, day) pairs into chunks of at most chunk_days
+    windows. Windows which are already checkpointed break a chunk, so a chunk
+    never refetches committed days.
+    """
+    chunks = []
+    for symbol in tickers:
+        current = []
+        for window in windows:
+            if checkpoint.is_done(symbol, window.day):
+                if current:
+                    chunks.append(Chunk(symbol, current))
+                    current = []
+                continue
+
+            current.append(window)
+            if len(current) == chunk_days:
+                chunks.append(Chunk(symbol, current))
+                current = []
+
+        if current:
+            chunks.append(Chunk(symbol, current))
+
+    return chunks
+
+
+def fetch_chunk(client, limiter: RateLimiter, chunk: Chunk, retries: int = DEFAULT_RETRIES) -> pd.DataFrame:
+    """
+    Fetch the minute bars of a chunk with a single request, keeping only the
+    bars inside one of its windows. Columns match the bars_minute table.
+    """
+    request_params = StockBarsRequest(symbol_or_symbols=chunk.symbol, timeframe=TimeFrame.Minute, start=chunk.windows[0].start, end=chunk.windows[-1].end)
+
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        try:
+            df = client.get_stock_bars(request_params).df
+            break
+        except Exception as e:
+            if attempt == retries:
+                raise
+            print(f'[ WARN ] Fetching {chunk.symbol} failed ({e}), retrying...')
+            time.sleep(2 ** attempt)
+
+    if df.empty:
+        return pd.DataFrame(columns=['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume'])
+
+    # convert alpaca data to DataFrame and fix columns to match db
+    df = df.reset_index()
+    df = df.drop(columns=[column for column in ('trade_count', 'vwap') if column in df.columns])
+
+    # the request spans nights and skipped days, so keep only bars inside a window
+    mask = pd.Series(False, index=df.index)
+    for window in chunk.windows:
+        mask |= (df['timestamp'] >= window.start) & (df['timestamp'] <= window.end)
+
+    return df[mask].reset_index(drop=True)
+
+
+def run_backfill(client, tickers: list[str], windows: list[Window], write, checkpoint: Checkpoint, max_workers: int = DEFAULT_WORKERS, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE, chunk_days: int = DEFAULT_CHUNK_DAYS) -> int:
+    """
+    Backfill every pending (symbol, day) pair, calling write(df) on this thread
+    for each fetched chunk and checkpointing the chunk once write returns.
+    write is expected to commit. Returns the number of rows written.
+    """
+    chunks = plan_chunks(tickers, windows, checkpoint, chunk_days)
+    total_days = sum(len(chunk.windows) for chunk in chunks)
+    print(f'[ INFO ] Backfilling {total_days} (symbol, day) pair(s) in {len(chunks)} chunk(s) with {max_workers} worker(s)')
+
+    rows = 0
+    days = 0
+
+    for chunk, df in fetch_chunks(client, chunks, max_workers, requests_per_minute):
+        if len(df) > 0:
+            write(df)
+        checkpoint.mark_done(chunk.symbol, [window.day for window in chunk.windows])
+
+        rows += len(df)
+        days += len(chunk.windows)
+        print(f'[ INFO ] Committed {len(df)} bars for {chunk.symbol} from {chunk.windows[0].day} to {chunk.windows[-1].day} ({days}/{total_days} days)')
+
+    return rows
+
+
+def fetch_chunks(client, chunks: list[Chunk], max_workers: int = DEFAULT_WORKERS, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE):
+    """
+    Fetch chunks concurrently with a shared rate limiter, yielding
+    (chunk, DataFrame) pairs on the calling thread as they complete.
+    """
+    limiter = RateLimiter(requests_per_minute)
+
+    pool = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = {pool.submit(fetch_chunk, client, limiter, chunk): chunk for chunk in chunks}
+        for future in concurrent.futures.as_completed(futures):
+            yield futures[future], future.result()
+    finally:
+        # stop queued fetches if a write or fetch failed
+        pool.shutdown(wait=True, cancel_futures=True)
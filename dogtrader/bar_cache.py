@@ -0,0 +1,225 @@
+'''
+On-disk cache of Alpaca historical stock bars.
+
+CachedBarsClient wraps a StockHistoricalDataClient and answers get_stock_bars
+from a local cache of whole New York days. Every (symbol, timeframe, feed,
+adjustment, day) is stored as one small Parquet file named by the SHA-256 of
+that key:
+
+    data/cache/bars/ab/ab12...ef.parquet
+
+A request is split into the days it touches; days already cached are read
+from disk, and missing days are fetched whole (consecutive missing days of
+all requested symbols in one request) and cached, even when they have no bars.
+The result is then sliced to the requested start and end locally, so asking
+for a single minute of a cached day makes no network call at all.
+
+Days that are not over yet (today or later in New York) are always fetched
+and never cached. The cache is kept under max_bytes by deleting the least
+recently used files; a cache hit refreshes a file's modification time.
+
+One client can be shared by threads (like the ThreadPoolExecutor workers of
+dogtrader.post_market): the counters, the cached size and eviction are guarded
+by a lock, and fetches run outside of it.
+
+    stock_client = bar_cache.CachedBarsClient(StockHistoricalDataClient(API_KEY, SECRET_KEY))
+    bars = stock_client.get_stock_bars(StockBarsRequest(...))  # same BarSet as the client
+'''
+
+import datetime
+import hashlib
+import os
+import threading
+
+import pandas as pd
+from alpaca.data.models import BarSet
+from alpaca.data.requests import StockBarsRequest
+
+from dogtrader.paths import BAR_CACHE_DIR
+from dogtrader.trading_calendar import NEW_YORK
+
+DEFAULT_MAX_BYTES = 2 * 1024**3
+
+# missing days at most this many calendar days apart are fetched in one request (covers weekends)
+MAX_RUN_GAP_DAYS = 4
+
+BAR_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume', 'trade_count', 'vwap']
+
+# BarSet raw field names of the columns
+RAW_FIELDS = {'timestamp': 't', 'open': 'o', 'high': 'h', 'low': 'l', 'close': 'c', 'volume': 'v', 'trade_count': 'n', 'vwap': 'vw'}
+
+
+def _utc(value: datetime.datetime) -> datetime.datetime:
+    # like Alpaca, naive datetimes are UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    return value.astimezone(datetime.timezone.utc)
+
+
+def day_bounds(day: datetime.date) -> tuple[datetime.datetime, datetime.datetime]:
+    """UTC start of day and of the next day, New York time."""
+    start = datetime.datetime.combine(day, datetime.time(), tzinfo=NEW_YORK)
+    end = datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time(), tzinfo=NEW_YORK)
+    return start.astimezone(datetime.timezone.utc), end.astimezone(datetime.timezone.utc)
+
+
+def day_runs(days: list[datetime.date], max_gap: int = MAX_RUN_GAP_DAYS) -> list[list[datetime.date]]:
+    """Split sorted days into runs whose consecutive days are at most max_gap apart."""
+    runs = []
+    for day in days:
+        if runs and (day - runs[-1][-1]).days <= max_gap:
+            runs[-1].append(day)
+        else:
+            runs.append([day])
+    return runs
+
+
+def _value(value) -> str:
+    return str(getattr(value, 'value', value))
+
+
+class CachedBarsClient:
+    """StockHistoricalDataClient stand-in whose get_stock_bars is served from a day cache."""
+
+    def __init__(self, client, cache_dir: str = BAR_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.client = client
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.size = None
+        self.requests = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # everything else goes straight to the wrapped client
+        return getattr(self.client, name)
+
+    def path(self, symbol: str, request: StockBarsRequest, day: datetime.date) -> str:
+        key = '|'.join([symbol, _value(request.timeframe), _value(request.feed), _value(request.adjustment), day.isoformat()])
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f'{digest}.parquet')
+
+    def _fetch(self, request: StockBarsRequest, symbols: list[str], start: datetime.datetime, end: datetime.datetime) -> pd.DataFrame:
+        """Fetch bars of symbols within [start, end) as a (symbol, BAR_COLUMNS) frame."""
+        with self.lock:
+            self.requests += 1
+        widened = request.model_copy(update={'symbol_or_symbols': symbols, 'start': start, 'end': end - datetime.timedelta(microseconds=1), 'limit': None})
+        df = self.client.get_stock_bars(widened).df
+        if df.empty:
+            return pd.DataFrame(columns=['symbol'] + BAR_COLUMNS)
+        df = df.reset_index()
+        if 'symbol' not in df.columns:
+            df.insert(0, 'symbol', symbols[0])
+        return df[['symbol'] + [column for column in BAR_COLUMNS if column in df.columns]]
+
+    def _store(self, path: str, bars: pd.DataFrame):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        bars.reset_index(drop=True).to_parquet(temporary, index=False)
+        stored = os.path.getsize(temporary)
+        with self.lock:
+            # another thread may have stored the same day meanwhile
+            replaced = os.path.getsize(path) if os.path.exists(path) else 0
+            os.replace(temporary, path)
+            if self.size is None:
+                # scanned once, on the first store
+                self.size = sum(size for _, size, _ in self.scan())
+            else:
+                self.size += stored - replaced
+
+    def _load(self, path: str) -> pd.DataFrame:
+        bars = pd.read_parquet(path)
+        os.utime(path)
+        return bars
+
+    def get_stock_bars(self, request: StockBarsRequest):
+        """Same as StockHistoricalDataClient.get_stock_bars, through the cache."""
+        if request.start is None or request.asof is not None or request.currency is not None:
+            with self.lock:
+                self.requests += 1
+            return self.client.get_stock_bars(request)
+
+        symbols = [request.symbol_or_symbols] if isinstance(request.symbol_or_symbols, str) else list(request.symbol_or_symbols)
+        start = _utc(request.start)
+        end = _utc(request.end) if request.end is not None else datetime.datetime.now(datetime.timezone.utc)
+
+        today = datetime.datetime.now(NEW_YORK).date()
+        first_day = start.astimezone(NEW_YORK).date()
+        last_day = end.astimezone(NEW_YORK).date()
+        days = [first_day + datetime.timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+
+        frames = []
+        missing = {}
+        hits = 0
+        for symbol in symbols:
+            for day in days:
+                if day < today:
+                    try:
+                        frames.append(self._load(self.path(symbol, request, day)).assign(symbol=symbol))
+                        hits += 1
+                        continue
+                    except FileNotFoundError:
+                        # not cached yet, or evicted by another thread
+                        pass
+                missing.setdefault(day, []).append(symbol)
+
+        with self.lock:
+            self.hits += hits
+            self.misses += len(symbols) * len(days) - hits
+
+        # fetch whole missing days, one request per run of nearby days
+        for run in day_runs(sorted(missing)):
+            run_symbols = sorted({symbol for day in run for symbol in missing[day]})
+            fetched = self._fetch(request, run_symbols, day_bounds(run[0])[0], day_bounds(run[-1])[1])
+            local_days = pd.to_datetime(fetched['timestamp'], utc=True).dt.tz_convert(NEW_YORK).dt.date
+
+            for day in run:
+                for symbol in missing[day]:
+                    bars = fetched[(fetched['symbol'] == symbol) & (local_days == day)]
+                    if day < today:
+                        self._store(self.path(symbol, request, day), bars.drop(columns='symbol'))
+                    frames.append(bars)
+
+        if self.size is not None and self.size > self.max_bytes:
+            self.evict()
+
+        return self._slice(frames, symbols, start, end, request.limit)
+
+    def _slice(self, frames: list[pd.DataFrame], symbols: list[str], start: datetime.datetime, end: datetime.datetime, limit: int = None) -> BarSet:
+        raw = {}
+        frames = [frame for frame in frames if len(frame)]
+        if frames:
+            bars = pd.concat(frames, ignore_index=True)
+            timestamps = pd.to_datetime(bars['timestamp'], utc=True)
+            bars = bars[(timestamps >= start) & (timestamps <= end)].sort_values('timestamp')
+            by_symbol = dict(tuple(bars.groupby('symbol', sort=False)))
+
+            # symbols in request order, like the API
+            for symbol in symbols:
+                if symbol in by_symbol:
+                    records = by_symbol[symbol].drop(columns='symbol').rename(columns=RAW_FIELDS).to_dict('records')
+                    raw[symbol] = records[:limit] if limit is not None else records
+        return BarSet(raw)
+
+    def scan(self) -> list[tuple[float, int, str]]:
+        """(modification time, size, path) of every cached file."""
+        entries = []
+        for directory, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if filename.endswith('.parquet'):
+                    path = os.path.join(directory, filename)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def evict(self, target_fraction: float = 0.9):
+        """Delete least recently used files until the cache is under target_fraction of max_bytes."""
+        with self.lock:
+            entries = sorted(self.scan())
+            self.size = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if self.size <= self.max_bytes * target_fraction:
+                    break
+                os.remove(path)
+                self.size -= size
@@ -0,0 +1,104 @@
+'''
+Chunked, filtered reads from the bars_minute PostgreSQL table.
+
+iter_bars runs a parameterized symbol/time-range query on a named
+(server-side) cursor and yields DataFrames of at most chunk_size rows, so
+only one chunk is ever held in memory no matter how much history matches.
+
+The filters are served by the unique (symbol, timestamp) index created by
+dogtrader.bulk_load.ensure_unique_index. For years of multi-ticker history,
+partitioned_table_ddl generates optional DDL for a copy of bars_minute that is
+range-partitioned by timestamp, so time-range queries only scan the matching
+partitions.
+
+Requires psycopg2 (named cursors are a psycopg2 feature).
+'''
+
+import datetime
+import itertools
+
+import pandas as pd
+from sqlalchemy import Connection
+
+from dogtrader.bulk_load import BARS_MINUTE_COLUMNS, PG_TABLE, ensure_unique_index
+
+DEFAULT_CHUNK_SIZE = 100000
+
+_cursor_ids = itertools.count()
+
+
+def build_query(symbols: list[str] = None, start: datetime.datetime = None, end: datetime.datetime = None, columns: list[str] = BARS_MINUTE_COLUMNS, table: str = PG_TABLE) -> tuple[str, dict]:
+    """
+    Build the SQL and parameters selecting columns for symbols within
+    [start, end), ordered by symbol and timestamp.
+    """
+    unknown = set(columns) - set(BARS_MINUTE_COLUMNS)
+    if unknown:
+        raise ValueError(f'unknown {table} column(s): {", ".join(sorted(unknown))}')
+
+    conditions = []
+    params = {}
+    if symbols is not None:
+        conditions.append('symbol = ANY(%(symbols)s)')
+        params['symbols'] = list(symbols)
+    if start is not None:
+        conditions.append('timestamp >= %(start)s')
+        params['start'] = start
+    if end is not None:
+        conditions.append('timestamp < %(end)s')
+        params['end'] = end
+
+    where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+    return f'SELECT {", ".join(columns)} FROM {table}{where} ORDER BY symbol, timestamp', params
+
+
+def iter_bars(conn, symbols: list[str] = None, start: datetime.datetime = None, end: datetime.datetime = None, columns: list[str] = BARS_MINUTE_COLUMNS, chunk_size: int = DEFAULT_CHUNK_SIZE, table: str = PG_TABLE):
+    """
+    Yield DataFrames of at most chunk_size bars for symbols within
+    [start, end). conn may be a SQLAlchemy Connection or a psycopg2
+    connection; the query runs on a named cursor inside its current
+    transaction.
+    """
+    dbapi_conn = conn.connection if isinstance(conn, Connection) else conn
+    query, params = build_query(symbols, start, end, columns, table)
+
+    cursor = dbapi_conn.cursor(name=f'{table}_chunks_{next(_cursor_ids)}')
+    cursor.itersize = chunk_size
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield pd.DataFrame.from_records(rows, columns=columns)
+    finally:
+        cursor.close()
+
+
+def ensure_indexes(conn: Connection, table: str = PG_TABLE):
+    """Create the (symbol, timestamp) index the chunked queries filter on."""
+    ensure_unique_index(conn, table)
+
+
+def partitioned_table_ddl(start_year: int, end_year: int, table: str = PG_TABLE) -> list[str]:
+    """
+    Return DDL statements creating {table}_partitioned, range-partitioned by
+    month on timestamp from start_year to end_year (inclusive) with the
+    (symbol, timestamp) key, and copying the existing rows into it. Swapping
+    it in for the original table (rename) is left to the operator.
+    """
+    partitioned = f'{table}_partitioned'
+    statements = [
+        f'CREATE TABLE {partitioned} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)',
+        f'ALTER TABLE {partitioned} ADD PRIMARY KEY (symbol, timestamp)',
+    ]
+
+    for year in range(start_year, end_year + 1):
+        for month in range(1, 13):
+            lower = datetime.date(year, month, 1)
+            upper = datetime.date(year + month // 12, month % 12 + 1, 1)
+            statements.append(f"CREATE TABLE {partitioned}_{year}{month:02d} PARTITION OF {partitioned} FOR VALUES FROM ('{lower}') TO ('{upper}')")
+
+    statements.append(f'CREATE TABLE {partitioned}_default PARTITION OF {partitioned} DEFAULT')
+    statements.append(f'INSERT INTO {partitioned} SELECT * FROM {table} ON CONFLICT DO NOTHING')
+    return statements
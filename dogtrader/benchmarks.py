@@ -0,0 +1,420 @@
+'''
+Offline benchmark suite of the data, feature and strategy paths.
+
+generate_corpus writes a synthetic minute-bar corpus shaped like the
+data/tickers v000 files (6:00 AM to 4:00 PM random-walk bars with overnight
+gaps, indicator columns computed by dogtrader.indicators, and meta files
+holding the file date's daily bar), seeded so every run sees the same data.
+prepare packs it into a columnar store and loads it into a database, and every
+case then times one path end to end:
+
+    csv_load              corpus.read_day over every day file
+    parquet_load          columnar_store.load_bars over the packed store
+    db_load               every bar back out of the database, in chunks
+    indicators            indicators.compute_frame over the raw bars
+    streaming_indicators  streaming_indicators.IndicatorBank, bar by bar
+    to_sql                DataFrame.to_sql of the raw bars
+    bulk_load             bulk_load.BulkWriter on PostgreSQL, one executemany transaction on SQLite
+    windowing             training_dataset.normalize_day and day_windows over every day
+    gap_replay            gap_backtest.corpus_days and run_backtest
+
+The database is a SQLite file in the work directory unless a PostgreSQL URL
+is given. Each case runs in a fresh process (so its peak RSS is its own) and
+is repeated, keeping the fastest run; the first run also pays for imports and
+the page cache. Results can be saved as a baseline JSON file and later runs
+compared against it:
+
+    context = benchmarks.prepare(work_dir)
+    report = benchmarks.to_json(benchmarks.run_cases(context), context)
+    regressions = benchmarks.compare(report, benchmarks.read_baseline(path))
+'''
+
+import collections
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+
+from dogtrader import columnar_store, corpus, indicators, trading_calendar
+from dogtrader.bulk_load import BARS_MINUTE_COLUMNS
+from dogtrader.paths import PROPERTIES_DIR
+
+BASELINE_PATH = os.path.join(PROPERTIES_DIR, 'benchmark-baseline.json')
+
+DEFAULT_SYMBOLS = 8
+DEFAULT_DAYS = 40
+DEFAULT_SEED = 0
+DEFAULT_REPEAT = 3
+DEFAULT_TOLERANCE = 0.25
+
+# smaller differences are timer and allocator noise, never regressions
+MIN_DIFFERENCE = {'seconds': 0.05, 'peak_rss_mb': 16.0}
+
+FIRST_DATE = datetime.date(2023, 1, 3)
+
+DB_CHUNK_SIZE = 100000
+TO_SQL_TABLE = 'bench_bars_to_sql'
+BULK_TABLE = 'bench_bars_bulk'
+QUERY_TABLE = 'bench_bars_query'
+
+# Context of a prepared run; bars_path is a Parquet file of the raw bars
+Context = collections.namedtuple('Context', ['work_dir', 'tickers_dir', 'store_dir', 'bars_path', 'db_url', 'config'])
+
+Result = collections.namedtuple('Result', ['case', 'seconds', 'rows', 'rows_per_second', 'peak_rss_mb'])
+
+
+#------------------------------------------------------------------------------
+# Synthetic corpus
+#------------------------------------------------------------------------------
+
+
+def symbol_names(count: int) -> list[str]:
+    """SYNA, SYNB, ..., SYNAA, ... (valid day file symbols)."""
+    names = []
+    for index in range(count):
+        letters = ''
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            letters = chr(ord('A') + remainder) + letters
+        names.append(f'SYN{letters}')
+    return names
+
+
+def synthetic_bars(symbols: list[str], dates: list[datetime.date], seed: int = DEFAULT_SEED) -> pd.DataFrame:
+    """
+    Random-walk minute bars (symbol, timestamp, open, high, low, close,
+    volume) from 6:00 AM to 4:00 PM New York time, with overnight gaps and a
+    few missing pre-market minutes.
+    """
+    rng = np.random.default_rng(seed)
+    minutes = np.arange(indicators.GRID_START, indicators.GRID_START + indicators.GRID_MINUTES)
+    pre_market = minutes < 9 * 60 + 30
+
+    frames = []
+    for symbol in symbols:
+        price = rng.uniform(20, 500)
+        for date in dates:
+            # overnight gap with fat tails, so the gap strategy trades now and then
+            price *= np.exp(rng.standard_t(3) * 0.01)
+            volatility = np.where(pre_market, 0.0004, 0.0009)
+            close = price * np.exp(np.cumsum(rng.normal(0, volatility)))
+            open = np.concatenate([[price], close[:-1]])
+            wick = np.abs(rng.normal(0, 0.0003, (2, len(minutes))))
+            high = np.maximum(open, close) * (1 + wick[0])
+            low = np.minimum(open, close) * (1 - wick[1])
+            volume = rng.lognormal(np.where(pre_market, 6, 9), 1).astype(np.int64) + 1
+            price = close[-1]
+
+            keep = ~(pre_market & (rng.random(len(minutes)) < 0.1))
+            keep[0] = True
+            midnight = pd.Timestamp(date, tz=trading_calendar.NEW_YORK)
+            frames.append(pd.DataFrame({
+                'symbol': symbol,
+                'timestamp': (midnight + pd.to_timedelta(minutes[keep], unit='min')).tz_convert('UTC'),
+                'open': open[keep].round(2),
+                'high': high[keep].round(2),
+                'low': low[keep].round(2),
+                'close': close[keep].round(2),
+                'volume': volume[keep],
+            }))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def daily_bar(bars: pd.DataFrame, date: datetime.date) -> dict:
+    """Meta fields of a day (the regular session's daily bar, like the Go generator's)."""
+    local = bars['timestamp'].dt.tz_convert(trading_calendar.NEW_YORK)
+    minutes = local.dt.hour * 60 + local.dt.minute
+    session = bars[(minutes >= 9 * 60 + 30) & (minutes < 16 * 60)]
+    typical = (session['high'] + session['low'] + session['close']) / 3
+    return {
+        'prev_date': date.strftime('%Y%m%d'),
+        'prev_open': float(session['open'].iloc[0]),
+        'prev_high': float(session['high'].max()),
+        'prev_low': float(session['low'].min()),
+        'prev_close': float(session['close'].iloc[-1]),
+        'prev_volume': int(session['volume'].sum()),
+        'prev_vwap': round(float((typical * session['volume']).sum() / session['volume'].sum()), 6),
+    }
+
+
+def generate_corpus(tickers_dir: str, symbols: list[str], dates: list[datetime.date], seed: int = DEFAULT_SEED, version: str = corpus.DEFAULT_VERSION) -> pd.DataFrame:
+    """Write v000-shaped day files of synthetic bars into tickers_dir and return the raw bars."""
+    bars = synthetic_bars(symbols, dates, seed)
+    rows = indicators.compute_frame(bars)
+    local_dates = bars['timestamp'].dt.tz_convert(trading_calendar.NEW_YORK).dt.date
+
+    for (symbol, date), day_rows in rows.groupby(['symbol', 'date'], sort=False):
+        day_bars = bars[(bars['symbol'] == symbol) & (local_dates == date)]
+        corpus.write_day(symbol, date, day_rows, daily_bar(day_bars, date), tickers_dir, version)
+
+    return bars
+
+
+def prepare(work_dir: str, symbols: int = DEFAULT_SYMBOLS, days: int = DEFAULT_DAYS, seed: int = DEFAULT_SEED, db_url: str = None) -> Context:
+    """Generate the corpus, pack it and load the query table; return the run's Context."""
+    tickers_dir = os.path.join(work_dir, 'tickers')
+    store_dir = os.path.join(work_dir, 'store')
+    bars_path = os.path.join(work_dir, 'bars.parquet')
+    if db_url is None:
+        db_url = f'sqlite:///{os.path.join(work_dir, "bench.sqlite")}'
+
+    calendar = trading_calendar.load_calendar()
+    dates = [session.date for session in calendar.sessions if session.date >= FIRST_DATE][:days]
+    names = symbol_names(symbols)
+
+    bars = generate_corpus(tickers_dir, names, dates, seed)
+    bars.to_parquet(bars_path, index=False)
+    for name in names:
+        columnar_store.pack_symbol(name, tickers_dir, store_dir, force=True)
+
+    context = Context(work_dir, tickers_dir, store_dir, bars_path, db_url, {
+        'symbols': symbols,
+        'days': len(dates),
+        'seed': seed,
+        'database': sqlalchemy.make_url(db_url).get_backend_name(),
+    })
+    with sqlalchemy.create_engine(db_url).connect() as conn:
+        _bulk_insert(conn, bars, QUERY_TABLE)
+    return context
+
+
+#------------------------------------------------------------------------------
+# Database helpers
+#------------------------------------------------------------------------------
+
+
+def _is_postgres(conn) -> bool:
+    return conn.dialect.name == 'postgresql'
+
+
+def _create_table(conn, table: str):
+    """(Re)create an empty bars table with a unique (symbol, timestamp) index."""
+    conn.exec_driver_sql(f'DROP TABLE IF EXISTS {table}')
+    if _is_postgres(conn):
+        conn.exec_driver_sql(f'CREATE TABLE {table} (symbol TEXT, timestamp TIMESTAMPTZ, open REAL, high REAL, low REAL, close REAL, volume BIGINT)')
+    else:
+        conn.exec_driver_sql(f'CREATE TABLE {table} (symbol TEXT, timestamp TEXT, open REAL, high REAL, low REAL, close REAL, volume INTEGER)')
+    conn.exec_driver_sql(f'CREATE UNIQUE INDEX {table}_key ON {table} (symbol, timestamp)')
+    conn.commit()
+
+
+def _bulk_insert(conn, bars: pd.DataFrame, table: str):
+    """Load bars into a fresh table the fastest way the database offers."""
+    _create_table(conn, table)
+    if _is_postgres(conn):
+        from dogtrader.bulk_load import BulkWriter
+        BulkWriter(conn, table).write(bars)
+        return
+
+    # SQLite has no COPY; one upserting executemany in one transaction is its bulk path
+    rows = bars[BARS_MINUTE_COLUMNS].assign(timestamp=bars['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S+00:00'))
+    dbapi = conn.connection.dbapi_connection
+    with dbapi:
+        dbapi.executemany(f'INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, ?, ?, ?, ?)', rows.itertuples(index=False, name=None))
+    conn.commit()
+
+
+#------------------------------------------------------------------------------
+# Cases
+#------------------------------------------------------------------------------
+
+
+def _day_files(context: Context) -> list[corpus.DayFile]:
+    return [day_file for symbol in corpus.list_symbols(context.tickers_dir) for day_file in corpus.list_day_files(symbol, context.tickers_dir)]
+
+
+def case_csv_load(context: Context) -> int:
+    return sum(len(corpus.read_day(day_file)) for day_file in _day_files(context))
+
+
+def case_parquet_load(context: Context) -> int:
+    return len(columnar_store.load_bars(store_dir=context.store_dir))
+
+
+def case_db_load(context: Context) -> int:
+    rows = 0
+    with sqlalchemy.create_engine(context.db_url).connect() as conn:
+        if _is_postgres(conn):
+            from dogtrader import bars_query
+            for chunk in bars_query.iter_bars(conn, chunk_size=DB_CHUNK_SIZE, table=QUERY_TABLE):
+                rows += len(chunk)
+        else:
+            query = f'SELECT {", ".join(BARS_MINUTE_COLUMNS)} FROM {QUERY_TABLE} ORDER BY symbol, timestamp'
+            for chunk in pd.read_sql_query(query, conn, chunksize=DB_CHUNK_SIZE):
+                rows += len(chunk)
+    return rows
+
+
+def case_indicators(context: Context) -> int:
+    return len(indicators.compute_frame(pd.read_parquet(context.bars_path)))
+
+
+def case_streaming_indicators(context: Context) -> int:
+    from dogtrader.streaming_indicators import IndicatorBank
+
+    bars = pd.read_parquet(context.bars_path).sort_values(['timestamp', 'symbol'])
+    bank = IndicatorBank()
+    timestamps = bars['timestamp'].dt.to_pydatetime()
+    for symbol, timestamp, high, low, close, volume in zip(bars['symbol'].tolist(), timestamps, bars['high'].tolist(), bars['low'].tolist(), bars['close'].tolist(), bars['volume'].tolist()):
+        bank.update(symbol, timestamp, high, low, close, volume)
+    return len(bars)
+
+
+def case_to_sql(context: Context) -> int:
+    bars = pd.read_parquet(context.bars_path)
+    with sqlalchemy.create_engine(context.db_url).connect() as conn:
+        _create_table(conn, TO_SQL_TABLE)
+        bars.to_sql(TO_SQL_TABLE, conn, if_exists='append', index=False)
+        conn.commit()
+    return len(bars)
+
+
+def case_bulk_load(context: Context) -> int:
+    bars = pd.read_parquet(context.bars_path)
+    with sqlalchemy.create_engine(context.db_url).connect() as conn:
+        _bulk_insert(conn, bars, BULK_TABLE)
+    return len(bars)
+
+
+def case_windowing(context: Context) -> int:
+    from dogtrader import training_dataset
+
+    windows = 0
+    for day_file in _day_files(context):
+        features = training_dataset.normalize_day(corpus.read_day(day_file, with_meta=False))
+        windows += len(training_dataset.day_windows(features, training_dataset.DEFAULT_WINDOW)[0])
+    return windows
+
+
+def case_gap_replay(context: Context) -> int:
+    from dogtrader import gap_backtest
+
+    days = list(gap_backtest.corpus_days(tickers_dir=context.tickers_dir))
+    gap_backtest.run_backtest(days)
+    return sum(len(day.minutes) for day in days)
+
+
+CASES = {
+    'csv_load': case_csv_load,
+    'parquet_load': case_parquet_load,
+    'db_load': case_db_load,
+    'indicators': case_indicators,
+    'streaming_indicators': case_streaming_indicators,
+    'to_sql': case_to_sql,
+    'bulk_load': case_bulk_load,
+    'windowing': case_windowing,
+    'gap_replay': case_gap_replay,
+}
+
+
+#------------------------------------------------------------------------------
+# Running and comparing
+#------------------------------------------------------------------------------
+
+
+def _run_in_process(case: str, context: Context, repeat: int) -> Result:
+    """Run a case repeat times in this (fresh) process; keep the fastest run."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = CASES[case](context)
+        seconds = time.perf_counter() - started
+        best = seconds if best is None else min(best, seconds)
+
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+    return Result(case, best, rows, rows / best if best > 0 else 0.0, peak_mb)
+
+
+def run_case(case: str, context: Context, repeat: int = DEFAULT_REPEAT) -> Result:
+    """Run a case in a fresh process and return its Result."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(_run_in_process, case, context, repeat).result()
+
+
+def run_cases(context: Context, cases: list[str] = None, repeat: int = DEFAULT_REPEAT) -> list[Result]:
+    results = []
+    for case in cases or list(CASES):
+        result = run_case(case, context, repeat)
+        print(f'[ INFO ] {case:<21}{result.seconds:9.3f}s {result.rows_per_second:14,.0f} rows/s {result.peak_rss_mb:9.1f} MiB')
+        results.append(result)
+    return results
+
+
+# timings are only comparable on the same interpreter, platform and CPU count
+MACHINE_FIELDS = ['python', 'platform', 'cpus']
+
+
+def environment() -> dict:
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sqlite': sqlite3.sqlite_version,
+    }
+
+
+def to_json(results: list[Result], context: Context) -> dict:
+    return {
+        'config': context.config,
+        'environment': environment(),
+        'results': {result.case: {field: getattr(result, field) for field in Result._fields[1:]} for result in results},
+    }
+
+
+def read_baseline(path: str = BASELINE_PATH) -> dict:
+    with open(path) as file:
+        return json.load(file)
+
+
+def write_baseline(report: dict, path: str = BASELINE_PATH):
+    with open(path, 'w') as file:
+        json.dump(report, file, indent=2)
+        file.write('\n')
+
+
+def environment_differences(report: dict, baseline: dict) -> list[str]:
+    """Describe every MACHINE_FIELDS value of report which differs from the baseline's."""
+    ours = report.get('environment', {})
+    theirs = baseline.get('environment', {})
+    return [f'{field} {ours.get(field)} (baseline {theirs.get(field)})' for field in MACHINE_FIELDS if ours.get(field) != theirs.get(field)]
+
+
+def compare(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE, check_environment: bool = True) -> list[str]:
+    """
+    Describe every case whose time or peak RSS grew by more than tolerance
+    (a fraction) and MIN_DIFFERENCE over the baseline. Raises ValueError when the baseline was
+    run on a different corpus or database, or (with check_environment) on a
+    different machine.
+    """
+    if report['config'] != baseline['config']:
+        raise ValueError(f'baseline config {baseline["config"]} does not match {report["config"]}')
+    differences = environment_differences(report, baseline)
+    if check_environment and differences:
+        raise ValueError(f'baseline was run on another machine: {", ".join(differences)}')
+
+    regressions = []
+    for case, result in report['results'].items():
+        previous = baseline['results'].get(case)
+        if previous is None:
+            continue
+        for field, unit in (('seconds', 's'), ('peak_rss_mb', ' MiB')):
+            grown = result[field] - previous[field]
+            if grown > previous[field] * tolerance and grown > MIN_DIFFERENCE[field]:
+                regressions.append(f'{case} {field}: {result[field]:.3f}{unit} vs {previous[field]:.3f}{unit} ({result[field] / previous[field] - 1:+.0%})')
+    return regressions
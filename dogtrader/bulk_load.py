@@ -0,0 +1,104 @@
+'''
+Bulk, idempotent writer for the bars_minute PostgreSQL table.
+
+DataFrame.to_sql inserts row by row and appends duplicates when a day is
+loaded twice. BulkWriter instead streams each batch as CSV through
+COPY FROM STDIN into a staging table, then merges it into bars_minute with a
+single INSERT ... ON CONFLICT (symbol, timestamp) DO UPDATE, so re-running a
+load overwrites rows instead of duplicating them.
+
+The staging table is a session-local temporary table. Temporary tables are
+never WAL-logged (like UNLOGGED tables) and are private to the connection, so
+concurrent loaders cannot see each other's batches.
+
+Requires psycopg2 as the SQLAlchemy driver (for cursor.copy_expert).
+'''
+
+import io
+import time
+
+import pandas as pd
+from sqlalchemy import Connection
+
+PG_TABLE = 'bars_minute'
+
+# columns of bars_minute, in COPY order
+BARS_MINUTE_COLUMNS = ['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+UNIQUE_INDEX = 'bars_minute_symbol_timestamp_key'
+
+
+def ensure_unique_index(conn: Connection, table: str = PG_TABLE):
+    """
+    Create the unique (symbol, timestamp) index ON CONFLICT relies on, first
+    deleting duplicate rows left behind by earlier appends. Does nothing if
+    the index already exists. Commits.
+    """
+    exists = conn.exec_driver_sql('SELECT 1 FROM pg_indexes WHERE tablename = %s AND indexname = %s', (table, UNIQUE_INDEX)).first()
+    if exists:
+        return
+
+    print(f'[ INFO ] Removing duplicate rows and creating unique index {UNIQUE_INDEX}...')
+    conn.exec_driver_sql(f'''
+        DELETE FROM {table} a USING {table} b
+        WHERE a.symbol = b.symbol AND a.timestamp = b.timestamp AND a.ctid > b.ctid
+    ''')
+    conn.exec_driver_sql(f'CREATE UNIQUE INDEX {UNIQUE_INDEX} ON {table} (symbol, timestamp)')
+    conn.commit()
+
+
+class BulkWriter:
+    """Writes DataFrames of minute bars to bars_minute via COPY and upsert, tracking throughput."""
+
+    def __init__(self, conn: Connection, table: str = PG_TABLE):
+        self.conn = conn
+        self.table = table
+        self.staging_table = f'{table}_staging'
+        self.rows = 0
+        self.seconds = 0.0
+
+    def write(self, df: pd.DataFrame, commit: bool = True) -> int:
+        """Upsert the rows of df (which must have BARS_MINUTE_COLUMNS) and return the row count."""
+        if len(df) == 0:
+            return 0
+
+        started = time.perf_counter()
+
+        # serialize the batch once as CSV for COPY
+        buffer = io.StringIO()
+        df[BARS_MINUTE_COLUMNS].to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S%z')
+        buffer.seek(0)
+
+        columns = ', '.join(BARS_MINUTE_COLUMNS)
+        updates = ', '.join(f'{column} = EXCLUDED.{column}' for column in BARS_MINUTE_COLUMNS[2:])
+
+        # (re)create the staging table; it disappears if a transaction is rolled back
+        self.conn.exec_driver_sql(f'CREATE TEMP TABLE IF NOT EXISTS {self.staging_table} (LIKE {self.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS')
+        self.conn.exec_driver_sql(f'TRUNCATE {self.staging_table}')
+
+        # stream the batch into staging on the connection's current transaction
+        cursor = self.conn.connection.cursor()
+        cursor.copy_expert(f'COPY {self.staging_table} ({columns}) FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.close()
+
+        # merge into the real table; DISTINCT ON keeps a batch with duplicates from conflicting with itself
+        self.conn.exec_driver_sql(f'''
+            INSERT INTO {self.table} ({columns})
+            SELECT DISTINCT ON (symbol, timestamp) {columns} FROM {self.staging_table}
+            ORDER BY symbol, timestamp
+            ON CONFLICT (symbol, timestamp) DO UPDATE SET {updates}
+        ''')
+
+        if commit:
+            self.conn.commit()
+
+        elapsed = time.perf_counter() - started
+        self.rows += len(df)
+        self.seconds += elapsed
+        print(f'[ INFO ] Upserted {len(df)} rows into {self.table} in {elapsed:.2f}s ({len(df) / max(elapsed, 1e-9):,.0f} rows/sec)')
+
+        return len(df)
+
+    def rows_per_second(self) -> float:
+        """Return the average throughput of all writes so far."""
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
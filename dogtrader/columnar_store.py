@@ -0,0 +1,168 @@
+'''
+Columnar store for the data/tickers corpus.
+
+The per-day CSV and meta JSON files are packed into one zstd-compressed Parquet
+file per ticker-month, laid out as a hive-partitioned dataset:
+
+    data/store/vXXX/symbol=AAPL/month=202301/AAPL_202301.parquet
+
+Prices and indicators are float32, volumes are int64 and the meta fields are
+folded into every row, so a loader never has to open the small files again.
+Reads go through pyarrow.dataset with memory-mapped files, and symbol, month,
+date and timestamp filters are pushed down so only the matching partitions and
+row groups are touched.
+'''
+
+import datetime
+import itertools
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+
+from dogtrader import corpus
+from dogtrader.paths import STORE_DIR, TICKERS_DIR
+
+COMPRESSION = 'zstd'
+
+SCHEMA = pa.schema(
+    [
+        ('date', pa.date32()),
+        ('timestamp', pa.timestamp('ns', tz=corpus.NEW_YORK)),
+        ('open', pa.float32()),
+        ('high', pa.float32()),
+        ('low', pa.float32()),
+        ('close', pa.float32()),
+        ('volume', pa.int64()),
+        ('VWAP', pa.float32()),
+        ('5SMA', pa.float32()),
+        ('8SMA', pa.float32()),
+        ('13SMA', pa.float32()),
+        ('12EMA', pa.float32()),
+        ('26EMA', pa.float32()),
+        ('MACD', pa.float32()),
+        ('MACDS', pa.float32()),
+        ('RSI', pa.float32()),
+        ('prev_date', pa.date32()),
+        ('prev_open', pa.float32()),
+        ('prev_high', pa.float32()),
+        ('prev_low', pa.float32()),
+        ('prev_close', pa.float32()),
+        ('prev_volume', pa.int64()),
+        ('prev_vwap', pa.float32()),
+    ]
+)
+
+PARTITIONING = ds.partitioning(pa.schema([('symbol', pa.string()), ('month', pa.int32())]), flavor='hive')
+
+
+def month_key(date: datetime.date) -> int:
+    """Return the YYYYMM partition key of a date."""
+    return date.year * 100 + date.month
+
+
+def month_path(symbol: str, month: int, store_dir: str = STORE_DIR, version: str = corpus.DEFAULT_VERSION) -> str:
+    """Return the path of the Parquet file holding a ticker-month."""
+    return os.path.join(store_dir, version, f'symbol={symbol}', f'month={month}', f'{symbol}_{month}.parquet')
+
+
+def pack_symbol(symbol: str, tickers_dir: str = TICKERS_DIR, store_dir: str = STORE_DIR, version: str = corpus.DEFAULT_VERSION, force: bool = False) -> list[str]:
+    """
+    Pack every day file of a symbol into ticker-month Parquet files.
+
+    A month is only rewritten when one of its day files is newer than the
+    existing Parquet file (or force is set). Returns the paths written.
+    """
+    written = []
+    day_files = corpus.list_day_files(symbol, tickers_dir, version)
+
+    for month, month_days in itertools.groupby(day_files, key=lambda day_file: month_key(day_file.date)):
+        month_days = list(month_days)
+        output_path = month_path(symbol, month, store_dir, version)
+
+        # skip months whose packed file is newer than all of their sources
+        if not force and os.path.exists(output_path):
+            packed_mtime = os.path.getmtime(output_path)
+            newest_source = max(max(os.path.getmtime(d.data_path), os.path.getmtime(d.meta_path)) for d in month_days)
+            if newest_source <= packed_mtime:
+                continue
+
+        df = pd.concat([corpus.read_day(day_file) for day_file in month_days], ignore_index=True)
+        table = pa.Table.from_pandas(df, schema=SCHEMA, preserve_index=False)
+
+        # one row group per month keeps files small; partition keys do the coarse pruning
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        pq.write_table(table, output_path, compression=COMPRESSION, row_group_size=len(df))
+        written.append(output_path)
+
+    return written
+
+
+def open_dataset(store_dir: str = STORE_DIR, version: str = corpus.DEFAULT_VERSION) -> ds.Dataset:
+    """Open the packed store of a file version as a memory-mapped dataset."""
+    filesystem = pyarrow.fs.LocalFileSystem(use_mmap=True)
+    return ds.dataset(os.path.join(store_dir, version), format='parquet', partitioning=PARTITIONING, filesystem=filesystem)
+
+
+def build_filter(symbols=None, start=None, end=None):
+    """
+    Build a dataset filter for symbols and an inclusive [start, end] range.
+
+    start and end may be datetime.date objects (filtered on the date column)
+    or timezone-aware datetime.datetime objects (filtered on the timestamp
+    column). The month partition key is always constrained as well so whole
+    files are skipped without being opened.
+    """
+    expression = None
+
+    def combine(condition):
+        return condition if expression is None else expression & condition
+
+    if symbols is not None:
+        expression = combine(ds.field('symbol').isin(list(symbols)))
+
+    for bound, is_start in ((start, True), (end, False)):
+        if bound is None:
+            continue
+
+        if isinstance(bound, datetime.datetime):
+            if bound.tzinfo is None:
+                raise ValueError('datetime bounds must be timezone-aware')
+            bound = pd.Timestamp(bound).tz_convert(corpus.NEW_YORK)
+            month = month_key(bound.date())
+            column, value = ds.field('timestamp'), pa.scalar(bound, type=SCHEMA.field('timestamp').type)
+        else:
+            month = month_key(bound)
+            column, value = ds.field('date'), pa.scalar(bound, type=pa.date32())
+
+        if is_start:
+            expression = combine((ds.field('month') >= month) & (column >= value))
+        else:
+            expression = combine((ds.field('month') <= month) & (column <= value))
+
+    return expression
+
+
+def load_bars(symbols=None, start=None, end=None, columns: list[str] = None, store_dir: str = STORE_DIR, version: str = corpus.DEFAULT_VERSION) -> pd.DataFrame:
+    """
+    Load packed bars for symbols between start and end (inclusive) as a
+    DataFrame sorted by symbol and timestamp. See build_filter for the
+    accepted bound types.
+    """
+    if columns is not None:
+        columns = ['symbol'] + [column for column in columns if column != 'symbol']
+
+    table = open_dataset(store_dir, version).to_table(columns=columns, filter=build_filter(symbols, start, end))
+
+    # the partition key is only useful for pruning, not to callers
+    if 'month' in table.column_names:
+        table = table.drop(['month'])
+    table = table.select(['symbol'] + [name for name in table.column_names if name != 'symbol'])
+
+    if 'timestamp' in table.column_names:
+        table = table.sort_by([('symbol', 'ascending'), ('timestamp', 'ascending')])
+
+    return table.to_pandas()
@@ -0,0 +1,140 @@
+'''
+Helpers for the per-day files written by data/generation into data/tickers.
+
+Each trading day of each ticker is stored as a pair of files:
+
+    data/tickers/SYMBOL/SYMBOL_YYYYMMDD_data_vXXX.csv
+    data/tickers/SYMBOL/SYMBOL_YYYYMMDD_meta_vXXX.json
+
+The data file holds minute bars and indicators from 9:00 AM to 4:00 PM New York
+time, and the meta file holds the daily bar of the last market day up to 6:00 AM
+of the file date, which (despite its prev_* field names) is the daily bar of the
+file date itself, as prev_date shows.
+'''
+
+import collections
+import datetime
+import json
+import os
+import re
+
+import pandas as pd
+
+from dogtrader.paths import TICKERS_DIR
+
+DEFAULT_VERSION = 'v000'
+
+NEW_YORK = 'America/New_York'
+
+# column types of the data files (everything except volume is a float)
+FLOAT_COLUMNS = ['open', 'high', 'low', 'close', 'VWAP', '5SMA', '8SMA', '13SMA', '12EMA', '26EMA', 'MACD', 'MACDS', 'RSI']
+INT_COLUMNS = ['volume']
+DATA_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume', 'VWAP', '5SMA', '8SMA', '13SMA', '12EMA', '26EMA', 'MACD', 'MACDS', 'RSI']
+
+# fields of the meta files (prev_date is a YYYYMMDD string)
+META_FLOAT_FIELDS = ['prev_open', 'prev_high', 'prev_low', 'prev_close', 'prev_vwap']
+META_INT_FIELDS = ['prev_volume']
+META_FIELDS = ['prev_date'] + META_FLOAT_FIELDS + META_INT_FIELDS
+
+DAY_FILENAME = re.compile(r'^(?P<symbol>[A-Z.]+)_(?P<date>\d{8})_(?P<kind>data|meta)_(?P<version>v\d{3})\.(csv|json)$')
+
+DayFile = collections.namedtuple('DayFile', ['symbol', 'date', 'version', 'data_path', 'meta_path'])
+
+
+def parse_day_filename(filename: str):
+    """Return (symbol, date, kind, version) for a day file name, or None."""
+    match = DAY_FILENAME.match(os.path.basename(filename))
+    if match is None:
+        return None
+    date = datetime.datetime.strptime(match['date'], '%Y%m%d').date()
+    return match['symbol'], date, match['kind'], match['version']
+
+
+def list_symbols(tickers_dir: str = TICKERS_DIR) -> list[str]:
+    """List the ticker symbols that have a directory in tickers_dir."""
+    return sorted(name for name in os.listdir(tickers_dir) if os.path.isdir(os.path.join(tickers_dir, name)))
+
+
+def list_day_files(symbol: str, tickers_dir: str = TICKERS_DIR, version: str = DEFAULT_VERSION) -> list[DayFile]:
+    """List the (data, meta) file pairs of a symbol in date order."""
+    symbol_dir = os.path.join(tickers_dir, symbol)
+    dates = set()
+    for filename in os.listdir(symbol_dir):
+        parsed = parse_day_filename(filename)
+        if parsed is not None and parsed[0] == symbol and parsed[3] == version:
+            dates.add(parsed[1])
+
+    day_files = []
+    for date in sorted(dates):
+        yyyymmdd = date.strftime('%Y%m%d')
+        data_path = os.path.join(symbol_dir, f'{symbol}_{yyyymmdd}_data_{version}.csv')
+        meta_path = os.path.join(symbol_dir, f'{symbol}_{yyyymmdd}_meta_{version}.json')
+
+        # a day is only usable when both of its files exist
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            day_files.append(DayFile(symbol, date, version, data_path, meta_path))
+
+    return day_files
+
+
+def day_file_from_path(data_path: str) -> DayFile:
+    """Build the DayFile of a data file path (its meta file sits next to it)."""
+    symbol, date, kind, version = parse_day_filename(data_path)
+    meta_path = os.path.join(os.path.dirname(data_path), f'{symbol}_{date.strftime("%Y%m%d")}_meta_{version}.json')
+    return DayFile(symbol, date, version, data_path, meta_path)
+
+
+def read_meta(meta_path: str) -> dict:
+    """Read a meta file, converting prev_date to a datetime.date."""
+    with open(meta_path) as file:
+        meta = json.load(file)
+    meta['prev_date'] = datetime.datetime.strptime(meta['prev_date'], '%Y%m%d').date()
+    return meta
+
+
+def read_day(day_file: DayFile, with_meta: bool = True) -> pd.DataFrame:
+    """
+    Read one day file into a DataFrame with float32/int64 columns, a
+    timezone-aware timestamp column and (optionally) the meta fields repeated
+    on every row.
+    """
+    dtypes = {column: 'float32' for column in FLOAT_COLUMNS}
+    dtypes.update({column: 'int64' for column in INT_COLUMNS})
+    dtypes['time'] = 'str'
+    df = pd.read_csv(day_file.data_path, dtype=dtypes)
+
+    # build timestamps from the file date and the HH:MM column
+    timestamps = pd.to_datetime(day_file.date.isoformat() + ' ' + df['time'], format='%Y-%m-%d %H:%M')
+    df.insert(0, 'timestamp', timestamps.dt.tz_localize(NEW_YORK))
+    df.insert(0, 'date', day_file.date)
+    df.drop('time', axis=1, inplace=True)
+
+    if with_meta:
+        meta = read_meta(day_file.meta_path)
+        df['prev_date'] = meta['prev_date']
+        for field in META_FLOAT_FIELDS:
+            df[field] = pd.Series(meta[field], index=df.index, dtype='float32')
+        for field in META_INT_FIELDS:
+            df[field] = pd.Series(meta[field], index=df.index, dtype='int64')
+
+    return df
+
+
+def write_day(symbol: str, date: datetime.date, rows: pd.DataFrame, meta: dict, tickers_dir: str = TICKERS_DIR, version: str = DEFAULT_VERSION) -> DayFile:
+    """
+    Write the data file (rows with DATA_COLUMNS) and meta file (META_FIELDS,
+    prev_date as YYYYMMDD) of a day in the Go generator's format, replacing
+    existing files atomically.
+    """
+    symbol_dir = os.path.join(tickers_dir, symbol)
+    os.makedirs(symbol_dir, exist_ok=True)
+    yyyymmdd = date.strftime('%Y%m%d')
+    day_file = DayFile(symbol, date, version, os.path.join(symbol_dir, f'{symbol}_{yyyymmdd}_data_{version}.csv'), os.path.join(symbol_dir, f'{symbol}_{yyyymmdd}_meta_{version}.json'))
+
+    rows[DATA_COLUMNS].to_csv(day_file.data_path + '.tmp', index=False, float_format='%.3f')
+    with open(day_file.meta_path + '.tmp', 'w') as file:
+        json.dump(meta, file, separators=(',', ':'))
+
+    os.replace(day_file.data_path + '.tmp', day_file.data_path)
+    os.replace(day_file.meta_path + '.tmp', day_file.meta_path)
+    return day_file
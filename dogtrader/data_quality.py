@@ -0,0 +1,556 @@
+'''
+Data-quality checks and repairs of the data/tickers day files and bars_minute.
+
+check_files reads every data file of the corpus into one frame (with pyarrow,
+only the time and OHLCV columns) and checks all of them at once with array
+operations, so a full scan is a fraction of a second. check_db runs the same
+checks inside PostgreSQL as one GROUP BY over bars_minute. Both return a
+manifest with one row per (symbol, day):
+
+    symbol, date, flags, rows, first_minute, last_minute, missing, duplicates, outside, bad_ohlc
+
+where flags is a bitwise OR of the issue flags below (0 for a clean day) and
+minutes are minutes since midnight New York time. Sessions come from the
+holiday calendar: the generator skips holidays and early closes, so a clean
+day file has exactly EXPECTED_ROWS rows from 9:00 AM to 4:00 PM, while
+bars_minute is expected to hold every minute of the regular session (9:30 AM to
+the calendar close). Days outside of the calendar's years are flagged
+OUTSIDE_CALENDAR rather than treated as closed, and missing days are only
+reported within the calendar. Manifests are small Parquet files in data/store, so
+downstream jobs can select clean, fixed-shape days without per-row checks:
+
+    manifest = data_quality.read_manifest()
+    days = data_quality.clean_days(manifest)
+
+repair_files and repair_db refetch only the flagged (symbol, day) slices,
+grouping consecutive bad sessions of a symbol into one request
+(dogtrader.backfill.fetch_chunks). Repaired day files are recomputed with
+dogtrader.indicators and padded to 4:00 PM with flat zero-volume bars, the
+way the generator fills gaps between bars; bars_minute slices are upserted
+with dogtrader.bulk_load.BulkWriter after duplicates have been removed.
+'''
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+from alpaca.data.requests import StockBarsRequest
+from alpaca.data.timeframe import TimeFrame
+from sqlalchemy import text
+
+from dogtrader import backfill, bulk_load, corpus, indicators, trading_calendar
+from dogtrader.paths import STORE_DIR, TICKERS_DIR
+
+# issue flags of a (symbol, day)
+MISSING_DAY = 1          # a session without a day file (or without bars in bars_minute)
+UNEXPECTED_DAY = 2       # a day file on a weekend, holiday or early close, or bars on a closed day
+MISSING_MINUTES = 4      # expected minutes without a bar
+DUPLICATE_MINUTES = 8    # more than one bar for a minute
+OUT_OF_WINDOW = 16       # bars outside the expected window, or out of order in a file
+BAD_OHLC = 32            # low above open/close, high below them, non-positive prices or negative volume
+STALE_META = 64          # meta prev_date is not the file date
+META_MISMATCH = 128      # meta prev_high/prev_low disagree with the day's regular-session bars
+UNREADABLE = 256         # the data or meta file could not be parsed
+OUTSIDE_CALENDAR = 512   # a day outside of the holiday calendar's years, so whether it is a session is unknown
+
+FLAG_NAMES = {
+    MISSING_DAY: 'missing day',
+    UNEXPECTED_DAY: 'unexpected day',
+    MISSING_MINUTES: 'missing minutes',
+    DUPLICATE_MINUTES: 'duplicate minutes',
+    OUT_OF_WINDOW: 'out of window',
+    BAD_OHLC: 'bad OHLC',
+    STALE_META: 'stale meta',
+    META_MISMATCH: 'meta mismatch',
+    UNREADABLE: 'unreadable',
+    OUTSIDE_CALENDAR: 'outside calendar',
+}
+
+# unexpected days and days outside of the calendar are reported but never refetched
+REPAIR_FLAGS = sum(FLAG_NAMES) & ~(UNEXPECTED_DAY | OUTSIDE_CALENDAR)
+
+MANIFEST_COLUMNS = ['symbol', 'date', 'flags', 'rows', 'first_minute', 'last_minute', 'missing', 'duplicates', 'outside', 'bad_ohlc']
+
+# rows of a day file: 9:00 AM to 4:00 PM inclusive
+FILE_START_MINUTE = 9 * 60
+FILE_END_MINUTE = 16 * 60
+EXPECTED_ROWS = FILE_END_MINUTE - FILE_START_MINUTE + 1
+
+REGULAR_OPEN_MINUTE = 9 * 60 + 30
+
+# bars_minute collection window of load-bars-minute.py (1:00 PM on early closes)
+COLLECT_START = datetime.time(8, 0)
+COLLECT_END = datetime.time(18, 0)
+
+# relative difference allowed between the meta high/low and the day's minute bars
+META_TOLERANCE = 0.005
+
+# bars the generator fetches for a day file (indicators warm up from 6:00 AM)
+FETCH_START = datetime.time(6, 0)
+FETCH_END = datetime.time(16, 0)
+
+# the generator skips a day whose first bar is not before 8:05 AM or has no volume
+FIRST_BAR_DEADLINE = 8 * 60 + 5
+
+_CONVERT_OPTIONS = pacsv.ConvertOptions(include_columns=['time', 'open', 'high', 'low', 'close', 'volume'], column_types={'time': pa.string()})
+
+
+def manifest_path(version: str = corpus.DEFAULT_VERSION, store_dir: str = STORE_DIR) -> str:
+    return os.path.join(store_dir, f'quality_{version}.parquet')
+
+
+def db_manifest_path(table: str = bulk_load.PG_TABLE, store_dir: str = STORE_DIR) -> str:
+    return os.path.join(store_dir, f'quality_{table}.parquet')
+
+
+def write_manifest(manifest: pd.DataFrame, path: str):
+    """Write a manifest atomically."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.Table.from_pandas(manifest[MANIFEST_COLUMNS], preserve_index=False), path + '.tmp', compression='zstd')
+    os.replace(path + '.tmp', path)
+
+
+def read_manifest(path: str = None) -> pd.DataFrame:
+    """Read a manifest (default: the day files manifest), with dates as datetime.date."""
+    return pq.read_table(path or manifest_path()).to_pandas()
+
+
+def update_manifest(manifest: pd.DataFrame, path: str, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None) -> pd.DataFrame:
+    """
+    Replace the rows of symbols (default: all) between start and end in the
+    manifest at path, if there is one, with those of manifest; write and
+    return the result.
+    """
+    if os.path.exists(path) and (symbols is not None or start is not None or end is not None):
+        previous = read_manifest(path)
+        checked = previous['symbol'].isin(symbols) if symbols is not None else pd.Series(True, index=previous.index)
+        if start is not None:
+            checked &= previous['date'] >= start
+        if end is not None:
+            checked &= previous['date'] <= end
+        manifest = _finish(pd.concat([previous[~checked], manifest], ignore_index=True))
+
+    write_manifest(manifest, path)
+    return manifest
+
+
+def clean_days(manifest: pd.DataFrame) -> pd.DataFrame:
+    """(symbol, date) of the days without any issue."""
+    return manifest.loc[manifest['flags'] == 0, ['symbol', 'date']].reset_index(drop=True)
+
+
+def bad_days(manifest: pd.DataFrame, flags: int = REPAIR_FLAGS) -> dict[str, list[datetime.date]]:
+    """Dates with any of flags set, by symbol."""
+    bad = manifest[(manifest['flags'] & flags) != 0]
+    return {symbol: sorted(group['date']) for symbol, group in bad.groupby('symbol')}
+
+
+def flag_counts(manifest: pd.DataFrame) -> dict[str, int]:
+    """Number of days with each flag set."""
+    flags = manifest['flags'].to_numpy()
+    return {name: int(np.count_nonzero(flags & flag)) for flag, name in FLAG_NAMES.items()}
+
+
+def describe_flags(flags: int) -> str:
+    return ', '.join(name for flag, name in FLAG_NAMES.items() if flags & flag) or 'ok'
+
+
+def expected_days(symbol_ranges: dict[str, tuple[datetime.date, datetime.date]], calendar: trading_calendar.TradingCalendar, early_closes: bool) -> pd.DataFrame:
+    """(symbol, date) of every session in each symbol's date range, optionally without early closes."""
+    frames = []
+    for symbol, (start, end) in symbol_ranges.items():
+        dates = [session.date for session in calendar.sessions_between(start, end) if early_closes or not session.early_close]
+        frames.append(pd.DataFrame({'symbol': symbol, 'date': dates}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['symbol', 'date'])
+
+
+def _add_missing_days(manifest: pd.DataFrame, expected: pd.DataFrame) -> pd.DataFrame:
+    # sessions without any rows become all-zero rows flagged as missing
+    merged = expected.merge(manifest[['symbol', 'date']], how='left', on=['symbol', 'date'], indicator=True)
+    missing = merged.loc[merged['_merge'] == 'left_only', ['symbol', 'date']]
+    if missing.empty:
+        return manifest
+    missing = missing.assign(flags=MISSING_DAY, rows=0, first_minute=-1, last_minute=-1, missing=0, duplicates=0, outside=0, bad_ohlc=0)
+    return pd.concat([manifest, missing], ignore_index=True)
+
+
+def _finish(manifest: pd.DataFrame) -> pd.DataFrame:
+    manifest = manifest[MANIFEST_COLUMNS].sort_values(['symbol', 'date']).reset_index(drop=True)
+    manifest['flags'] = manifest['flags'].astype(np.int32)
+    for column in ('rows', 'missing', 'duplicates', 'outside', 'bad_ohlc'):
+        manifest[column] = manifest[column].astype(np.int32)
+    for column in ('first_minute', 'last_minute'):
+        manifest[column] = manifest[column].astype(np.int16)
+    return manifest
+
+
+def _in_range(date: datetime.date, calendar: trading_calendar.TradingCalendar) -> datetime.date:
+    return min(max(date, calendar.first_date), calendar.last_date)
+
+
+#------------------------------------------------------------------------------
+# Day files
+#------------------------------------------------------------------------------
+
+
+def read_minutes(day_files: list[corpus.DayFile]) -> tuple[pd.DataFrame, list[int]]:
+    """
+    Read the time and OHLCV columns of all data files into one frame with a
+    file column (index into day_files) and a minute column (minutes since
+    midnight, NaN if the time does not parse). Also returns the indexes of
+    files which could not be read.
+    """
+    tables = []
+    unreadable = []
+    for index, day_file in enumerate(day_files):
+        try:
+            table = pacsv.read_csv(day_file.data_path, convert_options=_CONVERT_OPTIONS)
+        except (OSError, pa.ArrowInvalid, KeyError):
+            unreadable.append(index)
+            continue
+        tables.append(table.append_column('file', pa.array(np.full(len(table), index, dtype=np.int32))))
+
+    if not tables:
+        return pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close', 'volume', 'file', 'minute']), unreadable
+
+    frame = pa.concat_tables(tables).to_pandas()
+    hours = pd.to_numeric(frame['time'].str.slice(0, 2), errors='coerce')
+    minutes = pd.to_numeric(frame['time'].str.slice(3, 5), errors='coerce')
+    frame['minute'] = (hours * 60 + minutes).where(frame['time'].str.len() == 5)
+    return frame, unreadable
+
+
+def check_files(day_files: list[corpus.DayFile], calendar: trading_calendar.TradingCalendar = None, start: datetime.date = None, end: datetime.date = None) -> pd.DataFrame:
+    """
+    Check day files and return their manifest, including rows for sessions
+    missing between each symbol's first and last file (or start and end).
+    """
+    calendar = calendar or trading_calendar.load_calendar()
+    count = len(day_files)
+    frame, unreadable = read_minutes(day_files)
+
+    file = frame['file'].to_numpy(dtype=np.intp)
+    minute = frame['minute'].to_numpy(dtype=np.float64)
+    open, high, low, close = (frame[column].to_numpy(dtype=np.float64) for column in ('open', 'high', 'low', 'close'))
+    volume = frame['volume'].to_numpy(dtype=np.float64)
+
+    # per row checks (comparisons with NaN are False, so missing values fail them)
+    in_range = (minute >= FILE_START_MINUTE) & (minute <= FILE_END_MINUTE)
+    duplicate = frame.duplicated(['file', 'minute']).to_numpy() & in_range
+    same_file = np.r_[False, file[1:] == file[:-1]]
+    backwards = same_file & (minute < np.r_[np.nan, minute[:-1]])
+    valid_ohlc = (low <= open) & (low <= close) & (high >= open) & (high >= close) & (low > 0) & (volume >= 0)
+
+    rows = np.bincount(file, minlength=count)
+    present = np.bincount(file[in_range & ~duplicate], minlength=count)
+    duplicates = np.bincount(file[duplicate], minlength=count)
+    outside = np.bincount(file[~in_range | backwards], minlength=count)
+    bad_ohlc = np.bincount(file[~valid_ohlc], minlength=count)
+
+    by_file = pd.DataFrame({'file': file, 'minute': minute}).groupby('file')['minute']
+    first_minute = by_file.min().reindex(range(count)).fillna(-1).to_numpy()
+    last_minute = by_file.max().reindex(range(count)).fillna(-1).to_numpy()
+
+    # regular-session high and low, compared with the meta file's daily bar
+    regular = in_range & (minute >= REGULAR_OPEN_MINUTE) & (minute < FILE_END_MINUTE)
+    session = pd.DataFrame({'file': file[regular], 'high': high[regular], 'low': low[regular]}).groupby('file')
+    session_high = session['high'].max().reindex(range(count)).to_numpy()
+    session_low = session['low'].min().reindex(range(count)).to_numpy()
+
+    flags = np.zeros(count, dtype=np.int32)
+    flags[np.asarray(unreadable, dtype=np.intp)] |= UNREADABLE
+    flags[(present < EXPECTED_ROWS) & (rows > 0)] |= MISSING_MINUTES
+    flags[duplicates > 0] |= DUPLICATE_MINUTES
+    flags[outside > 0] |= OUT_OF_WINDOW
+    flags[bad_ohlc > 0] |= BAD_OHLC
+
+    for index, day_file in enumerate(day_files):
+        try:
+            meta = corpus.read_meta(day_file.meta_path)
+            prev_high, prev_low = float(meta['prev_high']), float(meta['prev_low'])
+        except (OSError, ValueError, KeyError, TypeError):
+            flags[index] |= UNREADABLE
+            continue
+        if meta['prev_date'] != day_file.date:
+            flags[index] |= STALE_META
+        if not np.isnan(session_high[index]) and (abs(prev_high - session_high[index]) > META_TOLERANCE * session_high[index] or abs(prev_low - session_low[index]) > META_TOLERANCE * session_low[index]):
+            flags[index] |= META_MISMATCH
+
+    # the generator skips holidays and early closes (None: outside of the calendar)
+    sessions = {}
+    for day_file in day_files:
+        if day_file.date not in sessions:
+            try:
+                sessions[day_file.date] = not calendar.session(day_file.date).early_close
+            except KeyError:
+                sessions[day_file.date] = False
+            except ValueError:
+                sessions[day_file.date] = None
+    flags[[sessions[day_file.date] is False for day_file in day_files]] |= UNEXPECTED_DAY
+    flags[[sessions[day_file.date] is None for day_file in day_files]] |= OUTSIDE_CALENDAR
+
+    manifest = pd.DataFrame({
+        'symbol': [day_file.symbol for day_file in day_files],
+        'date': [day_file.date for day_file in day_files],
+        'flags': flags,
+        'rows': rows,
+        'first_minute': first_minute,
+        'last_minute': last_minute,
+        'missing': np.where(rows > 0, EXPECTED_ROWS - present, 0),
+        'duplicates': duplicates,
+        'outside': outside,
+        'bad_ohlc': bad_ohlc,
+    })
+
+    ranges = {}
+    for symbol, dates in manifest.groupby('symbol')['date']:
+        ranges[symbol] = (_in_range(start or dates.min(), calendar), _in_range(end or dates.max(), calendar))
+    manifest = _add_missing_days(manifest, expected_days(ranges, calendar, early_closes=False))
+
+    return _finish(manifest)
+
+
+def check_corpus(symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, tickers_dir: str = TICKERS_DIR, version: str = corpus.DEFAULT_VERSION, calendar: trading_calendar.TradingCalendar = None) -> pd.DataFrame:
+    """Check the day files of symbols (default: all) between start and end (inclusive)."""
+    day_files = []
+    for symbol in symbols or corpus.list_symbols(tickers_dir):
+        for day_file in corpus.list_day_files(symbol, tickers_dir, version):
+            if (start is None or day_file.date >= start) and (end is None or day_file.date <= end):
+                day_files.append(day_file)
+    return check_files(day_files, calendar, start, end)
+
+
+def pad_to_close(bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Append a flat zero-volume 4:00 PM bar (at the last close) to every
+    (symbol, day) of bars which ends earlier, so the generator's gap filling
+    extends the day to the full file window.
+    """
+    local = bars['timestamp'].dt.tz_convert(trading_calendar.NEW_YORK)
+    last = bars.assign(date=local.dt.date, minute=local.dt.hour * 60 + local.dt.minute).sort_values('timestamp').groupby(['symbol', 'date']).last().reset_index()
+    short = last[last['minute'] < FILE_END_MINUTE]
+    if short.empty:
+        return bars
+
+    closes = [trading_calendar.to_utc(date, FETCH_END) for date in short['date']]
+    padding = pd.DataFrame({
+        'symbol': short['symbol'].to_numpy(),
+        'timestamp': pd.DatetimeIndex(closes).tz_convert(bars['timestamp'].dt.tz),
+        'open': short['close'].to_numpy(),
+        'high': short['close'].to_numpy(),
+        'low': short['close'].to_numpy(),
+        'close': short['close'].to_numpy(),
+        'volume': 0.0,
+    })
+    return pd.concat([bars, padding], ignore_index=True)
+
+
+def plan_repairs(bad: dict[str, list[datetime.date]], window, calendar: trading_calendar.TradingCalendar, chunk_days: int = backfill.DEFAULT_CHUNK_DAYS) -> list[backfill.Chunk]:
+    """
+    Group each symbol's bad dates into chunks of consecutive sessions (at most
+    chunk_days long), with window(session) giving the Window of a session.
+    Dates that are not sessions are dropped.
+    """
+    chunks = []
+    for symbol, dates in bad.items():
+        current = []
+        previous = None
+        for date in sorted(dates):
+            try:
+                session = calendar.session(date)
+            except (KeyError, ValueError):
+                continue
+            if current and (len(current) == chunk_days or calendar.previous_session(date).date != previous):
+                chunks.append(backfill.Chunk(symbol, current))
+                current = []
+            current.append(window(session))
+            previous = date
+        if current:
+            chunks.append(backfill.Chunk(symbol, current))
+    return chunks
+
+
+def file_window(session: trading_calendar.Session) -> backfill.Window:
+    return backfill.Window(session.date, trading_calendar.to_utc(session.date, FETCH_START), trading_calendar.to_utc(session.date, FETCH_END))
+
+
+def fetch_meta(client, symbols: list[str], dates: list[datetime.date]) -> dict[tuple[str, datetime.date], dict]:
+    """Meta fields (the file date's daily bar, like the generator's) of symbols between the first and last date, in one request."""
+    start = trading_calendar.to_utc(min(dates), datetime.time(0, 0))
+    end = trading_calendar.to_utc(max(dates), datetime.time(23, 59))
+    df = client.get_stock_bars(StockBarsRequest(symbol_or_symbols=symbols, timeframe=TimeFrame.Day, start=start, end=end)).df
+    if df.empty:
+        return {}
+
+    df = df.reset_index()
+    local_dates = df['timestamp'].dt.tz_convert(trading_calendar.NEW_YORK).dt.date
+    metas = {}
+    for row, date in zip(df.itertuples(index=False), local_dates):
+        metas[(row.symbol, date)] = {
+            'prev_date': date.strftime('%Y%m%d'),
+            'prev_open': float(row.open),
+            'prev_high': float(row.high),
+            'prev_low': float(row.low),
+            'prev_close': float(row.close),
+            'prev_volume': int(row.volume),
+            'prev_vwap': float(row.vwap),
+        }
+    return metas
+
+
+def generated_days(bars: pd.DataFrame) -> set[tuple[str, datetime.date]]:
+    """(symbol, date) of the days of bars the generator would write a file for."""
+    local = bars['timestamp'].dt.tz_convert(trading_calendar.NEW_YORK)
+    first = bars.assign(date=local.dt.date, minute=local.dt.hour * 60 + local.dt.minute).sort_values('timestamp').groupby(['symbol', 'date']).first()
+    keep = (first['minute'] < FIRST_BAR_DEADLINE) & (first['volume'] > 0)
+    return set(first.index[keep.to_numpy()])
+
+
+def repair_files(client, manifest: pd.DataFrame, flags: int = REPAIR_FLAGS, tickers_dir: str = TICKERS_DIR, version: str = corpus.DEFAULT_VERSION, calendar: trading_calendar.TradingCalendar = None, max_workers: int = backfill.DEFAULT_WORKERS, requests_per_minute: int = backfill.DEFAULT_REQUESTS_PER_MINUTE, chunk_days: int = backfill.DEFAULT_CHUNK_DAYS) -> list[corpus.DayFile]:
+    """
+    Refetch the days of manifest with any of flags set and rewrite their day
+    files. Days the generator would skip (a first bar at or after 8:05 or
+    without volume, see generated_days) or without a daily bar are left alone
+    with a warning. Returns the written files.
+    """
+    calendar = calendar or trading_calendar.load_calendar()
+    bad = bad_days(manifest, flags)
+    chunks = plan_repairs(bad, file_window, calendar, chunk_days)
+    if not chunks:
+        return []
+
+    print(f'[ INFO ] Refetching {sum(len(chunk.windows) for chunk in chunks)} day(s) in {len(chunks)} request(s)')
+    metas = fetch_meta(client, sorted(bad), [window.day for chunk in chunks for window in chunk.windows])
+
+    written = []
+    for chunk, bars in backfill.fetch_chunks(client, chunks, max_workers, requests_per_minute):
+        if bars.empty:
+            print(f'[ WARN ] No bars for {chunk.symbol} from {chunk.windows[0].day} to {chunk.windows[-1].day}')
+            continue
+        generated = generated_days(bars)
+        for window in chunk.windows:
+            if (chunk.symbol, window.day) not in generated:
+                print(f'[ WARN ] No bar with volume before 8:05 AM for {chunk.symbol} on {window.day} (the generator skips it), skipping')
+        rows = indicators.compute_frame(pad_to_close(bars))
+        for (symbol, date), day_rows in rows.groupby(['symbol', 'date'], sort=True):
+            if (symbol, date) not in generated:
+                continue
+            meta = metas.get((symbol, date))
+            if meta is None:
+                print(f'[ WARN ] No daily bar for {symbol} on {date}, skipping')
+                continue
+            written.append(corpus.write_day(symbol, date, day_rows, meta, tickers_dir, version))
+    return written
+
+
+#------------------------------------------------------------------------------
+# bars_minute
+#------------------------------------------------------------------------------
+
+
+def _db_query(symbols: list[str], start: datetime.date, end: datetime.date, table: str) -> tuple[str, dict]:
+    conditions = []
+    params = {}
+    if symbols is not None:
+        conditions.append('symbol = ANY(:symbols)')
+        params['symbols'] = list(symbols)
+    if start is not None:
+        conditions.append('timestamp >= :start')
+        params['start'] = trading_calendar.to_utc(start, datetime.time(0, 0))
+    if end is not None:
+        conditions.append('timestamp < :end')
+        params['end'] = trading_calendar.to_utc(end + datetime.timedelta(days=1), datetime.time(0, 0))
+    where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+
+    query = f'''
+        SELECT symbol, CAST(local AS DATE) AS date,
+            COUNT(*) AS rows,
+            MIN(EXTRACT(HOUR FROM local) * 60 + EXTRACT(MINUTE FROM local)) AS first_minute,
+            MAX(EXTRACT(HOUR FROM local) * 60 + EXTRACT(MINUTE FROM local)) AS last_minute,
+            COUNT(*) - COUNT(DISTINCT timestamp) AS duplicates,
+            COUNT(DISTINCT timestamp) FILTER (WHERE CAST(local AS TIME) >= TIME '09:30' AND CAST(local AS TIME) < TIME '13:00') AS morning,
+            COUNT(DISTINCT timestamp) FILTER (WHERE CAST(local AS TIME) >= TIME '13:00' AND CAST(local AS TIME) < TIME '16:00') AS afternoon,
+            COUNT(*) FILTER (WHERE CAST(local AS TIME) < TIME '{COLLECT_START}' OR CAST(local AS TIME) > TIME '{COLLECT_END}') AS outside,
+            COUNT(*) FILTER (WHERE CAST(local AS TIME) > TIME '13:00' AND CAST(local AS TIME) <= TIME '{COLLECT_END}') AS late,
+            COUNT(*) FILTER (WHERE NOT COALESCE(low <= open AND low <= close AND high >= open AND high >= close AND low > 0 AND volume >= 0, FALSE)) AS bad_ohlc
+        FROM (SELECT *, timestamp AT TIME ZONE '{trading_calendar.NEW_YORK.key}' AS local FROM {table} {where}) bars
+        GROUP BY symbol, CAST(local AS DATE)
+    '''
+    return query, params
+
+
+def check_db(conn, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, calendar: trading_calendar.TradingCalendar = None, table: str = bulk_load.PG_TABLE) -> pd.DataFrame:
+    """
+    Check the bars of symbols (default: all) between start and end
+    (inclusive) in bars_minute (PostgreSQL) and return their manifest. Every
+    minute of a regular session is expected, and bars outside the
+    load-bars-minute.py window (8:00 AM to 6:00 PM, 1:00 PM on early closes).
+    """
+    calendar = calendar or trading_calendar.load_calendar()
+    query, params = _db_query(symbols, start, end, table)
+    days = pd.DataFrame(conn.execute(text(query), params).fetchall(), columns=['symbol', 'date', 'rows', 'first_minute', 'last_minute', 'duplicates', 'morning', 'afternoon', 'outside', 'late', 'bad_ohlc'])
+
+    # Session, None on closed days and False outside of the calendar
+    sessions = {}
+    for date in days['date'].unique():
+        try:
+            sessions[date] = calendar.session(date)
+        except KeyError:
+            sessions[date] = None
+        except ValueError:
+            sessions[date] = False
+    is_session = np.array([bool(sessions[date]) for date in days['date']], dtype=bool)
+    outside_calendar = np.array([sessions[date] is False for date in days['date']], dtype=bool)
+    early_close = np.array([bool(sessions[date]) and sessions[date].early_close for date in days['date']], dtype=bool)
+
+    # regular session minutes: 9:30 AM to 1:00 PM on early closes, 4:00 PM otherwise
+    expected = np.where(early_close, 210, 390) * is_session
+    present = days['morning'].to_numpy() + np.where(early_close, 0, days['afternoon'].to_numpy())
+    days['missing'] = np.maximum(expected - present, 0)
+    days['outside'] = days['outside'].to_numpy() + np.where(early_close, days['late'].to_numpy(), 0)
+
+    flags = np.zeros(len(days), dtype=np.int32)
+    flags[~is_session & ~outside_calendar] |= UNEXPECTED_DAY
+    flags[outside_calendar] |= OUTSIDE_CALENDAR
+    flags[days['missing'].to_numpy() > 0] |= MISSING_MINUTES
+    flags[days['duplicates'].to_numpy() > 0] |= DUPLICATE_MINUTES
+    flags[days['outside'].to_numpy() > 0] |= OUT_OF_WINDOW
+    flags[days['bad_ohlc'].to_numpy() > 0] |= BAD_OHLC
+    days['flags'] = flags
+
+    ranges = {}
+    for symbol, dates in days.groupby('symbol')['date']:
+        ranges[symbol] = (_in_range(start or dates.min(), calendar), _in_range(end or dates.max(), calendar))
+    manifest = _add_missing_days(days, expected_days(ranges, calendar, early_closes=True))
+
+    return _finish(manifest)
+
+
+def db_window(session: trading_calendar.Session) -> backfill.Window:
+    end_time = datetime.time(13, 0) if session.early_close else COLLECT_END
+    return backfill.Window(session.date, trading_calendar.to_utc(session.date, COLLECT_START), trading_calendar.to_utc(session.date, end_time))
+
+
+def repair_db(client, conn, manifest: pd.DataFrame, flags: int = REPAIR_FLAGS, calendar: trading_calendar.TradingCalendar = None, table: str = bulk_load.PG_TABLE, max_workers: int = backfill.DEFAULT_WORKERS, requests_per_minute: int = backfill.DEFAULT_REQUESTS_PER_MINUTE, chunk_days: int = backfill.DEFAULT_CHUNK_DAYS) -> int:
+    """
+    Remove duplicate bars (by creating the unique index) and refetch and
+    upsert the days of manifest with any of flags set. Returns the number of
+    rows written.
+    """
+    calendar = calendar or trading_calendar.load_calendar()
+    if (manifest['flags'] & DUPLICATE_MINUTES).any():
+        bulk_load.ensure_unique_index(conn, table)
+
+    chunks = plan_repairs(bad_days(manifest, flags & ~DUPLICATE_MINUTES), db_window, calendar, chunk_days)
+    if not chunks:
+        return 0
+
+    print(f'[ INFO ] Refetching {sum(len(chunk.windows) for chunk in chunks)} day(s) in {len(chunks)} request(s)')
+    writer = bulk_load.BulkWriter(conn, table)
+    for chunk, bars in backfill.fetch_chunks(client, chunks, max_workers, requests_per_minute):
+        writer.write(bars)
+    return writer.rows
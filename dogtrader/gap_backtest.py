@@ -0,0 +1,373 @@
+'''
+Event-driven historical backtester for the gap-day strategy in
+_ARCHIVES/strategies/gap-day-trader.py.
+
+The live bot checks each ticker's first quote after the open against the
+previous session's high and low: a gap up of more than 3% is faded with a sell
+limit order just below the previous high, a gap down of more than 2% with a
+buy limit order just above the previous low, and unfilled orders are canceled
+at 10:30 AM. Here the same decisions are replayed over regular-session minute
+bars without any Alpaca calls:
+
+    days = gap_backtest.corpus_days(['AAPL', 'NVDA'], start, end)
+    trades = gap_backtest.run_backtest(days, gap_backtest.GapParams())
+    print(gap_backtest.summarize(trades))
+
+Bars of all symbols are merged into a single time-ordered event stream per
+session, the strategy reacts to each bar through GapDayStrategy.on_bar, and
+SimulatedBroker fills limit orders against the bars that follow (see
+SimulatedBroker.match for the fill model). Open positions are closed at the
+last bar's close, or earlier at an optional stop loss.
+
+Days come from the data/tickers files (corpus_days) or the bars_minute table
+(db_days). The meta file of a day holds that day's own daily bar (the
+generator asks for day bars up to its 6:00 AM start time), so the previous
+session's high and low are read from the meta file of the previous day file.
+A day is only traded if that file (or, in bars_minute, those bars) is from the
+trading calendar's previous session; the corpus is missing some sessions, and
+an older high and low would give wrong gap signals.
+'''
+
+import collections
+import datetime
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from dogtrader import bars_query, corpus, trading_calendar
+from dogtrader.paths import TICKERS_DIR
+
+BUY = 'buy'
+SELL = 'sell'
+
+# the live bot cancels unfilled gap orders at 10:30 AM New York time
+DEFAULT_CANCEL_MINUTE = 10 * 60 + 30
+
+# the previous session is never more than 5 calendar days back
+MAX_PREVIOUS_GAP_DAYS = 5
+
+# gap_up/gap_down are fractions beyond the previous high/low, limit_offset is in
+# dollars, stop_loss is a fraction of the entry price (None to hold until the close)
+GapParams = collections.namedtuple(
+    'GapParams',
+    ['gap_up', 'gap_down', 'limit_offset', 'qty', 'cancel_minute', 'stop_loss'],
+    defaults=[0.03, 0.02, 0.02, 100, DEFAULT_CANCEL_MINUTE, None],
+)
+
+# regular-session bars of one symbol on one day (minutes after midnight, New York time)
+BacktestDay = collections.namedtuple('BacktestDay', ['symbol', 'date', 'prev_high', 'prev_low', 'minutes', 'open', 'high', 'low', 'close'])
+
+Trade = collections.namedtuple('Trade', ['symbol', 'date', 'side', 'qty', 'entry_minute', 'entry_price', 'exit_minute', 'exit_price', 'exit_reason', 'pnl'])
+
+TRADE_COLUMNS = list(Trade._fields)
+
+
+class Order:
+    """A simulated day limit order."""
+
+    __slots__ = ('symbol', 'side', 'qty', 'limit_price', 'submitted_minute', 'status', 'fill_price', 'fill_minute')
+
+    def __init__(self, symbol: str, side: str, qty: int, limit_price: float, submitted_minute: int):
+        self.symbol = symbol
+        self.side = side
+        self.qty = qty
+        self.limit_price = limit_price
+        self.submitted_minute = submitted_minute
+        self.status = 'open'
+        self.fill_price = None
+        self.fill_minute = None
+
+
+class SimulatedBroker:
+    """
+    Holds open limit orders and fills them against minute bars.
+
+    An order can fill on the bar it was submitted on. A buy limit fills when
+    the bar trades below the limit (at or below with fill_on_touch), at the
+    limit price, or at the bar's open when the bar opens at a better price than
+    the limit (a marketable order fills at the market). Sell limits mirror
+    this. Queue position is unknown, so by default touching the limit is not
+    enough for a fill.
+    """
+
+    def __init__(self, fill_on_touch: bool = False):
+        self.fill_on_touch = fill_on_touch
+        self.open_orders = {}
+
+    def submit_limit(self, symbol: str, side: str, qty: int, limit_price: float, minute: int) -> Order:
+        order = Order(symbol, side, qty, limit_price, minute)
+        self.open_orders.setdefault(symbol, []).append(order)
+        return order
+
+    def cancel_all(self, symbol: str = None):
+        """Cancel the open orders of symbol (default all symbols)."""
+        symbols = [symbol] if symbol is not None else list(self.open_orders)
+        for key in symbols:
+            for order in self.open_orders.pop(key, []):
+                order.status = 'canceled'
+
+    def match(self, symbol: str, minute: int, open: float, high: float, low: float) -> list[Order]:
+        """Fill the open orders of symbol against a bar and return the filled ones."""
+        orders = self.open_orders.get(symbol)
+        if not orders:
+            return []
+
+        filled = []
+        for order in orders:
+            limit = order.limit_price
+            if order.side == BUY:
+                if open <= limit:
+                    order.fill_price = open
+                elif low < limit or (self.fill_on_touch and low == limit):
+                    order.fill_price = limit
+            else:
+                if open >= limit:
+                    order.fill_price = open
+                elif high > limit or (self.fill_on_touch and high == limit):
+                    order.fill_price = limit
+
+            if order.fill_price is not None:
+                order.status = 'filled'
+                order.fill_minute = minute
+                filled.append(order)
+
+        if filled:
+            self.open_orders[symbol] = [order for order in orders if order.status == 'open']
+        return filled
+
+
+class GapDayStrategy:
+    """The gap-day trading rules, driven one bar at a time."""
+
+    def __init__(self, params: GapParams, broker: SimulatedBroker):
+        self.params = params
+        self.broker = broker
+        self.days = {}
+        self.checked = set()
+        self.positions = {}
+        self.trades = []
+
+    def start_session(self, days: list[BacktestDay]):
+        self.days = {day.symbol: day for day in days}
+        self.checked = set()
+        self.positions = {}
+
+    def on_bar(self, symbol: str, minute: int, open: float, high: float, low: float, close: float):
+        params = self.params
+        day = self.days[symbol]
+
+        if symbol not in self.checked:
+            # the first price after the open stands in for the live bot's first ask
+            self.checked.add(symbol)
+            if open > (1 + params.gap_up) * day.prev_high:
+                self.broker.submit_limit(symbol, SELL, params.qty, round(day.prev_high - params.limit_offset, 2), minute)
+            elif open < (1 - params.gap_down) * day.prev_low:
+                self.broker.submit_limit(symbol, BUY, params.qty, round(day.prev_low + params.limit_offset, 2), minute)
+
+        position = self.positions.get(symbol)
+        if position is not None and params.stop_loss is not None:
+            self._check_stop(symbol, minute, open, high, low, position)
+
+        for order in self.broker.match(symbol, minute, open, high, low):
+            self.positions[symbol] = order
+            if params.stop_loss is not None:
+                # the stop can trigger later in the same bar, but only beyond the fill price
+                self._check_stop(symbol, minute, order.fill_price, high, low, order)
+
+        if minute + 1 >= params.cancel_minute:
+            self.broker.cancel_all(symbol)
+
+    def _check_stop(self, symbol: str, minute: int, open: float, high: float, low: float, position: Order):
+        entry = position.fill_price
+        if position.side == BUY:
+            stop = entry * (1 - self.params.stop_loss)
+            if low <= stop:
+                self._exit(symbol, minute, min(open, stop), 'stop')
+        else:
+            stop = entry * (1 + self.params.stop_loss)
+            if high >= stop:
+                self._exit(symbol, minute, max(open, stop), 'stop')
+
+    def _exit(self, symbol: str, minute: int, price: float, reason: str):
+        position = self.positions.pop(symbol)
+        direction = 1 if position.side == BUY else -1
+        pnl = direction * (price - position.fill_price) * position.qty
+        day = self.days[symbol]
+        self.trades.append(Trade(symbol, day.date, position.side, position.qty, position.fill_minute, position.fill_price, minute, price, reason, pnl))
+
+    def end_session(self):
+        """Cancel leftover orders and close open positions at each symbol's last close."""
+        self.broker.cancel_all()
+        for symbol in list(self.positions):
+            day = self.days[symbol]
+            self._exit(symbol, int(day.minutes[-1]), float(day.close[-1]), 'close')
+
+
+def session_events(days: list[BacktestDay]):
+    """Yield (minute, symbol, open, high, low, close) bar events of a session in time order."""
+    streams = []
+    for day in days:
+        streams.append(zip(day.minutes.tolist(), [day.symbol] * len(day.minutes), day.open.tolist(), day.high.tolist(), day.low.tolist(), day.close.tolist()))
+    return heapq.merge(*streams)
+
+
+def run_backtest(days, params: GapParams = GapParams(), fill_on_touch: bool = False) -> pd.DataFrame:
+    """
+    Replay BacktestDays (in date order, any number of symbols) through the
+    gap-day strategy and return the trades as a DataFrame of TRADE_COLUMNS.
+    """
+    broker = SimulatedBroker(fill_on_touch)
+    strategy = GapDayStrategy(params, broker)
+
+    def run_session(session_days):
+        strategy.start_session(session_days)
+        for minute, symbol, open, high, low, close in session_events(session_days):
+            strategy.on_bar(symbol, minute, open, high, low, close)
+        strategy.end_session()
+
+    session_date = None
+    session_days = []
+    for day in days:
+        if day.date != session_date and session_days:
+            run_session(session_days)
+            session_days = []
+        session_date = day.date
+        session_days.append(day)
+    if session_days:
+        run_session(session_days)
+
+    return pd.DataFrame(strategy.trades, columns=TRADE_COLUMNS)
+
+
+def summarize(trades: pd.DataFrame) -> pd.DataFrame:
+    """Return trade count, win rate and P&L per symbol and month, with a total row."""
+    if trades.empty:
+        return pd.DataFrame(columns=['symbol', 'month', 'trades', 'win_rate', 'pnl'])
+
+    trades = trades.assign(month=pd.to_datetime(trades['date']).dt.strftime('%Y-%m'), win=trades['pnl'] > 0)
+    summary = trades.groupby(['symbol', 'month']).agg(trades=('pnl', 'size'), win_rate=('win', 'mean'), pnl=('pnl', 'sum')).reset_index()
+    total = pd.DataFrame([{'symbol': 'TOTAL', 'month': '', 'trades': len(trades), 'win_rate': trades['win'].mean(), 'pnl': trades['pnl'].sum()}])
+    return pd.concat([summary, total], ignore_index=True)
+
+
+#------------------------------------------------------------------------------
+# Day sources
+#------------------------------------------------------------------------------
+
+
+def local_minutes(timestamps) -> np.ndarray:
+    """Minutes after midnight, New York time, of timezone-aware timestamps."""
+    local = pd.DatetimeIndex(timestamps).tz_convert(trading_calendar.NEW_YORK)
+    return local.hour.to_numpy() * 60 + local.minute.to_numpy()
+
+
+def make_day(symbol: str, date: datetime.date, prev_high: float, prev_low: float, minutes: np.ndarray, open, high, low, close, calendar: trading_calendar.TradingCalendar):
+    """Build a BacktestDay from a day's bars, keeping only the regular session (None if closed or outside of the calendar)."""
+    try:
+        session = calendar.session(date)
+    except (KeyError, ValueError):
+        return None
+
+    close_time = session.close.astimezone(trading_calendar.NEW_YORK)
+    in_session = (minutes >= 9 * 60 + 30) & (minutes < close_time.hour * 60 + close_time.minute)
+    if not in_session.any():
+        return None
+
+    def prices(values):
+        return np.asarray(values, dtype=np.float64)[in_session]
+
+    return BacktestDay(symbol, date, float(prev_high), float(prev_low), minutes[in_session], prices(open), prices(high), prices(low), prices(close))
+
+
+def previous_session_date(calendar: trading_calendar.TradingCalendar, date: datetime.date):
+    """Date of the session before date, or None outside of the calendar."""
+    try:
+        return calendar.previous_session(date).date
+    except (KeyError, ValueError):
+        return None
+
+
+def corpus_days(symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, tickers_dir: str = TICKERS_DIR, version: str = corpus.DEFAULT_VERSION, manifest=None):
+    """
+    Yield BacktestDays from the data/tickers files in date order. With a
+    (refreshed) dogtrader.tickers_manifest.TickersManifest, the days and the
+    previous days' high and low come from one manifest query instead of
+    directory listings and meta files. Days whose previous session has no
+    day file are skipped.
+    """
+    calendar = trading_calendar.load_calendar()
+
+    by_date = collections.defaultdict(list)
+    if manifest is not None:
+        first = start - datetime.timedelta(days=MAX_PREVIOUS_GAP_DAYS) if start is not None else None
+        rows = manifest.select(symbols, first, end, version)
+        for _, symbol_rows in rows.groupby('symbol', sort=False):
+            for previous, row in zip(symbol_rows.iloc[:-1].itertuples(), symbol_rows.iloc[1:].itertuples()):
+                # the previous file's meta must hold the previous session's daily bar
+                if (start is None or row.date >= start) and previous.prev_date is not None and previous.prev_date == previous_session_date(calendar, row.date):
+                    by_date[row.date].append((row.symbol, row.data_path, previous.prev_high, previous.prev_low))
+    else:
+        for symbol in symbols or corpus.list_symbols(tickers_dir):
+            day_files = corpus.list_day_files(symbol, tickers_dir, version)
+            for previous, day_file in zip(day_files, day_files[1:]):
+                if (start is None or day_file.date >= start) and (end is None or day_file.date <= end):
+                    if previous.date == previous_session_date(calendar, day_file.date):
+                        meta = corpus.read_meta(previous.meta_path)
+                        by_date[day_file.date].append((symbol, day_file.data_path, meta['prev_high'], meta['prev_low']))
+
+    for date in sorted(by_date):
+        for symbol, data_path, prev_high, prev_low in by_date[date]:
+            # only the prices are needed, and HH:MM is already New York time
+            bars = pd.read_csv(data_path, usecols=['time', 'open', 'high', 'low', 'close'])
+            minutes = bars['time'].str[:2].astype(int).to_numpy() * 60 + bars['time'].str[3:].astype(int).to_numpy()
+            day = make_day(symbol, date, prev_high, prev_low, minutes, bars['open'], bars['high'], bars['low'], bars['close'], calendar)
+            if day is not None:
+                yield day
+
+
+def db_days(conn, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, chunk_size: int = bars_query.DEFAULT_CHUNK_SIZE):
+    """
+    Yield BacktestDays from the bars_minute table in date order. The
+    previous high and low are those of the previous session's regular-hours
+    bars in the table; days whose previous session has no bars are skipped.
+    """
+    calendar = trading_calendar.load_calendar()
+
+    # also read the session before start for its high and low
+    first = (previous_session_date(calendar, start) or start) if start is not None else None
+    query_start = trading_calendar.to_utc(first, datetime.time()) if first is not None else None
+    query_end = trading_calendar.to_utc(end + datetime.timedelta(days=1), datetime.time()) if end is not None else None
+
+    by_date = collections.defaultdict(list)
+    previous = {}
+
+    def add_day(symbol, bars):
+        date = bars['timestamp'].iloc[0].tz_convert(trading_calendar.NEW_YORK).date()
+        prev_date, prev_high, prev_low = previous.get(symbol, (None, np.nan, np.nan))
+        if prev_date is None or prev_date != previous_session_date(calendar, date):
+            prev_high = prev_low = np.nan
+        day = make_day(symbol, date, prev_high, prev_low, local_minutes(bars['timestamp']), bars['open'], bars['high'], bars['low'], bars['close'], calendar)
+        if day is None:
+            return
+        previous[symbol] = (date, day.high.max(), day.low.min())
+        if not np.isnan(prev_high) and (start is None or date >= start):
+            by_date[date].append(day)
+
+    # rows arrive ordered by symbol and timestamp, and a day can span chunks
+    pending = None
+    columns = ['symbol', 'timestamp', 'open', 'high', 'low', 'close']
+    for chunk in bars_query.iter_bars(conn, symbols, query_start, query_end, columns, chunk_size):
+        chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], utc=True)
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        keys = chunk['symbol'] + chunk['timestamp'].dt.tz_convert(trading_calendar.NEW_YORK).dt.strftime('%Y%m%d')
+        last_key = keys.iloc[-1]
+        for key, bars in chunk[keys != last_key].groupby(keys[keys != last_key], sort=False):
+            add_day(bars['symbol'].iloc[0], bars)
+        pending = chunk[keys == last_key]
+    if pending is not None and len(pending):
+        add_day(pending['symbol'].iloc[0], pending)
+
+    for date in sorted(by_date):
+        yield from by_date[date]
@@ -0,0 +1,179 @@
+'''
+Vectorized parameter sweep of the gap-day strategy.
+
+Instead of replaying every parameter combination bar by bar, each day is
+reduced once to what the parameters can change:
+
+- its opening gap (first regular-session open against the previous high and
+  low), which decides for every (gap_up, gap_down) pair whether the day trades
+  and on which side, and
+- for every (limit_offset, cancel_minute) pair, whether and at what price the
+  sell (gap up) or buy (gap down) limit order fills, which fixes its P&L per
+  share at the close.
+
+The threshold masks and the fill P&Ls are then combined over all days with
+NumPy broadcasting (einsum), so a grid of thousands of combinations costs
+little more than one backtest. Tickers are evaluated in a process pool and
+summed. The fill model, cancel time and exit at the close are those of
+dogtrader.gap_backtest.run_backtest without a stop loss, so every row of the
+ranked table can be re-run there trade by trade. Days come from
+gap_backtest.corpus_days, so the same days without a previous session are left
+out of both.
+'''
+
+import collections
+import concurrent.futures
+import datetime
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from dogtrader import corpus, gap_backtest
+from dogtrader.paths import TICKERS_DIR
+
+# values of each swept parameter, in GapParams units
+SweepGrid = collections.namedtuple('SweepGrid', ['gap_up', 'gap_down', 'limit_offset', 'cancel_minute', 'qty'])
+
+# per-share results with axes (gap_up, gap_down, limit_offset, cancel_minute)
+SweepTotals = collections.namedtuple('SweepTotals', ['pnl', 'trades', 'wins'])
+
+RESULT_COLUMNS = ['gap_up', 'gap_down', 'limit_offset', 'cancel_minute', 'qty', 'trades', 'win_rate', 'pnl']
+
+
+def parse_values(text: str, cast=float) -> np.ndarray:
+    """Parse 'a,b,c' or an inclusive 'start:stop:step' range into an array."""
+    if ':' in text:
+        start, stop, step = (cast(part) for part in text.split(':'))
+        count = int(round((stop - start) / step)) + 1
+        return np.round(start + step * np.arange(count), 6).astype(type(start))
+    return np.array([cast(part) for part in text.split(',')])
+
+
+def default_grid() -> SweepGrid:
+    params = gap_backtest.GapParams()
+    return SweepGrid(
+        np.array([params.gap_up]),
+        np.array([params.gap_down]),
+        np.array([params.limit_offset]),
+        np.array([params.cancel_minute]),
+        np.array([params.qty]),
+    )
+
+
+def day_fill_pnl(day: gap_backtest.BacktestDay, limit_offsets: np.ndarray, cancel_minutes: np.ndarray, fill_on_touch: bool = False) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Return per-share (sell_pnl, buy_pnl), each (len(limit_offsets),
+    len(cancel_minutes)), of the gap order filling on this day and held to
+    the close, NaN where the order would not fill before it is canceled.
+    """
+    last_close = day.close[-1]
+
+    # bars matched before the cancel: up to and including the first bar ending at or after it
+    eligible = np.minimum(np.searchsorted(day.minutes, cancel_minutes - 1, side='left') + 1, len(day.minutes))
+
+    def side_pnl(limits, crossed_open, crossed_bar, direction):
+        hit = crossed_open | crossed_bar
+        any_hit = hit.any(axis=1)
+        first = np.where(any_hit, hit.argmax(axis=1), len(day.minutes))
+        rows = np.arange(len(limits))
+        index = np.minimum(first, len(day.minutes) - 1)
+        fill = np.where(crossed_open[rows, index], day.open[index], limits)
+        pnl = direction * (last_close - fill)
+        filled = first[:, None] < eligible[None, :]
+        return np.where(filled, pnl[:, None], np.nan)
+
+    # same limit prices as GapDayStrategy
+    sell_limits = np.round(day.prev_high - limit_offsets, 2)
+    buy_limits = np.round(day.prev_low + limit_offsets, 2)
+
+    if fill_on_touch:
+        sell_bar = day.high[None, :] >= sell_limits[:, None]
+        buy_bar = day.low[None, :] <= buy_limits[:, None]
+    else:
+        sell_bar = day.high[None, :] > sell_limits[:, None]
+        buy_bar = day.low[None, :] < buy_limits[:, None]
+
+    sell_pnl = side_pnl(sell_limits, day.open[None, :] >= sell_limits[:, None], sell_bar, -1)
+    buy_pnl = side_pnl(buy_limits, day.open[None, :] <= buy_limits[:, None], buy_bar, 1)
+    return sell_pnl, buy_pnl
+
+
+def sweep_days(days, grid: SweepGrid, fill_on_touch: bool = False) -> SweepTotals:
+    """Evaluate the grid (without qty) over BacktestDays and return per-share totals."""
+    opens, prev_highs, prev_lows, sell_pnls, buy_pnls = [], [], [], [], []
+    for day in days:
+        sell_pnl, buy_pnl = day_fill_pnl(day, grid.limit_offset, grid.cancel_minute, fill_on_touch)
+        opens.append(day.open[0])
+        prev_highs.append(day.prev_high)
+        prev_lows.append(day.prev_low)
+        sell_pnls.append(sell_pnl)
+        buy_pnls.append(buy_pnl)
+
+    shape = (len(grid.gap_up), len(grid.gap_down), len(grid.limit_offset), len(grid.cancel_minute))
+    if not opens:
+        return SweepTotals(np.zeros(shape), np.zeros(shape, np.int64), np.zeros(shape, np.int64))
+
+    opens = np.array(opens)[:, None]
+    # (days, gap_up) and (days, gap_up, gap_down) masks of the side each day trades
+    sells = opens > (1 + grid.gap_up[None, :]) * np.array(prev_highs)[:, None]
+    buys = ~sells[:, :, None] & (opens[:, :, None] < (1 - grid.gap_down[None, None, :]) * np.array(prev_lows)[:, None, None])
+
+    # (days, limit_offset, cancel_minute) fill results
+    sell_pnls = np.stack(sell_pnls)
+    buy_pnls = np.stack(buy_pnls)
+
+    def combine(sell_values, buy_values):
+        sold = np.einsum('du,doc->uoc', sells.astype(np.float64), sell_values)
+        bought = np.einsum('duv,doc->uvoc', buys.astype(np.float64), buy_values)
+        return sold[:, None] + bought
+
+    pnl = combine(np.nan_to_num(sell_pnls), np.nan_to_num(buy_pnls))
+    trades = combine(~np.isnan(sell_pnls), ~np.isnan(buy_pnls))
+    wins = combine(np.nan_to_num(sell_pnls) > 0, np.nan_to_num(buy_pnls) > 0)
+    return SweepTotals(pnl, np.rint(trades).astype(np.int64), np.rint(wins).astype(np.int64))
+
+
+def sweep_symbol(symbol: str, grid: SweepGrid, start: datetime.date = None, end: datetime.date = None, fill_on_touch: bool = False, tickers_dir: str = TICKERS_DIR, version: str = corpus.DEFAULT_VERSION) -> SweepTotals:
+    """Sweep the grid over one ticker's data/tickers files (runs in a worker process)."""
+    return sweep_days(gap_backtest.corpus_days([symbol], start, end, tickers_dir, version), grid, fill_on_touch)
+
+
+def run_sweep(symbols: list[str], grid: SweepGrid, start: datetime.date = None, end: datetime.date = None, fill_on_touch: bool = False, max_workers: int = None) -> SweepTotals:
+    """Sweep the grid over every ticker in a process pool and sum the per-share totals."""
+    shape = (len(grid.gap_up), len(grid.gap_down), len(grid.limit_offset), len(grid.cancel_minute))
+    total = SweepTotals(np.zeros(shape), np.zeros(shape, np.int64), np.zeros(shape, np.int64))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(sweep_symbol, symbol, grid, start, end, fill_on_touch) for symbol in symbols]
+        for future in concurrent.futures.as_completed(futures):
+            result = future.result()
+            total = SweepTotals(total.pnl + result.pnl, total.trades + result.trades, total.wins + result.wins)
+
+    return total
+
+
+def ranked_results(totals: SweepTotals, grid: SweepGrid, top: int = None) -> pd.DataFrame:
+    """Return one row per parameter combination (qty included), best P&L first."""
+    index = np.indices(totals.pnl.shape).reshape(4, -1)
+    pnl = totals.pnl.reshape(-1)
+    trades = totals.trades.reshape(-1)
+    wins = totals.wins.reshape(-1)
+
+    frames = []
+    for qty in grid.qty:
+        frames.append(pd.DataFrame({
+            'gap_up': grid.gap_up[index[0]],
+            'gap_down': grid.gap_down[index[1]],
+            'limit_offset': grid.limit_offset[index[2]],
+            'cancel_minute': grid.cancel_minute[index[3]],
+            'qty': qty,
+            'trades': trades,
+            'win_rate': np.divide(wins, trades, out=np.full(len(trades), np.nan), where=trades > 0),
+            'pnl': np.round(pnl * qty, 2),
+        }))
+
+    results = pd.concat(frames, ignore_index=True).sort_values(['pnl', 'trades'], ascending=[False, True], kind='stable')
+    if top is not None:
+        results = results.head(top)
+    return results.reset_index(drop=True)
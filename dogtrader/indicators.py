@@ -0,0 +1,258 @@
+'''
+Vectorized NumPy implementation of the v000 indicator columns written by
+data/generation/main.go.
+
+Minute bars of many (symbol, day) series are laid out on a shared 06:00-16:00
+New York minute grid, time-major, so every step of the recursive indicators
+(EMAs, MACD signal, Wilder RSI averages) is a single vector operation over all
+series at once, and the windowed ones (VWAP, SMAs) are cumulative sums or
+sliding windows over the whole array.
+
+The calculation follows the Go generator exactly:
+- missing minutes after the first bar are filled with the previous close and
+  zero volume, and a series needs a first bar before 8:05 with volume;
+- VWAP accumulates typical price * volume from the first bar and resets at 9:30;
+- the 12/26 EMAs and the RSI gain/loss averages are seeded at 8:30 with simple
+  averages of the previous 12/26 closes and 14 changes;
+- the MACD signal is seeded at 8:38 with the average of the nine MACD values
+  since 8:30, then follows a 9-period EMA;
+- rows are output from 9:00 to 4:00 PM.
+'''
+
+import collections
+
+import numpy as np
+import pandas as pd
+
+from dogtrader.corpus import DATA_COLUMNS, NEW_YORK
+
+EMA12_SMOOTHING = 2.0
+EMA26_SMOOTHING = 2.0
+MACDS_SMOOTHING = 2.0
+RSI_PERIOD = 14
+SMA_PERIODS = (5, 8, 13)
+
+# minute grid from 6:00 AM to 4:00 PM New York time (inclusive)
+GRID_START = 6 * 60
+GRID_MINUTES = 601
+
+# grid indices of the calculation milestones
+FIRST_BAR_DEADLINE = 125  # 8:05
+INIT_INDEX = 150          # 8:30
+MACDS_INIT_INDEX = 158    # 8:38
+OUTPUT_INDEX = 180        # 9:00
+VWAP_RESET_INDEX = 210    # 9:30
+
+INDICATOR_COLUMNS = ['VWAP', '5SMA', '8SMA', '13SMA', '12EMA', '26EMA', 'MACD', 'MACDS', 'RSI']
+
+# keys: DataFrame of (symbol, date) per series; prices and volume: (GRID_MINUTES, n) float64
+Grid = collections.namedtuple('Grid', ['keys', 'open', 'high', 'low', 'close', 'volume', 'first_index', 'last_index'])
+
+
+def bars_to_grid(bars: pd.DataFrame) -> Grid:
+    """
+    Lay out minute bars (symbol, timestamp, open, high, low, close, volume,
+    with timezone-aware timestamps) on the per-day minute grid, filling gaps
+    after each series' first bar the way the Go generator does.
+    """
+    timestamps = bars['timestamp'].dt.tz_convert(NEW_YORK)
+    minutes = (timestamps.dt.hour * 60 + timestamps.dt.minute - GRID_START).to_numpy()
+    keep = (minutes >= 0) & (minutes < GRID_MINUTES)
+
+    frame = pd.DataFrame({'symbol': bars['symbol'].to_numpy()[keep], 'date': timestamps.dt.date.to_numpy()[keep]})
+    series = frame.groupby(['symbol', 'date'], sort=True).ngroup().to_numpy()
+    keys = frame.drop_duplicates().sort_values(['symbol', 'date']).reset_index(drop=True)
+    minutes = minutes[keep]
+
+    shape = (GRID_MINUTES, len(keys))
+    present = np.zeros(shape, dtype=bool)
+    present[minutes, series] = True
+
+    values = {}
+    for column in ('open', 'high', 'low', 'close', 'volume'):
+        array = np.full(shape, np.nan)
+        array[minutes, series] = bars[column].to_numpy(dtype=np.float64)[keep]
+        values[column] = array
+
+    # index of the latest real bar at or before each minute (-1 before the first bar)
+    latest = np.where(present, np.arange(GRID_MINUTES)[:, None], -1)
+    np.maximum.accumulate(latest, axis=0, out=latest)
+
+    # fill gaps with the previous close and no volume
+    gaps = ~present & (latest >= 0)
+    columns = np.broadcast_to(np.arange(shape[1]), shape)
+    filled_close = values['close'][latest[gaps], columns[gaps]]
+    for column in ('open', 'high', 'low', 'close'):
+        values[column][gaps] = filled_close
+    values['volume'][gaps] = 0.0
+    values['volume'][latest < 0] = 0.0
+
+    first_index = present.argmax(axis=0)
+    last_index = GRID_MINUTES - 1 - present[::-1].argmax(axis=0)
+
+    return Grid(keys, values['open'], values['high'], values['low'], values['close'], values['volume'], first_index, last_index)
+
+
+def ema_path(values: np.ndarray, start: int, seed: np.ndarray, period: int, smoothing: float) -> np.ndarray:
+    """Run an EMA over time-major values from a seed at row start (NaN before it)."""
+    multiplier = smoothing / (period + 1)
+    out = np.full(values.shape, np.nan)
+    out[start] = seed
+    for t in range(start + 1, len(values)):
+        out[t] = values[t] * multiplier + out[t - 1] * (1 - multiplier)
+    return out
+
+
+def wilder_path(values: np.ndarray, start: int, seed: np.ndarray, period: int) -> np.ndarray:
+    """Run a Wilder (RSI) average over time-major values from a seed at row start."""
+    out = np.full(values.shape, np.nan)
+    out[start] = seed
+    for t in range(start + 1, len(values)):
+        out[t] = (out[t - 1] * (period - 1) + values[t]) / period
+    return out
+
+
+def sma_path(close: np.ndarray, period: int, start: int) -> np.ndarray:
+    """Simple moving average of time-major closes for rows start onward (NaN before)."""
+    out = np.full(close.shape, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(close[start - period + 1:], period, axis=0)
+    out[start:] = windows.mean(axis=-1)
+    return out
+
+
+def rsi_from_averages(avg_gain: np.ndarray, avg_loss: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+def gains_losses(close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-row close-to-close gain and loss (row 0 is NaN)."""
+    change = np.full(close.shape, np.nan)
+    change[1:] = close[1:] - close[:-1]
+    return np.maximum(change, 0), np.maximum(-change, 0)
+
+
+def compute_v000(grid: Grid) -> dict[str, np.ndarray]:
+    """
+    Compute the v000 indicator columns for every series of a grid. Returns
+    time-major (GRID_MINUTES, n) arrays which are NaN before 9:00.
+    """
+    close = grid.close
+
+    # VWAP accumulates from the first bar and restarts at 9:30
+    price_volume = np.nan_to_num((grid.high + grid.low + close) / 3 * grid.volume)
+    cum_price_volume = np.cumsum(price_volume, axis=0)
+    cum_volume = np.cumsum(grid.volume, axis=0)
+    cum_price_volume[VWAP_RESET_INDEX:] = np.cumsum(price_volume[VWAP_RESET_INDEX:], axis=0)
+    cum_volume[VWAP_RESET_INDEX:] = np.cumsum(grid.volume[VWAP_RESET_INDEX:], axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = cum_price_volume / cum_volume
+
+    columns = {'VWAP': vwap}
+    for period in SMA_PERIODS:
+        columns[f'{period}SMA'] = sma_path(close, period, OUTPUT_INDEX)
+
+    # EMAs are seeded at 8:30 with simple averages
+    ema12 = ema_path(close, INIT_INDEX, close[INIT_INDEX - 11:INIT_INDEX + 1].mean(axis=0), 12, EMA12_SMOOTHING)
+    ema26 = ema_path(close, INIT_INDEX, close[INIT_INDEX - 25:INIT_INDEX + 1].mean(axis=0), 26, EMA26_SMOOTHING)
+    macd = ema12 - ema26
+
+    # the signal line is seeded at 8:38 with the average MACD since 8:30
+    macds = ema_path(macd, MACDS_INIT_INDEX, macd[INIT_INDEX:MACDS_INIT_INDEX + 1].mean(axis=0), 9, MACDS_SMOOTHING)
+
+    # RSI averages are seeded at 8:30 with the mean of the previous 14 changes
+    gains, losses = gains_losses(close)
+    seed_rows = slice(INIT_INDEX - RSI_PERIOD + 1, INIT_INDEX + 1)
+    avg_gain = wilder_path(gains, INIT_INDEX, gains[seed_rows].mean(axis=0), RSI_PERIOD)
+    avg_loss = wilder_path(losses, INIT_INDEX, losses[seed_rows].mean(axis=0), RSI_PERIOD)
+
+    columns.update({'12EMA': ema12, '26EMA': ema26, 'MACD': macd, 'MACDS': macds, 'RSI': rsi_from_averages(avg_gain, avg_loss)})
+
+    # nothing is output before 9:00
+    for values in columns.values():
+        values[:OUTPUT_INDEX] = np.nan
+
+    return columns
+
+
+def valid_series(grid: Grid) -> np.ndarray:
+    """Series the Go generator would write: first bar before 8:05 and with volume."""
+    first_volume = grid.volume[grid.first_index, np.arange(len(grid.keys))]
+    return (grid.first_index < FIRST_BAR_DEADLINE) & (first_volume > 0)
+
+
+def compute_frame(bars: pd.DataFrame, decimals: int = 3) -> pd.DataFrame:
+    """
+    Compute v000 rows for every (symbol, day) in bars. Returns a long
+    DataFrame with symbol and date columns followed by the v000 data file
+    columns, rounded like the Go generator's %.3f output.
+    """
+    grid = bars_to_grid(bars)
+    columns = compute_v000(grid)
+
+    valid = valid_series(grid)
+    rows = np.arange(OUTPUT_INDEX, GRID_MINUTES)
+
+    # keep valid series up to their last real bar, in (symbol, date, time) order
+    mask = valid[None, :] & (rows[:, None] <= grid.last_index[None, :])
+    series_index, row_index = np.nonzero(mask.T)
+    time_index = rows[row_index]
+
+    minutes = GRID_START + time_index
+    frame = pd.DataFrame({
+        'symbol': grid.keys['symbol'].to_numpy()[series_index],
+        'date': grid.keys['date'].to_numpy()[series_index],
+        'time': [f'{minute // 60:02d}:{minute % 60:02d}' for minute in minutes],
+    })
+    for column in ('open', 'high', 'low', 'close'):
+        frame[column] = getattr(grid, column)[time_index, series_index].round(decimals)
+    frame['volume'] = grid.volume[time_index, series_index].astype(np.int64)
+    for column in INDICATOR_COLUMNS:
+        frame[column] = columns[column][time_index, series_index].round(decimals)
+
+    return frame[['symbol', 'date'] + DATA_COLUMNS]
+
+
+def continue_v000(high: np.ndarray, low: np.ndarray, close: np.ndarray, volume: np.ndarray, seeds: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    """
+    Recompute indicator columns from time-major v000 rows (9:00 onward) alone,
+    continuing the recursive indicators from the seed values of row 0 (e.g.
+    the first row of a data file). seeds holds row 0 of 12EMA, 26EMA and
+    MACDS, and the first rows of RSI (e.g. 30), from which the two RSI
+    averages are recovered by least squares. SMAs are exact from row 12 and VWAP from
+    9:30 (row 30); the recursive columns converge to the Go values as the
+    rounding error of the seeds decays. Used to check parity against the
+    checked-in v000 files, which do not include the pre-market bars.
+    """
+    reset = VWAP_RESET_INDEX - OUTPUT_INDEX
+    price_volume = (high + low + close) / 3 * volume
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = np.full(close.shape, np.nan)
+        vwap[reset:] = np.cumsum(price_volume[reset:], axis=0) / np.cumsum(volume[reset:], axis=0)
+
+    columns = {'VWAP': vwap}
+    for period in SMA_PERIODS:
+        columns[f'{period}SMA'] = sma_path(close, period, max(SMA_PERIODS) - 1)
+
+    ema12 = ema_path(close, 0, seeds['12EMA'], 12, EMA12_SMOOTHING)
+    ema26 = ema_path(close, 0, seeds['26EMA'], 26, EMA26_SMOOTHING)
+    macd = ema12 - ema26
+    macds = ema_path(macd, 0, seeds['MACDS'], 9, MACDS_SMOOTHING)
+
+    # only the ratio of the RSI averages is printed, so fit both seeds to the
+    # RSI of the first rows: RSI = 100 * G / (G + L) is linear in the seeds
+    gains, losses = gains_losses(close)
+    gains[0] = losses[0] = 0.0
+    rsi = seeds['RSI']
+    decay = ((RSI_PERIOD - 1) / RSI_PERIOD) ** np.arange(len(rsi))[:, None]
+    unseeded_gain = wilder_path(gains[:len(rsi)], 0, 0.0, RSI_PERIOD)
+    unseeded_loss = wilder_path(losses[:len(rsi)], 0, 0.0, RSI_PERIOD)
+    a = np.nan_to_num(np.stack([decay * (100 - rsi), -decay * rsi], axis=-1).transpose(1, 0, 2))
+    b = np.nan_to_num(rsi * unseeded_loss - (100 - rsi) * unseeded_gain).T[:, :, None]
+    gain_seed, loss_seed = (np.linalg.pinv(a) @ b)[:, :, 0].T
+
+    avg_gain = wilder_path(gains, 0, gain_seed, RSI_PERIOD)
+    avg_loss = wilder_path(losses, 0, loss_seed, RSI_PERIOD)
+
+    columns.update({'12EMA': ema12, '26EMA': ema26, 'MACD': macd, 'MACDS': macds, 'RSI': rsi_from_averages(avg_gain, avg_loss)})
+    return columns
@@ -0,0 +1,262 @@
+'''
+Batched next-minute close predictions for every symbol of a market state block.
+
+The model trained by model-training/train-next-minute.py takes one symbol's
+window of normalized FEATURE_COLUMNS rows. Calling it once per symbol per
+minute costs a Python round trip and a small forward pass per symbol, so
+InferenceServer keeps the latest window of every symbol in one preallocated
+(symbols, window, features) float32 array and runs a single forward pass over
+all of them once per minute:
+
+    reader = MarketStateReader('dogtrader')
+    predictor = TFLitePredictor(model_path, batch_size=len(reader.symbols))
+    server = InferenceServer(predictor, reader.symbols)
+    await server.run(reader, handler)  # handler(Predictions) once per minute
+
+A minute's batch runs as soon as every symbol has its bar in the block, or
+max_wait seconds after the first one arrived (symbols without a bar that
+minute repeat their previous row with zero volume, like the gaps of the day
+files). Windows are normalized with training_dataset.normalize_features
+against each symbol's first bar at or after 9:00 AM, exactly as in training,
+and a symbol is ready once it has a full window of rows since then.
+
+The model is loaded once. Two CPU backends have the same interface:
+KerasPredictor (a traced tf.function) and TFLitePredictor (the model exported
+to TensorFlow Lite, dynamic-range quantized by default). The TFLite export has
+a static batch size, so batches are always padded to the number of symbols.
+Each batch's feature, forward and total times, and the time from the bar
+close to the predictions, are recorded in dogtrader.latency histograms.
+'''
+
+import asyncio
+import collections
+import datetime
+import os
+import tempfile
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from dogtrader import data_quality, training_dataset
+from dogtrader.latency import LatencyHistogram
+from dogtrader.trading_calendar import NEW_YORK
+
+DEFAULT_MAX_WAIT = 0.5
+DEFAULT_POLL_INTERVAL = 0.005
+
+# first and last minute predicted, the window of the day files
+START_MINUTE = data_quality.FILE_START_MINUTE
+END_MINUTE = data_quality.FILE_END_MINUTE
+
+# features: normalizing the new rows; forward: the model; batch: both;
+# close: bar close (start + 1 minute) -> predictions, including bar delivery
+STAGES = ['features', 'forward', 'batch', 'close']
+
+# normalized and close are (symbols,), NaN where not ready
+Predictions = collections.namedtuple('Predictions', ['minute', 'symbols', 'ready', 'normalized', 'close', 'latency_ns'])
+
+_VOLUME = training_dataset.FEATURE_COLUMNS.index('volume')
+_OPEN = training_dataset.FEATURE_COLUMNS.index('open')
+
+
+def tflite_path(model_path: str, batch_size: int, quantize: bool = True) -> str:
+    """Path of the TFLite export of model_path for batch_size, next to it."""
+    stem = os.path.splitext(model_path)[0]
+    return f'{stem}.b{batch_size}{".q" if quantize else ""}.tflite'
+
+
+def export_tflite(model_path: str, batch_size: int, quantize: bool = True, output_path: str = None) -> str:
+    """
+    Convert a saved Keras model to TensorFlow Lite with a static batch size
+    (recurrent layers only convert with static shapes), dynamic-range
+    quantizing the weights to int8 with quantize. Returns the output path.
+    """
+    output_path = output_path or tflite_path(model_path, batch_size, quantize)
+    model = tf.keras.models.load_model(model_path, compile=False)
+    window, features = model.input_shape[1:]
+
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        model.export(saved_model_dir, input_signature=[tf.TensorSpec((batch_size, window, features), tf.float32)], verbose=False)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        if quantize:
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        flatbuffer = converter.convert()
+
+    with open(output_path + '.tmp', 'wb') as file:
+        file.write(flatbuffer)
+    os.replace(output_path + '.tmp', output_path)
+    return output_path
+
+
+class KerasPredictor:
+    """A saved Keras model behind a tf.function traced once for batch_size."""
+
+    def __init__(self, model_path: str, batch_size: int):
+        self.model = tf.keras.models.load_model(model_path, compile=False)
+        self.batch_size = batch_size
+        self.window, self.features = self.model.input_shape[1:]
+
+        model = self.model
+        self.forward = tf.function(lambda batch: model(batch, training=False), input_signature=[tf.TensorSpec((batch_size, self.window, self.features), tf.float32)])
+        self(np.zeros((batch_size, self.window, self.features), dtype=np.float32))
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        return self.forward(batch).numpy()[:, 0]
+
+
+class TFLitePredictor:
+    """
+    The TFLite export of a saved Keras model (exported on first use, or again
+    when the model is newer than the export) in a tf.lite.Interpreter.
+    """
+
+    def __init__(self, model_path: str, batch_size: int, quantize: bool = True, num_threads: int = None):
+        path = tflite_path(model_path, batch_size, quantize)
+        if not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(model_path):
+            export_tflite(model_path, batch_size, quantize, path)
+
+        self.path = path
+        self.batch_size = batch_size
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        input_details = self.interpreter.get_input_details()[0]
+        self.input_index = input_details['index']
+        self.output_index = self.interpreter.get_output_details()[0]['index']
+        self.window, self.features = input_details['shape'][1:]
+        self(np.zeros((batch_size, self.window, self.features), dtype=np.float32))
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        self.interpreter.set_tensor(self.input_index, batch)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self.output_index)[:, 0].copy()
+
+
+class FeatureWindows:
+    """
+    Latest window of normalized rows of every symbol, advanced one minute for
+    all symbols at once. values is the model's input batch.
+    """
+
+    def __init__(self, count: int, window: int):
+        self.window = window
+        self.values = np.zeros((count, window, len(training_dataset.FEATURE_COLUMNS)), dtype=np.float32)
+        self.reference = np.full(count, np.nan)
+        self.last = np.full((count, len(training_dataset.FEATURE_COLUMNS)), np.nan)
+        self.rows = np.zeros(count, dtype=np.int64)
+        self.day = None
+        self.minute = None
+
+    def reset(self, day: int):
+        self.values[:] = 0
+        self.reference[:] = np.nan
+        self.last[:] = np.nan
+        self.rows[:] = 0
+        self.day = day
+        self.minute = None
+
+    @property
+    def ready(self) -> np.ndarray:
+        return self.rows >= self.window
+
+    def _push(self, raw: np.ndarray, fresh: np.ndarray):
+        # symbols without a bar repeat their previous row with zero volume
+        carried = self.last.copy()
+        carried[:, _VOLUME] = 0
+        raw = np.where(fresh[:, None], raw, carried)
+
+        starting = fresh & np.isnan(self.reference)
+        self.reference[starting] = raw[starting, _OPEN]
+        started = ~np.isnan(self.reference)
+
+        self.values[:, :-1] = self.values[:, 1:]
+        self.values[:, -1] = np.where(started[:, None], training_dataset.normalize_features(raw, self.reference), 0)
+        self.last = np.where(started[:, None], raw, np.nan)
+        self.rows += started
+
+    def append(self, day: int, minute: int, raw: np.ndarray, fresh: np.ndarray):
+        """
+        Add the raw FEATURE_COLUMNS row (symbols, features) of minute (after
+        midnight) of day, where fresh marks the symbols with a bar for it.
+        Minutes skipped since the previous append are carried forward first.
+        """
+        if day != self.day:
+            self.reset(day)
+        if self.minute is not None:
+            nothing = np.zeros(len(fresh), dtype=bool)
+            for _ in range(self.minute + 1, minute):
+                self._push(raw, nothing)
+        self._push(raw, fresh)
+        self.minute = minute
+
+
+class InferenceServer:
+    """Per-minute batched predictions of symbols (in the market state row order)."""
+
+    def __init__(self, predictor, symbols: list[str]):
+        if predictor.batch_size != len(symbols):
+            raise ValueError(f'predictor batch size {predictor.batch_size} does not match {len(symbols)} symbol(s)')
+        self.predictor = predictor
+        self.symbols = list(symbols)
+        self.windows = FeatureWindows(len(symbols), predictor.window)
+        self.histograms = {stage: LatencyHistogram() for stage in STAGES}
+        self.batches = 0
+
+    def predict_minute(self, minute_ns: int, rows: np.ndarray) -> Predictions:
+        """
+        Predict from the market state rows (MarketStateReader.snapshot_all) of
+        the bars starting at minute_ns (nanoseconds since the epoch).
+        """
+        started = time.perf_counter_ns()
+        local = datetime.datetime.fromtimestamp(minute_ns / 1e9, NEW_YORK)
+        raw = np.stack([rows[column] for column in training_dataset.FEATURE_COLUMNS], axis=1)
+        self.windows.append(local.toordinal(), local.hour * 60 + local.minute, raw, rows['bar_time'] == minute_ns)
+        featured = time.perf_counter_ns()
+
+        output = self.predictor(self.windows.values)
+        finished = time.perf_counter_ns()
+
+        ready = self.windows.ready
+        normalized = np.where(ready, output, np.nan)
+        close = self.windows.reference * (1 + normalized)
+
+        self.batches += 1
+        self.histograms['features'].record(featured - started)
+        self.histograms['forward'].record(finished - featured)
+        self.histograms['batch'].record(finished - started)
+        self.histograms['close'].record(time.time_ns() - (minute_ns + 60 * 10**9))
+        return Predictions(minute_ns, self.symbols, ready, normalized, close, finished - started)
+
+    async def run(self, reader, handler, interval: float = DEFAULT_POLL_INTERVAL, max_wait: float = DEFAULT_MAX_WAIT):
+        """
+        Poll the block of reader every interval seconds and await
+        handler(Predictions) once per minute between 9:00 AM and 4:00 PM,
+        until canceled.
+        """
+        if reader.symbols != self.symbols:
+            raise ValueError('the market state block does not hold the served symbols in order')
+
+        # the latest minute in the block when starting is predicted too
+        bar_times = reader.view['bar_time']
+        done = 0
+        pending = None
+        first_seen = None
+        while True:
+            latest = bar_times.max()
+            if latest > done:
+                if latest != pending:
+                    pending, first_seen = latest, time.monotonic()
+                if (bar_times >= pending).all() or time.monotonic() - first_seen >= max_wait:
+                    local = datetime.datetime.fromtimestamp(pending / 1e9, NEW_YORK)
+                    if START_MINUTE <= local.hour * 60 + local.minute <= END_MINUTE:
+                        await handler(self.predict_minute(int(pending), reader.snapshot_all()))
+                    done = pending
+            await asyncio.sleep(interval)
+
+    def summary(self) -> list[str]:
+        """Summary lines (milliseconds) per stage."""
+        return [
+            f'{stage:<9}n={histogram.count:<8}p50={histogram.percentile(0.5) / 1e6:.2f}ms '
+            f'p99={histogram.percentile(0.99) / 1e6:.2f}ms max={histogram.max / 1e6:.2f}ms'
+            for stage, histogram in self.histograms.items() if histogram.count
+        ]
@@ -0,0 +1,217 @@
+'''
+Multi-ticker feature tensor of the data/tickers corpus, memory-mapped on disk.
+
+build lays every selected (ticker, day) onto a shared per-session minute grid
+(9:00 AM to 4:00 PM, the day file window) and writes one contiguous float32
+array of shape (days, minutes, tickers, features) with the normalized
+training_dataset.FEATURE_COLUMNS, plus a (days, minutes, tickers) bool mask of
+the minutes which had a row in the day file:
+
+    data/store/tensors/joint_v000/features.npy
+    data/store/tensors/joint_v000/mask.npy
+    data/store/tensors/joint_v000/index.json  # tickers, dates, features, fingerprint
+
+Missing minutes are forward-filled from the ticker's previous row of the same
+day; minutes before a ticker's first row of a day (and whole missing days) are
+zero with a False mask. Days come from a TickersManifest, and the index
+records a fingerprint of the selected files' checksums, so build reopens an
+up-to-date tensor instead of rebuilding it. Both arrays are .npy files and are
+opened with mmap_mode='r', so slicing a cross-sectional window reads only its
+rows:
+
+    tensor = joint_tensor.build(manifest, ['AAPL', 'MSFT', 'NVDA'])
+    positions = joint_tensor.window_positions(tensor, 30)
+    windows, targets = joint_tensor.gather_windows(tensor, positions[:256], 30)
+    # windows: (256, 30, tickers, features), targets: next-minute close (256, tickers)
+'''
+
+import collections
+import datetime
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from dogtrader import corpus, data_quality, training_dataset
+from dogtrader.paths import TENSORS_DIR
+
+GRID_START_MINUTE = data_quality.FILE_START_MINUTE
+GRID_MINUTES = data_quality.EXPECTED_ROWS
+
+FEATURES_FILE = 'features.npy'
+MASK_FILE = 'mask.npy'
+INDEX_FILE = 'index.json'
+
+# features: (days, minutes, tickers, features) float32; mask: (days, minutes, tickers) bool
+JointTensor = collections.namedtuple('JointTensor', ['features', 'mask', 'dates', 'tickers', 'feature_columns', 'path'])
+
+
+def tensor_path(version: str = corpus.DEFAULT_VERSION, tensors_dir: str = TENSORS_DIR) -> str:
+    return os.path.join(tensors_dir, f'joint_{version}')
+
+
+def fingerprint(rows, tickers: list[str]) -> str:
+    """Hash of the tickers, grid, feature columns and the selected day files' checksums."""
+    digest = hashlib.sha256(json.dumps([tickers, GRID_START_MINUTE, GRID_MINUTES, training_dataset.FEATURE_COLUMNS]).encode())
+    for symbol, date, checksum in sorted(zip(rows['symbol'], rows['date'], rows['checksum'])):
+        digest.update(f'{symbol},{date.isoformat()},{checksum}\n'.encode())
+    return digest.hexdigest()
+
+
+def open_tensor(path: str = None) -> JointTensor:
+    """Open a built tensor read-only (memory-mapped)."""
+    path = path or tensor_path()
+    with open(os.path.join(path, INDEX_FILE)) as file:
+        index = json.load(file)
+    return JointTensor(
+        np.load(os.path.join(path, FEATURES_FILE), mmap_mode='r'),
+        np.load(os.path.join(path, MASK_FILE), mmap_mode='r'),
+        [datetime.date.fromisoformat(date) for date in index['dates']],
+        index['tickers'],
+        index['feature_columns'],
+        path,
+    )
+
+
+def _read_fingerprint(path: str):
+    try:
+        with open(os.path.join(path, INDEX_FILE)) as file:
+            return json.load(file)['fingerprint']
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def fill_day(values: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """
+    Forward-fill a day's (minutes, tickers, features) values along minutes
+    from the last present row of each ticker; rows before the first present
+    one are zero.
+    """
+    minutes, tickers = present.shape
+    latest = np.where(present, np.arange(minutes)[:, None], -1)
+    np.maximum.accumulate(latest, axis=0, out=latest)
+    filled = values[np.maximum(latest, 0), np.arange(tickers)[None, :]]
+    filled[latest < 0] = 0
+    return filled
+
+
+def grid_day(series, tickers: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Lay one session's series of (ticker index, minutes after midnight,
+    normalized features) onto the grid. Returns the forward-filled (minutes,
+    tickers, features) values and the (minutes, tickers) mask of real rows.
+    """
+    values = np.zeros((GRID_MINUTES, tickers, len(training_dataset.FEATURE_COLUMNS)), dtype=np.float32)
+    present = np.zeros((GRID_MINUTES, tickers), dtype=bool)
+
+    for column, minutes, features in series:
+        minutes = np.asarray(minutes) - GRID_START_MINUTE
+        keep = (minutes >= 0) & (minutes < GRID_MINUTES)
+        values[minutes[keep], column] = features[keep]
+        present[minutes[keep], column] = True
+
+    return fill_day(values, present), present
+
+
+def build(manifest, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, version: str = corpus.DEFAULT_VERSION, clean: bool = False, path: str = None, force: bool = False) -> JointTensor:
+    """
+    Build (or reopen, if its files are unchanged) the tensor of symbols
+    (default: all in the manifest) between start and end from a refreshed
+    TickersManifest. clean only uses days without data_quality flags. Dates
+    are those on which at least one ticker has a day file.
+    """
+    path = path or tensor_path(version)
+    tickers = sorted(symbols) if symbols else manifest.symbols(version)
+    rows = manifest.select(tickers, start, end, version, clean)
+    if rows.empty:
+        raise ValueError('no day files selected for the tensor')
+
+    key = fingerprint(rows, tickers)
+    if not force and _read_fingerprint(path) == key:
+        return open_tensor(path)
+
+    dates = sorted(set(rows['date']))
+    date_index = {date: i for i, date in enumerate(dates)}
+    ticker_index = {ticker: i for i, ticker in enumerate(tickers)}
+
+    # the index is written last, so an interrupted build is never reused
+    os.makedirs(path, exist_ok=True)
+    if os.path.exists(os.path.join(path, INDEX_FILE)):
+        os.remove(os.path.join(path, INDEX_FILE))
+    features = np.lib.format.open_memmap(os.path.join(path, FEATURES_FILE), mode='w+', dtype=np.float32, shape=(len(dates), GRID_MINUTES, len(tickers), len(training_dataset.FEATURE_COLUMNS)))
+    mask = np.lib.format.open_memmap(os.path.join(path, MASK_FILE), mode='w+', dtype=np.bool_, shape=(len(dates), GRID_MINUTES, len(tickers)))
+
+    def day_series(date, day_rows):
+        for symbol, data_path, meta_path in zip(day_rows['symbol'], day_rows['data_path'], day_rows['meta_path']):
+            day = corpus.read_day(corpus.DayFile(symbol, date, version, data_path, meta_path), with_meta=False)
+            minutes = (day['timestamp'].dt.hour * 60 + day['timestamp'].dt.minute).to_numpy()
+            yield ticker_index[symbol], minutes, training_dataset.normalize_day(day)
+
+    for date, day_rows in rows.groupby('date', sort=True):
+        features[date_index[date]], mask[date_index[date]] = grid_day(day_series(date, day_rows), len(tickers))
+
+    features.flush()
+    mask.flush()
+    del features, mask
+
+    index = {
+        'fingerprint': key,
+        'version': version,
+        'tickers': tickers,
+        'dates': [date.isoformat() for date in dates],
+        'feature_columns': training_dataset.FEATURE_COLUMNS,
+        'grid_start_minute': GRID_START_MINUTE,
+    }
+    with open(os.path.join(path, INDEX_FILE + '.tmp'), 'w') as file:
+        json.dump(index, file)
+    os.replace(os.path.join(path, INDEX_FILE + '.tmp'), os.path.join(path, INDEX_FILE))
+
+    return open_tensor(path)
+
+
+def window_positions(tensor: JointTensor, window: int, require_all: bool = True) -> np.ndarray:
+    """
+    (day, minute) pairs of the windows of rows [minute - window, minute) with
+    a target row at minute, as an (n, 2) array. With require_all every ticker
+    must have real rows over the window and target, otherwise at least one.
+    """
+    minutes = tensor.mask.shape[1]
+    if minutes <= window:
+        return np.empty((0, 2), dtype=np.intp)
+
+    complete = tensor.mask.all(axis=2) if require_all else tensor.mask.any(axis=2)
+
+    # count of incomplete rows over each window and its target via cumulative sums
+    gaps = np.cumsum(~complete, axis=1)
+    gaps = np.concatenate([np.zeros((len(gaps), 1), dtype=gaps.dtype), gaps], axis=1)
+    ends = np.arange(window, minutes)
+    valid = (gaps[:, ends + 1] - gaps[:, ends - window]) == 0
+
+    days, offsets = np.nonzero(valid)
+    return np.stack([days, ends[offsets]], axis=1)
+
+
+def gather_windows(tensor: JointTensor, positions: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Windows (n, window, tickers, features) and next-minute normalized close
+    targets (n, tickers) at positions from window_positions.
+    """
+    days = positions[:, 0]
+    minutes = positions[:, 1]
+    rows = minutes[:, None] + np.arange(-window, 0)[None, :]
+    windows = tensor.features[days[:, None], rows]
+    targets = tensor.features[days, minutes, :, tensor.feature_columns.index('close')]
+    return np.ascontiguousarray(windows), np.ascontiguousarray(targets)
+
+
+def batches(tensor: JointTensor, positions: np.ndarray, window: int, batch_size: int = 256, shuffle: bool = False, seed: int = None):
+    """
+    Yield (windows, targets) batches of gather_windows over positions,
+    shuffled once per call with shuffle. Each batch reads only its own rows
+    of the memory-mapped tensor.
+    """
+    order = np.random.default_rng(seed).permutation(len(positions)) if shuffle else np.arange(len(positions))
+    for i in range(0, len(order), batch_size):
+        # sorted reads keep the batch's page accesses in file order
+        yield gather_windows(tensor, positions[np.sort(order[i:i + batch_size])], window)
@@ -0,0 +1,205 @@
+'''
+Latency instrumentation of the live trading path.
+
+The path from a quote arriving to the broker acknowledging an order is split
+into stages, each timed with the monotonic time.perf_counter_ns clock:
+
+    dispatch   message received by the stream -> handler entry
+    decision   handler entry -> gap decision (includes the coalescing window)
+    queue      decision -> submit_order called (order queue and thread hop)
+    broker     submit_order called -> returned (REST round trip)
+    total      message received -> submit_order returned
+
+LatencyTracker keeps one HDR-style LatencyHistogram per stage and symbol (and
+one per stage over all symbols, symbol '*'), logs a summary periodically and
+serves the histograms in the Prometheus text format on a local port. The
+instrumented components (QuoteDispatcher, OrderManager) take an optional
+tracker and only check it against None when it is not given, so disabled
+instrumentation costs one comparison per message:
+
+    tracker = latency.LatencyTracker()
+    tracker.attach(stock_stream)
+    dispatcher = QuoteDispatcher(gap_book, on_gap, tracker=tracker)
+    orders = OrderManager(trading_client, tracker=tracker)
+    asyncio.gather(tracker.log_periodically(), tracker.serve_metrics())
+'''
+
+import asyncio
+import time
+
+STAGES = ['dispatch', 'decision', 'queue', 'broker', 'total']
+
+ALL_SYMBOLS = '*'
+
+DEFAULT_SUB_BUCKET_BITS = 8
+DEFAULT_MAX_VALUE_NS = 60 * 10**9
+DEFAULT_LOG_INTERVAL = 60
+DEFAULT_METRICS_HOST = '127.0.0.1'
+DEFAULT_METRICS_PORT = 9464
+QUANTILES = [0.5, 0.9, 0.99, 0.999]
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of nanosecond values in the style of HdrHistogram.
+
+    Values below 2**sub_bucket_bits are counted exactly; above that every
+    power-of-two range is split into 2**(sub_bucket_bits - 1) linear buckets,
+    so a value is known to within 1 / 2**(sub_bucket_bits - 1) of itself
+    (under 0.8% by default) with a fixed array of a few thousand counts.
+    Recording is O(1).
+    """
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS, max_value_ns: int = DEFAULT_MAX_VALUE_NS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.sub_bucket_count = 1 << sub_bucket_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.max_value = int(max_value_ns)
+        self.counts = [0] * (self._index(self.max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.sub_bucket_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + (value >> shift) - self.half_count
+
+    def _value(self, index: int) -> int:
+        """Midpoint of the values counted at index."""
+        if index < self.sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        return ((offset + self.half_count) << shift) + (1 << (shift - 1))
+
+    def record(self, value_ns: int):
+        value = min(max(int(value_ns), 0), self.max_value)
+        self.counts[self._index(value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, quantile: float) -> int:
+        """Value at quantile (0 to 1) in nanoseconds, 0 when empty."""
+        if not self.count:
+            return 0
+        target = max(1, int(quantile * self.count + 0.5))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value(index), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class LatencyTracker:
+    """Per-stage, per-symbol latency histograms of the trading path."""
+
+    def __init__(self, sub_bucket_bits: int = DEFAULT_SUB_BUCKET_BITS):
+        self.sub_bucket_bits = sub_bucket_bits
+        self.histograms = {}
+
+        # latest timestamps per symbol along the path
+        self.received = {}
+        self.entered = {}
+        self.origin = {}
+
+    def histogram(self, stage: str, symbol: str) -> LatencyHistogram:
+        histogram = self.histograms.get((stage, symbol))
+        if histogram is None:
+            histogram = self.histograms[(stage, symbol)] = LatencyHistogram(self.sub_bucket_bits)
+        return histogram
+
+    def record(self, stage: str, symbol: str, value_ns: int):
+        self.histogram(stage, symbol).record(value_ns)
+        self.histogram(stage, ALL_SYMBOLS).record(value_ns)
+
+    def attach(self, stream):
+        """Stamp the receive time of every message stream dispatches."""
+        dispatch = stream._dispatch
+        received = self.received
+
+        async def timed_dispatch(msg):
+            received[msg.get('S')] = time.perf_counter_ns()
+            await dispatch(msg)
+
+        stream._dispatch = timed_dispatch
+
+    def handler_entry(self, symbol: str):
+        now = time.perf_counter_ns()
+        self.entered[symbol] = now
+        received = self.received.get(symbol)
+        if received is not None:
+            self.record('dispatch', symbol, now - received)
+
+    def decision(self, symbol: str) -> int:
+        """Record the decision on symbol's latest message and return its timestamp."""
+        now = time.perf_counter_ns()
+        entered = self.entered.get(symbol)
+        if entered is not None:
+            self.record('decision', symbol, now - entered)
+        self.origin[symbol] = self.received.get(symbol)
+        return now
+
+    def order_acked(self, symbol: str, signal_ns: int, submit_ns: int, ack_ns: int):
+        self.record('queue', symbol, submit_ns - signal_ns)
+        self.record('broker', symbol, ack_ns - submit_ns)
+        origin = self.origin.get(symbol)
+        if origin is not None:
+            self.record('total', symbol, ack_ns - origin)
+
+    def summary(self, symbols: bool = False) -> list[str]:
+        """Summary lines (microseconds) per stage, and per symbol if asked."""
+        lines = []
+        for (stage, symbol), histogram in sorted(self.histograms.items(), key=lambda item: (STAGES.index(item[0][0]), item[0][1])):
+            if symbol != ALL_SYMBOLS and not symbols:
+                continue
+            lines.append(
+                f'{stage:<9}{symbol:<7}n={histogram.count:<8}p50={histogram.percentile(0.5) / 1e3:.1f}us '
+                f'p99={histogram.percentile(0.99) / 1e3:.1f}us max={histogram.max / 1e3:.1f}us'
+            )
+        return lines
+
+    async def log_periodically(self, interval: float = DEFAULT_LOG_INTERVAL, symbols: bool = False):
+        while True:
+            await asyncio.sleep(interval)
+            for line in self.summary(symbols):
+                print(f'[ INFO ] latency {line}')
+
+    def metrics(self) -> str:
+        """Histograms in the Prometheus text exposition format (as summaries, in seconds)."""
+        lines = ['# TYPE dogtrader_latency_seconds summary']
+        for (stage, symbol), histogram in sorted(self.histograms.items()):
+            labels = f'stage="{stage}",symbol="{symbol}"'
+            for quantile in QUANTILES:
+                lines.append(f'dogtrader_latency_seconds{{{labels},quantile="{quantile}"}} {histogram.percentile(quantile) / 1e9:.9f}')
+            lines.append(f'dogtrader_latency_seconds_sum{{{labels}}} {histogram.total / 1e9:.9f}')
+            lines.append(f'dogtrader_latency_seconds_count{{{labels}}} {histogram.count}')
+        return '\n'.join(lines) + '\n'
+
+    async def serve_metrics(self, host: str = DEFAULT_METRICS_HOST, port: int = DEFAULT_METRICS_PORT):
+        """Serve metrics() over HTTP on host:port until canceled."""
+        async def handle(reader, writer):
+            try:
+                # only the request line matters, every path returns the metrics
+                await reader.readline()
+                body = self.metrics().encode()
+                writer.write(b'HTTP/1.0 200 OK\r\nContent-Type: text/plain; version=0.0.4\r\n')
+                writer.write(f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+                await writer.drain()
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(handle, host, port)
+        async with server:
+            await server.serve_forever()
@@ -0,0 +1,286 @@
+'''
+Latest market state of many symbols in shared memory, for strategy processes.
+
+One market-data process (data/tools/market-data-service.py) owns the only
+StockDataStream subscription per symbol and writes the latest quote, minute
+bar and v000 indicator values of every symbol into a NumPy structured array
+(STATE_DTYPE, one cache-line aligned row per symbol) in a
+multiprocessing.shared_memory block:
+
+    header (HEADER_SIZE bytes: magic, version, row count) | row 0 | row 1 | ...
+
+Strategy processes attach to the block by name and read the array in place,
+without copies or sockets. Rows are versioned seqlock style: the writer makes a
+row's seq odd before changing it and even again afterwards, and a reader
+copies the row and retries until seq was even and unchanged around the copy,
+so snapshots are never torn. (This relies on stores becoming visible in
+program order, which holds on x86-64.) There is a single writer per block.
+
+    # market-data process
+    feed = MarketDataFeed(MarketStateWriter('dogtrader', tickers))
+    stock_stream = StockDataStream(API_KEY, SECRET_KEY, raw_data=True)
+    feed.subscribe(stock_stream)
+
+    # strategy process
+    state = MarketStateReader('dogtrader')
+    row = state.snapshot('AAPL')  # consistent copy: row['ask_price'], row['RSI'], ...
+    asks = state.view['ask_price']  # zero-copy, latest values of every symbol
+'''
+
+import asyncio
+import collections
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+from dogtrader.indicators import INDICATOR_COLUMNS
+from dogtrader.streaming_indicators import IndicatorBank
+
+DEFAULT_NAME = 'dogtrader-market-state'
+
+MAGIC = b'DTMS'
+VERSION = 1
+
+# magic, version, row count; padded to a cache line
+HEADER = struct.Struct('<4sHxxI')
+HEADER_SIZE = 64
+
+ROW_ALIGNMENT = 64
+SYMBOL_SIZE = 16
+
+_FIELDS = [
+    ('seq', '<u8'),
+    ('symbol', f'S{SYMBOL_SIZE}'),
+    # latest quote, nanoseconds since the epoch
+    ('quote_time', '<i8'),
+    ('bid_price', '<f8'),
+    ('bid_size', '<f8'),
+    ('ask_price', '<f8'),
+    ('ask_size', '<f8'),
+    # latest minute bar
+    ('bar_time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('bar_vwap', '<f8'),
+    # indicators after the latest bar (NaN until ready)
+    ('ready', 'u1'),
+] + [(column, '<f8') for column in INDICATOR_COLUMNS]
+
+
+def _state_dtype() -> np.dtype:
+    packed = np.dtype(_FIELDS, align=True)
+    itemsize = -(-packed.itemsize // ROW_ALIGNMENT) * ROW_ALIGNMENT
+    return np.dtype({'names': packed.names, 'formats': [packed.fields[name][0] for name in packed.names], 'offsets': [packed.fields[name][1] for name in packed.names], 'itemsize': itemsize})
+
+
+STATE_DTYPE = _state_dtype()
+
+PRICE_FIELDS = ['bid_price', 'bid_size', 'ask_price', 'ask_size', 'open', 'high', 'low', 'close', 'volume', 'bar_vwap'] + INDICATOR_COLUMNS
+
+QuoteUpdate = collections.namedtuple('QuoteUpdate', ['symbol', 'timestamp', 'bid_price', 'bid_size', 'ask_price', 'ask_size'])
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to an existing block without tracking it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        pass
+
+    # before Python 3.13 attaching registers the block with the resource tracker, which unlinks it when the reader exits
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _rows(buffer, count: int) -> np.ndarray:
+    return np.ndarray((count,), dtype=STATE_DTYPE, buffer=buffer, offset=HEADER_SIZE)
+
+
+class MarketStateWriter:
+    """Creates the shared block and is its only writer."""
+
+    def __init__(self, name: str, symbols: list[str]):
+        self.symbols = list(symbols)
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + len(self.symbols) * STATE_DTYPE.itemsize)
+        HEADER.pack_into(self.shm.buf, 0, MAGIC, VERSION, len(self.symbols))
+
+        self.rows = _rows(self.shm.buf, len(self.symbols))
+        self.rows['seq'] = 0
+        self.rows['symbol'] = [symbol.encode() for symbol in self.symbols]
+        self.rows['quote_time'] = 0
+        self.rows['bar_time'] = 0
+        self.rows['ready'] = 0
+        for field in PRICE_FIELDS:
+            self.rows[field] = np.nan
+
+        # field views, so a write is one array store
+        self.fields = {name: self.rows[name] for name in STATE_DTYPE.names}
+        self.seq = self.fields['seq']
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write_quote(self, row: int, time_ns: int, bid_price: float, bid_size: float, ask_price: float, ask_size: float):
+        fields = self.fields
+        self.seq[row] += 1
+        fields['quote_time'][row] = time_ns
+        fields['bid_price'][row] = bid_price
+        fields['bid_size'][row] = bid_size
+        fields['ask_price'][row] = ask_price
+        fields['ask_size'][row] = ask_size
+        self.seq[row] += 1
+
+    def write_bar(self, row: int, time_ns: int, open: float, high: float, low: float, close: float, volume: float, vwap: float, indicators=None):
+        """Write a bar and, if given, the IndicatorState after it."""
+        fields = self.fields
+        self.seq[row] += 1
+        fields['bar_time'][row] = time_ns
+        fields['open'][row] = open
+        fields['high'][row] = high
+        fields['low'][row] = low
+        fields['close'][row] = close
+        fields['volume'][row] = volume
+        fields['bar_vwap'][row] = vwap
+        if indicators is not None:
+            fields['ready'][row] = indicators.ready
+            for column, value in zip(INDICATOR_COLUMNS, indicators.row()):
+                fields[column][row] = value
+        self.seq[row] += 1
+
+    def close(self):
+        # the views must go before the buffer can be released
+        self.fields = self.seq = self.rows = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+class MarketStateReader:
+    """Attaches to a block by name; reads never write to it."""
+
+    def __init__(self, name: str = DEFAULT_NAME):
+        self.shm = _attach(name)
+
+        magic, version, count = HEADER.unpack_from(self.shm.buf, 0)
+        if magic != MAGIC or version != VERSION:
+            self.shm.close()
+            raise ValueError(f'{name} is not a version {VERSION} market state block')
+
+        self.view = _rows(self.shm.buf, count)
+        self.view.flags.writeable = False
+        self.symbols = [symbol.decode() for symbol in self.view['symbol']]
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.seq = self.view['seq']
+        self.retries = 0
+
+    def snapshot_row(self, row: int) -> np.void:
+        """Consistent copy of a row."""
+        seq = self.seq
+        view = self.view
+        while True:
+            before = seq[row]
+            if not before & 1:
+                copy = view[row].copy()
+                if seq[row] == before:
+                    return copy
+            # the writer is mid-update; let it run
+            self.retries += 1
+            time.sleep(0)
+
+    def snapshot(self, symbol: str) -> np.void:
+        """Consistent copy of a symbol's row (KeyError if the block does not hold it)."""
+        return self.snapshot_row(self.index[symbol])
+
+    def snapshot_all(self) -> np.ndarray:
+        """Consistent copy of every row (each row on its own, not all at one instant)."""
+        copy = self.view.copy()
+        torn = np.flatnonzero((copy['seq'] != self.seq) | (copy['seq'] & 1).astype(bool))
+        for row in torn:
+            copy[row] = self.snapshot_row(row)
+        return copy
+
+    async def watch_quotes(self, handler, symbols: list[str] = None, interval: float = 0.001):
+        """
+        Poll for new quotes of symbols (default: all) every interval seconds
+        and await handler(QuoteUpdate) for each, until canceled. The change
+        check is one vectorized comparison over the zero-copy view.
+        """
+        rows = np.array([self.index[symbol] for symbol in symbols] if symbols is not None else range(len(self.symbols)), dtype=np.intp)
+        quote_times = self.view['quote_time']
+        seen = quote_times[rows].copy()
+        while True:
+            current = quote_times[rows]
+            changed = np.flatnonzero(current != seen)
+            for position in changed:
+                row = rows[position]
+                snapshot = self.snapshot_row(row)
+                seen[position] = snapshot['quote_time']
+                await handler(QuoteUpdate(self.symbols[row], int(snapshot['quote_time']), float(snapshot['bid_price']), float(snapshot['bid_size']), float(snapshot['ask_price']), float(snapshot['ask_size'])))
+            await asyncio.sleep(interval)
+
+    def close(self):
+        self.seq = None
+        self.view = None
+        self.shm.close()
+
+
+class MarketDataFeed:
+    """
+    Raw (raw_data=True) StockDataStream quote and bar handlers writing into a
+    MarketStateWriter, with indicators updated by an IndicatorBank.
+    """
+
+    def __init__(self, writer: MarketStateWriter, bank: IndicatorBank = None):
+        self.writer = writer
+        self.bank = bank or IndicatorBank(writer.symbols)
+        self.quotes = 0
+        self.bars = 0
+        self.started = time.monotonic()
+
+    def subscribe(self, stream):
+        stream.subscribe_quotes(self.handle_quote, *self.writer.symbols)
+        stream.subscribe_bars(self.handle_bar, *self.writer.symbols)
+
+    async def handle_quote(self, msg: dict):
+        row = self.writer.index.get(msg['S'])
+        if row is None:
+            return
+        self.quotes += 1
+        self.writer.write_quote(row, msg['t'].to_unix_nano(), msg['bp'], msg['bs'], msg['ap'], msg['as'])
+
+    async def handle_bar(self, msg: dict):
+        symbol = msg['S']
+        row = self.writer.index.get(symbol)
+        if row is None:
+            return
+        self.bars += 1
+        timestamp = msg['t']
+        state = self.bank.update(symbol, timestamp.to_datetime(), msg['h'], msg['l'], msg['c'], msg['v'])
+        self.writer.write_bar(row, timestamp.to_unix_nano(), msg['o'], msg['h'], msg['l'], msg['c'], msg['v'], msg.get('vw', np.nan), state)
+
+    def warm_up(self, bars):
+        """Feed today's historical bars (symbol, timestamp, open, high, low, close, volume[, vwap]) and write each symbol's last one."""
+        self.bank.warm_up(bars)
+        for symbol, symbol_bars in bars.sort_values('timestamp').groupby('symbol'):
+            row = self.writer.index.get(symbol)
+            if row is None:
+                continue
+            last = symbol_bars.iloc[-1]
+            self.writer.write_bar(row, last['timestamp'].value, last['open'], last['high'], last['low'], last['close'], last['volume'], last.get('vwap', np.nan), self.bank.state(symbol))
+
+    def rates(self) -> tuple[float, float]:
+        """Quotes and bars per second since the feed started."""
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return self.quotes / elapsed, self.bars / elapsed
@@ -0,0 +1,260 @@
+'''
+Asyncio order management for the live strategies.
+
+Alpaca's TradingClient is synchronous, so calling submit_order from a stream
+handler blocks the websocket event loop for a full REST round trip. Instead,
+handlers hand order requests to OrderManager.submit, which only puts them on a
+queue and returns a future. Submitter tasks take requests off the queue and
+run the REST calls in a small thread pool, all sharing the one TradingClient
+(and so its requests session and kept-alive HTTPS connection, which warm_up
+opens before the first signal).
+
+Time-based cancels (e.g. the gap orders at 10:00, 10:15 or 10:30 AM) are
+scheduled on a TimerWheel, which sleeps between one-second ticks instead of
+polling the clock. Order state is tracked from TradingStream trade update
+events:
+
+    order_manager = OrderManager(trading_client)
+    trading_stream.subscribe_trade_updates(order_manager.handle_trade_update)
+    order_manager.submit(order_data, cancel_at=order_manager.cancel_time(datetime.time(10, 30)))
+    await order_manager.run_until(deadline)
+'''
+
+import asyncio
+import concurrent.futures
+import datetime
+import time
+
+from dogtrader import trading_calendar
+
+# New York times the gap orders can be canceled at
+CANCEL_TIMES = [datetime.time(10, 0), datetime.time(10, 15), datetime.time(10, 30)]
+
+# trade update events after which an order can no longer fill
+FINAL_EVENTS = {'fill', 'canceled', 'expired', 'rejected', 'replaced', 'done_for_day'}
+
+DEFAULT_WORKERS = 2
+DEFAULT_TICK = 1.0
+DEFAULT_SLOTS = 3600
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel running callbacks on the event loop.
+
+    Deadlines are rounded up to the next tick and hashed into one of slots
+    buckets; each tick only looks at its own bucket, so scheduling, canceling
+    and firing are O(1) no matter how many timers are pending. Callbacks may be
+    plain functions or coroutine functions.
+    """
+
+    def __init__(self, tick: float = DEFAULT_TICK, slots: int = DEFAULT_SLOTS, clock=time.time):
+        self.tick = tick
+        self.clock = clock
+        self.slots = [[] for _ in range(slots)]
+        self.current_tick = int(clock() // tick)
+        self.pending = 0
+
+    def schedule(self, when: float, callback, *args) -> list:
+        """Run callback(*args) at epoch seconds when (on the next tick if it has passed)."""
+        tick_index = max(-int(-when // self.tick), self.current_tick + 1)
+        entry = [tick_index, callback, args, False]
+        self.slots[tick_index % len(self.slots)].append(entry)
+        self.pending += 1
+        return entry
+
+    def schedule_at(self, when: datetime.datetime, callback, *args) -> list:
+        """Run callback(*args) at a timezone-aware datetime."""
+        return self.schedule(when.timestamp(), callback, *args)
+
+    def cancel(self, entry: list):
+        if not entry[3]:
+            entry[3] = True
+            self.pending -= 1
+
+    def advance(self, now: float):
+        """Fire every timer due by now (catching up on ticks missed while the loop was busy)."""
+        now_tick = int(now // self.tick)
+        while self.current_tick < now_tick:
+            self.current_tick += 1
+            slot = self.slots[self.current_tick % len(self.slots)]
+            if not slot:
+                continue
+
+            due = [entry for entry in slot if entry[0] <= self.current_tick]
+            slot[:] = [entry for entry in slot if entry[0] > self.current_tick]
+            for entry in due:
+                if entry[3]:
+                    continue
+                entry[3] = True
+                self.pending -= 1
+                result = entry[1](*entry[2])
+                if asyncio.iscoroutine(result):
+                    asyncio.get_running_loop().create_task(result)
+
+    async def run(self):
+        """Advance the wheel once per tick until canceled."""
+        while True:
+            now = self.clock()
+            self.advance(now)
+            await asyncio.sleep((self.current_tick + 1) * self.tick - now)
+
+
+class ManagedOrder:
+    """State of an order as known from its submission and trade updates."""
+
+    __slots__ = ('id', 'symbol', 'status', 'filled_qty', 'filled_avg_price', 'signal_time', 'submit_latency', 'cancel_timer')
+
+    def __init__(self, order_id: str, symbol: str = None):
+        self.id = order_id
+        self.symbol = symbol
+        self.status = 'new'
+        self.filled_qty = 0.0
+        self.filled_avg_price = None
+        self.signal_time = None
+        self.submit_latency = None
+        self.cancel_timer = None
+
+    @property
+    def final(self) -> bool:
+        return self.status in FINAL_EVENTS
+
+
+class OrderManager:
+    """Non-blocking submit queue, scheduled cancels and trade update tracking for a TradingClient."""
+
+    def __init__(self, trading_client, workers: int = DEFAULT_WORKERS, wheel: TimerWheel = None, tracker=None):
+        self.client = trading_client
+        self.tracker = tracker
+        self.workers = workers
+        self.wheel = wheel or TimerWheel()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='order-manager')
+        self.queue = None
+        self.in_flight = 0
+        self.orders = {}
+        self.tasks = []
+
+    def cancel_time(self, at: datetime.time, date: datetime.date = None) -> datetime.datetime:
+        """UTC datetime of a New York time today (or on date)."""
+        return trading_calendar.to_utc(date or datetime.datetime.now(trading_calendar.NEW_YORK).date(), at)
+
+    def _order(self, order_id: str, symbol: str = None) -> ManagedOrder:
+        order = self.orders.get(order_id)
+        if order is None:
+            order = self.orders[order_id] = ManagedOrder(order_id, symbol)
+        elif symbol is not None:
+            order.symbol = symbol
+        return order
+
+    def submit(self, order_request, cancel_at: datetime.datetime = None) -> asyncio.Future:
+        """
+        Queue an order request without blocking and return a future of its
+        ManagedOrder. The order is canceled at cancel_at if it is still open.
+        """
+        self._ensure_queue()
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight += 1
+        self.queue.put_nowait((order_request, cancel_at, time.perf_counter_ns(), future))
+        return future
+
+    def _submit_order(self, order_request):
+        """Submit from a worker thread, timing the REST call itself."""
+        started = time.perf_counter_ns()
+        submitted = self.client.submit_order(order_request)
+        return submitted, started, time.perf_counter_ns()
+
+    def _ensure_queue(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+
+    async def _submitter(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            order_request, cancel_at, signal_time, future = await self.queue.get()
+            try:
+                submitted, submit_ns, ack_ns = await loop.run_in_executor(self.executor, self._submit_order, order_request)
+            except Exception as e:
+                print(f'[ ERROR ] Order for {order_request.symbol} failed: {e}')
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            finally:
+                self.in_flight -= 1
+
+            order = self._order(str(submitted.id), submitted.symbol)
+            order.signal_time = signal_time
+            order.submit_latency = (ack_ns - signal_time) / 1e9
+            if self.tracker is not None:
+                self.tracker.order_acked(order_request.symbol, signal_time, submit_ns, ack_ns)
+            if cancel_at is not None and not order.final:
+                order.cancel_timer = self.wheel.schedule_at(cancel_at, self.cancel, order.id)
+            print(f'[ INFO ] Submitted order for {submitted.symbol} in {order.submit_latency * 1000:.1f}ms')
+
+            if not future.done():
+                future.set_result(order)
+
+    async def cancel(self, order_id: str):
+        """Cancel an order unless a trade update already closed it."""
+        order = self.orders.get(order_id)
+        if order is not None and order.final:
+            return
+        self.in_flight += 1
+        try:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.client.cancel_order_by_id, order_id)
+            print(f'[ INFO ] Canceled order {order_id}')
+        except Exception as e:
+            # the order filled or was closed while the cancel was in flight
+            print(f'[ ERROR ] Cancel of order {order_id} failed: {e}')
+        finally:
+            self.in_flight -= 1
+
+    def cancel_open_at(self, at: datetime.datetime):
+        """Schedule a cancel of every order still open at a datetime."""
+        def cancel_open():
+            for order in self.open_orders():
+                asyncio.get_running_loop().create_task(self.cancel(order.id))
+        return self.wheel.schedule_at(at, cancel_open)
+
+    async def handle_trade_update(self, data):
+        """TradingStream trade update handler keeping the order states current."""
+        order = self._order(str(data.order.id), data.order.symbol)
+        order.status = str(getattr(data.event, 'value', data.event))
+        if data.order.filled_qty is not None:
+            order.filled_qty = float(data.order.filled_qty)
+        if data.order.filled_avg_price is not None:
+            order.filled_avg_price = float(data.order.filled_avg_price)
+        if order.final and order.cancel_timer is not None:
+            self.wheel.cancel(order.cancel_timer)
+
+    def open_orders(self) -> list[ManagedOrder]:
+        return [order for order in self.orders.values() if not order.final]
+
+    async def warm_up(self):
+        """Open the REST connection before the first signal (one cheap request)."""
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.client.get_clock)
+
+    def start(self):
+        """Start the submitter tasks and the timer wheel on the running loop."""
+        self._ensure_queue()
+        loop = asyncio.get_running_loop()
+        self.tasks = [loop.create_task(self._submitter()) for _ in range(self.workers)]
+        self.tasks.append(loop.create_task(self.wheel.run()))
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.executor.shutdown(wait=False)
+
+    async def run_until(self, deadline: datetime.datetime, poll: float = DEFAULT_TICK):
+        """
+        Run until deadline has passed, no submit or cancel is queued or in
+        flight and no scheduled cancel is pending, then stop.
+        """
+        if not self.tasks:
+            self.start()
+        await asyncio.sleep(max(0.0, deadline.timestamp() - time.time()))
+        while self.in_flight or self.wheel.pending:
+            await asyncio.sleep(poll)
+        await self.stop()
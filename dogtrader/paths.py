@@ -0,0 +1,22 @@
+'''
+Absolute paths to shared repository resources, so library code behaves the
+same no matter which directory a script is run from.
+'''
+
+import os
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+PROPERTIES_DIR = os.path.join(REPO_ROOT, 'properties')
+HOLIDAYS_PATH = os.path.join(PROPERTIES_DIR, 'market-holidays.json')
+
+DATA_DIR = os.path.join(REPO_ROOT, 'data')
+TICKERS_DIR = os.path.join(DATA_DIR, 'tickers')
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+ROLLUPS_DIR = os.path.join(STORE_DIR, 'rollups')
+TENSORS_DIR = os.path.join(STORE_DIR, 'tensors')
+MODELS_DIR = os.path.join(STORE_DIR, 'models')
+WALK_FORWARD_DIR = os.path.join(STORE_DIR, 'walk-forward')
+TICKERS_MANIFEST_PATH = os.path.join(STORE_DIR, 'tickers-manifest.sqlite')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+BAR_CACHE_DIR = os.path.join(CACHE_DIR, 'bars')
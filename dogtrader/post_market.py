@@ -0,0 +1,87 @@
+'''
+Post-market price moves of stocks after earnings releases.
+
+For every earnings date the whole 16:00-19:00 New York post-market window is
+fetched once, with one minute bar request covering every ticker reporting on
+that date, and the close at each offset after 16:00 (4:00PM, 4:01PM, ...,
+7:00PM) is looked up for all tickers at once with an as-of merge: the price at
+an offset is the close of the latest bar at or before it within the window,
+or empty when there is none. Dates are fetched concurrently and the results
+are returned as one table with a row per (ticker, date):
+
+    earnings = {'MSFT': [datetime.date(2023, 7, 25), ...], 'GOOGL': [...]}
+    table = post_market.analyze(stock_client, earnings)
+'''
+
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from alpaca.data import StockBarsRequest, TimeFrame
+
+from dogtrader.trading_calendar import to_utc
+
+WINDOW_OPEN = datetime.time(16, 0)
+WINDOW_CLOSE = datetime.time(19, 0)
+
+# minutes after WINDOW_OPEN and their column names
+OFFSETS = [0, 1, 5, 30, 60, 90, 120, 150, 180]
+COLUMNS = ['4:00PM', '4:01PM', '4:05PM', '4:30PM', '5:00PM', '5:30PM', '6:00PM', '6:30PM', '7:00PM']
+
+DEFAULT_WORKERS = 8
+
+
+def fetch_window(client, symbols: list[str], date: datetime.date) -> pd.DataFrame:
+    """Minute bars (symbol, timestamp, close) of symbols in the post-market window of date, one request."""
+    request = StockBarsRequest(
+        symbol_or_symbols=symbols,
+        start=to_utc(date, WINDOW_OPEN),
+        end=to_utc(date, WINDOW_CLOSE),
+        timeframe=TimeFrame.Minute,
+    )
+    df = client.get_stock_bars(request).df
+    if df.empty:
+        return pd.DataFrame({'symbol': pd.Series(dtype=str), 'timestamp': pd.Series(dtype='datetime64[ns, UTC]'), 'close': pd.Series(dtype=float)})
+    df = df.reset_index()
+    if 'symbol' not in df.columns:
+        df.insert(0, 'symbol', symbols[0])
+    return df[['symbol', 'timestamp', 'close']]
+
+
+def offset_closes(bars: pd.DataFrame, symbols: list[str], date: datetime.date) -> pd.DataFrame:
+    """One row per symbol with the as-of close at every offset of date's window."""
+    start = pd.Timestamp(to_utc(date, WINDOW_OPEN))
+    targets = pd.DataFrame({
+        'symbol': [symbol for symbol in symbols for _ in OFFSETS],
+        'column': COLUMNS * len(symbols),
+        'timestamp': [start + pd.Timedelta(minutes=offset) for _ in symbols for offset in OFFSETS],
+    })
+
+    bars = bars.assign(timestamp=pd.to_datetime(bars['timestamp'], utc=True)).sort_values('timestamp')
+    targets['timestamp'] = targets['timestamp'].astype(bars['timestamp'].dtype)
+    merged = pd.merge_asof(targets.sort_values('timestamp'), bars, on='timestamp', by='symbol', direction='backward')
+
+    table = merged.pivot(index='symbol', columns='column', values='close').reindex(index=symbols, columns=COLUMNS)
+    table.columns.name = None
+    table.index.name = 'Ticker'
+    table.insert(0, 'Date', date)
+    return table.reset_index()
+
+
+def analyze(client, earnings: dict[str, list[datetime.date]], workers: int = DEFAULT_WORKERS) -> pd.DataFrame:
+    """Post-market closes of every (ticker, earnings date), fetched one request per date, by ticker and newest date first."""
+    by_date = {}
+    for ticker, dates in earnings.items():
+        for date in dates:
+            by_date.setdefault(date, []).append(ticker)
+
+    def run(item):
+        date, symbols = item
+        return offset_closes(fetch_window(client, symbols, date), symbols, date)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        tables = list(executor.map(run, sorted(by_date.items())))
+
+    if not tables:
+        return pd.DataFrame(columns=['Ticker', 'Date'] + COLUMNS)
+    return pd.concat(tables, ignore_index=True).sort_values(['Ticker', 'Date'], ascending=[True, False], ignore_index=True)
@@ -0,0 +1,129 @@
+'''
+Multi-symbol quote dispatch for the gap check of the live gap-day strategy.
+
+GapBook keeps the per-symbol state in NumPy arrays indexed by a symbol -> row
+dict (previous high and low, latest ask, whether the symbol has been checked
+and which side it gapped to) plus a count of symbols still pending, so nothing
+ever scans all symbols to find out whether the check is finished.
+
+QuoteDispatcher.handle_quote is the StockDataStream quote handler. Per message
+it does a dict lookup and two array stores, and marks the row dirty. Quotes
+arriving within a short window are coalesced: one call_later flush evaluates
+every dirty row at once with vectorized comparisons, using each symbol's
+latest ask, and reports gaps through a callback:
+
+    book = GapBook(tickers, prev_highs, prev_lows)
+    dispatcher = QuoteDispatcher(book, on_gap, on_all_checked)
+    stock_stream.subscribe_quotes(dispatcher.handle_quote, *tickers)
+'''
+
+import asyncio
+
+import numpy as np
+
+# gap_side values
+NO_GAP = 0
+GAP_UP = 1
+GAP_DOWN = -1
+
+DEFAULT_GAP_UP = 0.03
+DEFAULT_GAP_DOWN = 0.02
+
+# seconds quotes are coalesced for before a batched check
+DEFAULT_WINDOW = 0.005
+
+
+class GapBook:
+    """Array-backed gap check state of a fixed list of symbols."""
+
+    def __init__(self, symbols: list[str], prev_highs, prev_lows, gap_up: float = DEFAULT_GAP_UP, gap_down: float = DEFAULT_GAP_DOWN):
+        self.symbols = list(symbols)
+        self.index = {symbol: row for row, symbol in enumerate(self.symbols)}
+        self.prev_high = np.asarray(prev_highs, dtype=np.float64)
+        self.prev_low = np.asarray(prev_lows, dtype=np.float64)
+
+        # precomputed trigger prices
+        self.up_price = (1 + gap_up) * self.prev_high
+        self.down_price = (1 - gap_down) * self.prev_low
+
+        self.ask = np.full(len(self.symbols), np.nan)
+        self.checked = np.zeros(len(self.symbols), dtype=bool)
+        self.gap_side = np.zeros(len(self.symbols), dtype=np.int8)
+        self.pending = len(self.symbols)
+
+    def evaluate(self, rows: np.ndarray) -> np.ndarray:
+        """Check unchecked rows with a valid ask, mark them checked and return the rows that gapped."""
+        rows = rows[~self.checked[rows]]
+        asks = self.ask[rows]
+        rows = rows[asks > 0]
+        asks = self.ask[rows]
+
+        side = np.where(asks > self.up_price[rows], GAP_UP, np.where(asks < self.down_price[rows], GAP_DOWN, NO_GAP))
+        self.gap_side[rows] = side
+        self.checked[rows] = True
+        self.pending -= len(rows)
+        return rows[side != NO_GAP]
+
+
+class QuoteDispatcher:
+    """
+    Coalescing StockDataStream quote handler over a GapBook.
+
+    on_gap(symbol, side, ask) is called for every symbol that gapped, and
+    on_all_checked() once when no symbol is pending. Both may be coroutine
+    functions. A dogtrader.latency.LatencyTracker can be given to time the
+    handler and the decisions.
+    """
+
+    def __init__(self, book: GapBook, on_gap, on_all_checked=None, window: float = DEFAULT_WINDOW, tracker=None):
+        self.book = book
+        self.tracker = tracker
+        self.on_gap = on_gap
+        self.on_all_checked = on_all_checked
+        self.window = window
+        self.dirty = np.zeros(len(book.symbols), dtype=bool)
+        self.dirty_rows = []
+        self.flush_handle = None
+        self.quotes = 0
+        self.batches = 0
+
+    async def handle_quote(self, quote):
+        self.quotes += 1
+        if self.tracker is not None:
+            self.tracker.handler_entry(quote.symbol)
+        row = self.book.index.get(quote.symbol)
+        if row is None or self.book.checked[row]:
+            return
+
+        self.book.ask[row] = quote.ask_price
+        if not self.dirty[row]:
+            self.dirty[row] = True
+            self.dirty_rows.append(row)
+        if self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def _call(self, callback, *args):
+        result = callback(*args)
+        if asyncio.iscoroutine(result):
+            asyncio.get_running_loop().create_task(result)
+
+    def flush(self):
+        """Evaluate every symbol quoted since the last flush in one batch."""
+        self.flush_handle = None
+        if not self.dirty_rows:
+            return
+
+        rows = np.array(self.dirty_rows, dtype=np.intp)
+        self.dirty[rows] = False
+        self.dirty_rows = []
+        self.batches += 1
+
+        book = self.book
+        for row in book.evaluate(rows):
+            if self.tracker is not None:
+                self.tracker.decision(book.symbols[row])
+            self._call(self.on_gap, book.symbols[row], int(book.gap_side[row]), float(book.ask[row]))
+
+        if book.pending == 0 and self.on_all_checked is not None:
+            on_all_checked, self.on_all_checked = self.on_all_checked, None
+            self._call(on_all_checked)
@@ -0,0 +1,254 @@
+'''
+Multi-timeframe bars aggregated from minute bars, kept as materialized rollups.
+
+aggregate resamples minute bars (symbol, timestamp, open, high, low, close,
+volume) into 5m, 15m, 1h or 1d bars with one vectorized group-by. Intraday
+bars are aligned to the clock in New York time (9:30, 9:35, ... for 5m; 9:00,
+10:00, ... for 1h) and cover every minute bar given, extended hours included.
+Daily bars cover the regular session only (9:30 to the calendar close, so early
+closes are honoured), like Alpaca's day bars and the meta files. VWAP is
+weighted by volume over the typical price of each minute.
+
+RollupStore keeps one Parquet file per (timeframe, symbol), sorted by time:
+
+    data/store/rollups/1d/AAPL.parquet
+
+refresh only aggregates the sessions since the last stored one (which is
+recomputed, in case it was still being ingested), so a daily refresh reads
+one day of minute bars per symbol. Reads are a single file per symbol and the
+previous session's bar is a binary search over its sorted dates, checked
+against the trading calendar's previous session:
+
+    store = RollupStore()
+    store.refresh(symbols, corpus_source())
+    highs_lows = store.previous_day(['AAPL', 'MSFT'], datetime.date(2023, 8, 2))
+    bars_15m = store.load('AAPL', '15m', start, end)
+'''
+
+import datetime
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from dogtrader import bars_query, corpus, trading_calendar
+from dogtrader.paths import ROLLUPS_DIR, TICKERS_DIR
+
+# timeframe -> minutes per bar (None for daily bars)
+TIMEFRAMES = {'5m': 5, '15m': 15, '1h': 60, '1d': None}
+
+ROLLUP_COLUMNS = ['date', 'timestamp', 'open', 'high', 'low', 'close', 'volume', 'vwap', 'bar_count']
+
+REGULAR_OPEN_MINUTE = 9 * 60 + 30
+
+
+def aggregate(bars: pd.DataFrame, timeframe: str, calendar: trading_calendar.TradingCalendar = None) -> pd.DataFrame:
+    """
+    Aggregate minute bars of any number of symbols into timeframe bars.
+    Returns symbol followed by ROLLUP_COLUMNS, ordered by symbol and
+    timestamp; timestamps are the UTC start of each bar (the session open for
+    daily bars).
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f'unknown timeframe {timeframe} (expected one of {", ".join(TIMEFRAMES)})')
+    if bars.empty:
+        return pd.DataFrame(columns=['symbol'] + ROLLUP_COLUMNS)
+
+    bars = bars.sort_values(['symbol', 'timestamp'], kind='stable')
+    local = pd.to_datetime(bars['timestamp'], utc=True).dt.tz_convert(trading_calendar.NEW_YORK)
+    dates = local.dt.date.to_numpy()
+    minutes = (local.dt.hour * 60 + local.dt.minute).to_numpy()
+
+    span = TIMEFRAMES[timeframe]
+    if span is None:
+        # regular session of each date; dates without a session are dropped
+        calendar = calendar or trading_calendar.load_calendar()
+        close_minutes = {}
+        for date in set(dates):
+            try:
+                close = calendar.session(date).close.astimezone(trading_calendar.NEW_YORK)
+                close_minutes[date] = close.hour * 60 + close.minute
+            except KeyError:
+                close_minutes[date] = -1
+        closes = np.array([close_minutes[date] for date in dates])
+        keep = (minutes >= REGULAR_OPEN_MINUTE) & (minutes < closes)
+        buckets = np.full(len(bars), REGULAR_OPEN_MINUTE)
+    else:
+        keep = np.ones(len(bars), dtype=bool)
+        buckets = minutes // span * span
+
+    volume = bars['volume'].to_numpy(dtype=np.float64)
+    typical = (bars['high'].to_numpy(dtype=np.float64) + bars['low'].to_numpy(dtype=np.float64) + bars['close'].to_numpy(dtype=np.float64)) / 3
+    frame = pd.DataFrame({
+        'symbol': bars['symbol'].to_numpy(),
+        'date': dates,
+        'bucket': buckets,
+        'open': bars['open'].to_numpy(dtype=np.float64),
+        'high': bars['high'].to_numpy(dtype=np.float64),
+        'low': bars['low'].to_numpy(dtype=np.float64),
+        'close': bars['close'].to_numpy(dtype=np.float64),
+        'volume': bars['volume'].to_numpy(dtype=np.int64),
+        'price_volume': typical * volume,
+    })[keep]
+
+    rollup = frame.groupby(['symbol', 'date', 'bucket'], sort=True).agg(
+        open=('open', 'first'),
+        high=('high', 'max'),
+        low=('low', 'min'),
+        close=('close', 'last'),
+        volume=('volume', 'sum'),
+        price_volume=('price_volume', 'sum'),
+        bar_count=('open', 'size'),
+    ).reset_index()
+
+    # bars without volume have no VWAP; use the close like the indicators' gap fill
+    with np.errstate(divide='ignore', invalid='ignore'):
+        vwap = rollup['price_volume'] / rollup['volume']
+    rollup['vwap'] = vwap.where(rollup['volume'] > 0, rollup['close'])
+
+    midnight = pd.to_datetime(pd.Series(rollup['date'], dtype=object).astype(str)).dt.tz_localize(trading_calendar.NEW_YORK)
+    rollup['timestamp'] = (midnight + pd.to_timedelta(rollup['bucket'], unit='min')).dt.tz_convert('UTC')
+    return rollup[['symbol'] + ROLLUP_COLUMNS]
+
+
+#------------------------------------------------------------------------------
+# Minute bar sources
+#------------------------------------------------------------------------------
+
+
+def corpus_source(tickers_dir: str = TICKERS_DIR, version: str = corpus.DEFAULT_VERSION):
+    """Source reading a symbol's minute bars from start on out of the data/tickers files."""
+    def load(symbol: str, start: datetime.date = None) -> pd.DataFrame:
+        frames = []
+        for day_file in corpus.list_day_files(symbol, tickers_dir, version):
+            if start is not None and day_file.date < start:
+                continue
+            day = pd.read_csv(day_file.data_path, usecols=['time', 'open', 'high', 'low', 'close', 'volume'])
+            timestamps = pd.to_datetime(day_file.date.isoformat() + ' ' + day['time'], format='%Y-%m-%d %H:%M')
+            day.insert(0, 'timestamp', timestamps.dt.tz_localize(trading_calendar.NEW_YORK))
+            frames.append(day.drop(columns='time'))
+        if not frames:
+            return pd.DataFrame(columns=['symbol', 'timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        bars = pd.concat(frames, ignore_index=True)
+        bars.insert(0, 'symbol', symbol)
+        return bars
+
+    return load
+
+
+def db_source(conn):
+    """Source reading a symbol's minute bars from start on out of bars_minute (see dogtrader.bars_query)."""
+    def load(symbol: str, start: datetime.date = None) -> pd.DataFrame:
+        query_start = trading_calendar.to_utc(start, datetime.time()) if start is not None else None
+        chunks = list(bars_query.iter_bars(conn, [symbol], start=query_start))
+        if not chunks:
+            return pd.DataFrame(columns=bars_query.BARS_MINUTE_COLUMNS)
+        return pd.concat(chunks, ignore_index=True)
+
+    return load
+
+
+#------------------------------------------------------------------------------
+# Materialized rollups
+#------------------------------------------------------------------------------
+
+
+class RollupStore:
+    """Per (timeframe, symbol) Parquet rollups, refreshed incrementally."""
+
+    def __init__(self, root: str = ROLLUPS_DIR, timeframes: list[str] = tuple(TIMEFRAMES)):
+        self.root = root
+        self.timeframes = list(timeframes)
+        self.days = {}
+
+    def path(self, timeframe: str, symbol: str) -> str:
+        return os.path.join(self.root, timeframe, f'{symbol}.parquet')
+
+    def last_date(self, timeframe: str, symbol: str) -> datetime.date:
+        """Last date in a rollup file, or None."""
+        path = self.path(timeframe, symbol)
+        if not os.path.exists(path):
+            return None
+        dates = pq.read_table(path, columns=['date']).column('date')
+        return dates[len(dates) - 1].as_py() if len(dates) else None
+
+    def refresh(self, symbols: list[str], load_bars, full: bool = False) -> dict[str, int]:
+        """
+        Bring the rollups of symbols up to date from load_bars(symbol, start)
+        and return the number of new or recomputed bars per timeframe.
+        """
+        calendar = trading_calendar.load_calendar()
+        updated = dict.fromkeys(self.timeframes, 0)
+
+        for symbol in symbols:
+            last_dates = {timeframe: None if full else self.last_date(timeframe, symbol) for timeframe in self.timeframes}
+
+            # the earliest last date of all timeframes is recomputed, everything before it is kept
+            start = None if any(date is None for date in last_dates.values()) else min(last_dates.values())
+            bars = load_bars(symbol, start)
+            if bars.empty:
+                continue
+
+            for timeframe in self.timeframes:
+                rollup = aggregate(bars, timeframe, calendar).drop(columns='symbol')
+                if last_dates[timeframe] is not None:
+                    rollup = rollup[rollup['date'] >= last_dates[timeframe]]
+                self._write(timeframe, symbol, rollup, last_dates[timeframe])
+                updated[timeframe] += len(rollup)
+
+        return updated
+
+    def _write(self, timeframe: str, symbol: str, rollup: pd.DataFrame, since: datetime.date):
+        """Replace a rollup file's rows from since on with rollup."""
+        path = self.path(timeframe, symbol)
+        if since is not None and os.path.exists(path):
+            kept = pd.read_parquet(path)
+            rollup = pd.concat([kept[kept['date'] < since], rollup], ignore_index=True)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f'{path}.{os.getpid()}.tmp'
+        rollup.reset_index(drop=True).to_parquet(temporary, index=False)
+        os.replace(temporary, path)
+        if timeframe == '1d':
+            self.days.pop(symbol, None)
+
+    def load(self, symbol: str, timeframe: str, start: datetime.date = None, end: datetime.date = None) -> pd.DataFrame:
+        """Bars of a symbol and timeframe from start to end (inclusive dates)."""
+        path = self.path(timeframe, symbol)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+        filters = []
+        if start is not None:
+            filters.append(('date', '>=', start))
+        if end is not None:
+            filters.append(('date', '<=', end))
+        return pd.read_parquet(path, filters=filters or None)
+
+    def _daily(self, symbol: str) -> pd.DataFrame:
+        # daily rollups are small (one row per session), so they are kept in memory once read
+        daily = self.days.get(symbol)
+        if daily is None:
+            daily = self.days[symbol] = self.load(symbol, '1d')
+        return daily
+
+    def previous_day(self, symbols: list[str], date: datetime.date) -> pd.DataFrame:
+        """
+        Daily bar of each symbol's previous session (from the trading
+        calendar) before date, indexed by symbol. Symbols whose rollup does not
+        hold that session are missing from the result, and all of them are
+        when date is outside of the calendar.
+        """
+        try:
+            previous_date = trading_calendar.load_calendar().previous_session(date).date
+        except (KeyError, ValueError):
+            return pd.DataFrame(columns=ROLLUP_COLUMNS).rename_axis('symbol')
+        rows = []
+        for symbol in symbols:
+            daily = self._daily(symbol)
+            index = np.searchsorted(daily['date'].to_numpy(), date, side='left') if len(daily) else 0
+            # an older stored day (a session missing from the rollup) is not the previous session
+            if index > 0 and daily['date'].iloc[index - 1] == previous_date:
+                rows.append(daily.iloc[index - 1].rename(symbol))
+        return pd.DataFrame(rows, columns=ROLLUP_COLUMNS).rename_axis('symbol')
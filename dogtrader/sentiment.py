@@ -0,0 +1,273 @@
+'''
+Cached 0-9 sentiment scores per ticker and time bucket.
+
+A scorer rates many tickers in one request (score(tickers, bucket) returns
+{ticker: 0-9}); StubScorer is a deterministic offline stand-in and LLMScorer
+asks an OpenAI chat model with the prompt from prompts.txt. SentimentService
+sits in front of it:
+
+- scores are keyed by (ticker, bucket), where buckets are bucket_minutes long
+  (UTC), and kept in memory and in the sentiment_scores table, so a score is
+  requested at most once per bucket across restarts and processes sharing the
+  database;
+- refresh dedupes the tickers (also against requests already in flight),
+  reads what the table already has and sends the rest in batches of the
+  scorer's max_batch, each batch waiting for a TokenBucket so the provider's
+  rate limit is never hit;
+- get is a dict lookup of a ticker's latest score, so a trading loop reads
+  sentiment in O(1) and never waits on a request:
+
+    service = SentimentService(LLMScorer(), conn)
+    asyncio.create_task(service.run(tickers))  # refreshes every bucket
+    ...
+    score = service.get('AAPL')  # None until the first score arrives
+'''
+
+import asyncio
+import datetime
+import hashlib
+import re
+import time
+
+from sqlalchemy import text
+
+PG_TABLE = 'sentiment_scores'
+
+SCORE_MIN = 0
+SCORE_MAX = 9
+
+DEFAULT_BUCKET_MINUTES = 60
+DEFAULT_MAX_BATCH = 20
+
+# requests per second and burst of the default limiter (3 requests per minute, the OpenAI free tier)
+DEFAULT_RATE = 3 / 60
+DEFAULT_BURST = 3
+
+PROMPT = (
+    'Rate each of {tickers} media attention as of {time} from 0 to 9, with 0 being terrible and 9 being extremely positive. '
+    'Answer with one line per ticker in the form TICKER: SCORE and nothing else.'
+)
+
+SCORE_LINE = re.compile(r'^\W*([A-Z][A-Z.]*)\W*:\s*([0-9])\b', re.MULTILINE)
+
+
+def bucket_start(at: datetime.datetime, minutes: int = DEFAULT_BUCKET_MINUTES) -> datetime.datetime:
+    """UTC start of the bucket holding at (naive datetimes are UTC)."""
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=datetime.timezone.utc)
+    epoch = int(at.timestamp())
+    return datetime.datetime.fromtimestamp(epoch - epoch % (minutes * 60), datetime.timezone.utc)
+
+
+def parse_scores(answer: str, tickers: list[str]) -> dict[str, int]:
+    """Scores of tickers in a 'TICKER: SCORE' per line answer; unknown tickers are ignored."""
+    wanted = set(tickers)
+    return {ticker: int(score) for ticker, score in SCORE_LINE.findall(answer) if ticker in wanted}
+
+
+#------------------------------------------------------------------------------
+# Scorers
+#------------------------------------------------------------------------------
+
+
+class StubScorer:
+    """Deterministic offline scorer: a hash of (ticker, bucket), optionally after a delay."""
+
+    name = 'stub'
+
+    def __init__(self, max_batch: int = DEFAULT_MAX_BATCH, delay: float = 0.0):
+        self.max_batch = max_batch
+        self.delay = delay
+        self.requests = 0
+
+    def score(self, tickers: list[str], bucket: datetime.datetime) -> dict[str, int]:
+        self.requests += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return {ticker: hashlib.sha256(f'{ticker}|{bucket.isoformat()}'.encode()).digest()[0] % (SCORE_MAX + 1) for ticker in tickers}
+
+
+class LLMScorer:
+    """Scores tickers with one chat completion per batch (requires the openai package and OPENAI_API_KEY)."""
+
+    def __init__(self, model: str = 'gpt-3.5-turbo', max_batch: int = DEFAULT_MAX_BATCH, api_key: str = None):
+        import openai
+
+        self.client = openai.OpenAI(api_key=api_key)
+        self.model = model
+        self.name = model
+        self.max_batch = max_batch
+        self.requests = 0
+
+    def score(self, tickers: list[str], bucket: datetime.datetime) -> dict[str, int]:
+        self.requests += 1
+        prompt = PROMPT.format(tickers=', '.join(tickers), time=bucket.strftime('%Y-%m-%d %H:%M UTC'))
+        response = self.client.chat.completions.create(model=self.model, messages=[{'role': 'user', 'content': prompt}], temperature=0)
+        return parse_scores(response.choices[0].message.content or '', tickers)
+
+
+#------------------------------------------------------------------------------
+# Rate limiting
+#------------------------------------------------------------------------------
+
+
+class TokenBucket:
+    """Async token bucket: rate tokens per second, at most capacity saved up."""
+
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: float = DEFAULT_BURST, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available and take them (callers are served in order)."""
+        async with self.lock:
+            while not self.try_acquire(tokens):
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+#------------------------------------------------------------------------------
+# Storage
+#------------------------------------------------------------------------------
+
+
+def ensure_table(conn, table: str = PG_TABLE):
+    """Create the scores table (PostgreSQL or SQLite) if it does not exist. Commits."""
+    conn.execute(text(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            symbol TEXT NOT NULL,
+            bucket TIMESTAMPTZ NOT NULL,
+            score SMALLINT NOT NULL,
+            scorer TEXT NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (symbol, bucket)
+        )
+    '''))
+    conn.commit()
+
+
+def _as_datetime(value) -> datetime.datetime:
+    # PostgreSQL returns datetimes, SQLite the ISO strings written
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    return value.astimezone(datetime.timezone.utc)
+
+
+class SentimentService:
+    """Deduped, cached, rate-limited sentiment scores with O(1) reads."""
+
+    def __init__(self, scorer, conn=None, limiter: TokenBucket = None, bucket_minutes: int = DEFAULT_BUCKET_MINUTES, table: str = PG_TABLE):
+        self.scorer = scorer
+        self.conn = conn
+        self.limiter = limiter or TokenBucket()
+        self.bucket_minutes = bucket_minutes
+        self.table = table
+
+        # (symbol, bucket) -> score, and symbol -> (bucket, score) of its latest bucket
+        self.scores = {}
+        self.latest = {}
+        self.in_flight = {}
+        self.requested = 0
+
+        if conn is not None:
+            ensure_table(conn, table)
+
+    def get(self, symbol: str):
+        """Latest score of symbol, or None."""
+        latest = self.latest.get(symbol)
+        return latest[1] if latest is not None else None
+
+    def get_at(self, symbol: str, at: datetime.datetime):
+        """Score of symbol in the bucket holding at, or None."""
+        return self.scores.get((symbol, bucket_start(at, self.bucket_minutes)))
+
+    def _remember(self, symbol: str, bucket: datetime.datetime, score: int):
+        self.scores[(symbol, bucket)] = score
+        latest = self.latest.get(symbol)
+        if latest is None or latest[0] <= bucket:
+            self.latest[symbol] = (bucket, score)
+
+    def load(self, since: datetime.datetime):
+        """Read the scores of buckets from since on out of the table."""
+        rows = self.conn.execute(text(f'SELECT symbol, bucket, score FROM {self.table} WHERE bucket >= :since'), {'since': bucket_start(since, self.bucket_minutes).isoformat()})
+        for symbol, bucket, score in rows:
+            self._remember(symbol, _as_datetime(bucket), score)
+
+    def _load_bucket(self, symbols: list[str], bucket: datetime.datetime):
+        rows = self.conn.execute(text(f'SELECT symbol, score FROM {self.table} WHERE bucket = :bucket'), {'bucket': bucket.isoformat()})
+        wanted = set(symbols)
+        for symbol, score in rows:
+            if symbol in wanted:
+                self._remember(symbol, bucket, score)
+
+    def _store(self, scores: dict[str, int], bucket: datetime.datetime):
+        now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.conn.execute(text(f'''
+            INSERT INTO {self.table} (symbol, bucket, score, scorer, created_at) VALUES (:symbol, :bucket, :score, :scorer, :created_at)
+            ON CONFLICT (symbol, bucket) DO UPDATE SET score = excluded.score, scorer = excluded.scorer, created_at = excluded.created_at
+        '''), [{'symbol': symbol, 'bucket': bucket.isoformat(), 'score': score, 'scorer': self.scorer.name, 'created_at': now} for symbol, score in scores.items()])
+        self.conn.commit()
+
+    async def _score_batch(self, batch: list[str], bucket: datetime.datetime):
+        await self.limiter.acquire()
+        self.requested += 1
+        scores = await asyncio.to_thread(self.scorer.score, batch, bucket)
+        scores = {symbol: min(max(int(score), SCORE_MIN), SCORE_MAX) for symbol, score in scores.items()}
+        if scores and self.conn is not None:
+            self._store(scores, bucket)
+        for symbol, score in scores.items():
+            self._remember(symbol, bucket, score)
+
+    async def refresh(self, symbols: list[str], at: datetime.datetime = None) -> dict[str, int]:
+        """Make sure symbols have scores for the bucket holding at (default: now) and return them."""
+        bucket = bucket_start(at or datetime.datetime.now(datetime.timezone.utc), self.bucket_minutes)
+        symbols = list(dict.fromkeys(symbols))
+
+        missing = [symbol for symbol in symbols if (symbol, bucket) not in self.scores]
+        if missing and self.conn is not None:
+            self._load_bucket(missing, bucket)
+            missing = [symbol for symbol in missing if (symbol, bucket) not in self.scores]
+
+        # wait for symbols another refresh is already requesting instead of asking twice
+        waiting = {self.in_flight[(symbol, bucket)] for symbol in missing if (symbol, bucket) in self.in_flight}
+        missing = [symbol for symbol in missing if (symbol, bucket) not in self.in_flight]
+
+        batches = [missing[i:i + self.scorer.max_batch] for i in range(0, len(missing), self.scorer.max_batch)]
+        tasks = [asyncio.ensure_future(self._score_batch(batch, bucket)) for batch in batches]
+        for batch, task in zip(batches, tasks):
+            for symbol in batch:
+                self.in_flight[(symbol, bucket)] = task
+        try:
+            await asyncio.gather(*tasks, *waiting)
+        finally:
+            for batch in batches:
+                for symbol in batch:
+                    self.in_flight.pop((symbol, bucket), None)
+
+        return {symbol: self.scores[(symbol, bucket)] for symbol in symbols if (symbol, bucket) in self.scores}
+
+    async def run(self, symbols: list[str]):
+        """Refresh symbols at the start of every bucket until canceled; errors are logged and retried next bucket."""
+        while True:
+            try:
+                await self.refresh(symbols)
+            except Exception as e:
+                print(f'[ ERROR ] Sentiment refresh failed: {e}')
+            now = datetime.datetime.now(datetime.timezone.utc)
+            next_bucket = bucket_start(now, self.bucket_minutes) + datetime.timedelta(minutes=self.bucket_minutes)
+            await asyncio.sleep((next_bucket - now).total_seconds())
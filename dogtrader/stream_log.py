@@ -0,0 +1,115 @@
+'''
+Recording and replaying of StockDataStream messages.
+
+StreamRecorder hooks a StockDataStream's message dispatch and appends every
+raw message (quotes, bars, trades, ...) to a binary log before the handlers
+see it. The log starts with a small header, followed by one frame per
+message:
+
+    uint32 payload length | uint64 receive time (ns since epoch) | msgpack payload
+
+The payload is the websocket message exactly as Alpaca sent it (msgpack,
+with its native timestamp type), so nothing is lost or reformatted.
+
+replay feeds a log back through a StockDataStream's own dispatch, so the
+subscribed handlers get the same Quote/Bar/Trade objects as live, at the
+recorded pace (speed=1), N times faster (speed=N) or as fast as possible
+(speed=None). The stream never connects, so replays run without network:
+
+    stream = StockDataStream('replay', 'replay')
+    stream.subscribe_quotes(dispatcher.handle_quote, *tickers)
+    asyncio.run(stream_log.replay(stream, 'session.dtsl', speed=None))
+'''
+
+import asyncio
+import struct
+import time
+
+import msgpack
+
+MAGIC = b'DTSL'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sH')
+FRAME = struct.Struct('<IQ')
+
+
+class StreamRecorder:
+    """Append-only binary log of raw stream messages."""
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20):
+        self.path = path
+        self.file = open(path, 'ab', buffering=buffer_size)
+        if self.file.tell() == 0:
+            self.file.write(HEADER.pack(MAGIC, FORMAT_VERSION))
+        self.messages = 0
+        self.packer = msgpack.Packer()
+
+    def write(self, msg: dict, received_ns: int = None):
+        payload = self.packer.pack(msg)
+        self.file.write(FRAME.pack(len(payload), received_ns or time.time_ns()))
+        self.file.write(payload)
+        self.messages += 1
+
+    def attach(self, stream):
+        """Record every message stream dispatches, before its handlers run."""
+        dispatch = stream._dispatch
+
+        async def recording_dispatch(msg):
+            self.write(msg)
+            await dispatch(msg)
+
+        stream._dispatch = recording_dispatch
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def iter_records(path: str):
+    """Yield (received_ns, msg) from a log written by StreamRecorder."""
+    with open(path, 'rb') as file:
+        header = file.read(HEADER.size)
+        magic, version = HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a version {FORMAT_VERSION} stream log')
+
+        while True:
+            frame = file.read(FRAME.size)
+            if len(frame) < FRAME.size:
+                # a recorder killed mid-write leaves a partial frame at the end
+                return
+            length, received_ns = FRAME.unpack(frame)
+            payload = file.read(length)
+            if len(payload) < length:
+                return
+            yield received_ns, msgpack.unpackb(payload)
+
+
+async def replay(stream, path: str, speed: float = 1.0) -> tuple[int, float]:
+    """
+    Dispatch the messages of a log to stream's handlers and return
+    (messages, elapsed seconds). speed is a multiple of the recorded pace,
+    None replays as fast as possible.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_ns = None
+    messages = 0
+
+    for received_ns, msg in iter_records(path):
+        if speed is not None:
+            if first_ns is None:
+                first_ns = received_ns
+            delay = started + (received_ns - first_ns) / 1e9 / speed - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        await stream._dispatch(msg)
+        messages += 1
+
+        if speed is None:
+            # let timers and tasks of the handlers run, as between websocket reads
+            await asyncio.sleep(0)
+
+    return messages, loop.time() - started
@@ -0,0 +1,234 @@
+'''
+Incremental, constant-time versions of the v000 indicator columns for live
+minute bars.
+
+IndicatorState keeps everything one symbol needs in preallocated slots (a ring
+buffer of the last 26 closes, the running VWAP sums, the EMA/RSI averages and
+the nine MACD values the signal line is seeded from), so updating it with a
+bar allocates no containers and costs the same no matter how long the session
+has been running. It follows the same steps as data/generation/main.go and
+dogtrader.indicators, so from 9:00 AM on its values match the batch columns
+the model is trained on.
+
+IndicatorBank holds one state per symbol and make_bar_handler turns it into a
+StockDataStream bar handler:
+
+    bank = IndicatorBank(tickers)
+    bank.warm_up(todays_bars_df)  # when starting after 6:00 AM
+    stock_stream.subscribe_bars(make_bar_handler(bank, on_indicators), *tickers)
+'''
+
+import datetime
+
+from dogtrader.indicators import EMA12_SMOOTHING, EMA26_SMOOTHING, MACDS_SMOOTHING, RSI_PERIOD
+from dogtrader.trading_calendar import NEW_YORK
+
+# minutes after midnight (New York time) of the calculation milestones
+GRID_START = 6 * 60
+FIRST_BAR_DEADLINE = 8 * 60 + 5
+INIT_MINUTE = 8 * 60 + 30
+MACDS_INIT_MINUTE = 8 * 60 + 38
+OUTPUT_MINUTE = 9 * 60
+VWAP_RESET_MINUTE = 9 * 60 + 30
+GRID_END = 16 * 60
+
+RING_SIZE = 26
+
+UNIX_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+EMA12_MULTIPLIER = EMA12_SMOOTHING / (12 + 1)
+EMA26_MULTIPLIER = EMA26_SMOOTHING / (26 + 1)
+MACDS_MULTIPLIER = MACDS_SMOOTHING / (9 + 1)
+
+
+class IndicatorState:
+    """Indicator state of a single symbol for the current session."""
+
+    __slots__ = (
+        'day', 'minute', 'valid', 'closes', 'head', 'cum_price_volume', 'cum_volume',
+        'ema12', 'ema26', 'macd_seed', 'macd_count', 'macds', 'avg_gain', 'avg_loss',
+        'vwap', 'sma5', 'sma8', 'sma13', 'rsi',
+    )
+
+    def __init__(self):
+        self.closes = [0.0] * RING_SIZE
+        self.macd_seed = [0.0] * 9
+        self.reset(-1)
+
+    def reset(self, day: int):
+        """Start a new session (day is any per-day key, e.g. a date ordinal)."""
+        self.day = day
+        self.minute = -1
+        self.valid = False
+        self.head = 0
+        self.cum_price_volume = 0.0
+        self.cum_volume = 0.0
+        self.ema12 = self.ema26 = self.macds = 0.0
+        self.avg_gain = self.avg_loss = 0.0
+        self.macd_count = 0
+        self.vwap = self.sma5 = self.sma8 = self.sma13 = self.rsi = float('nan')
+
+    @property
+    def ready(self) -> bool:
+        """True once the state holds output values (a valid session at or after 9:00)."""
+        return self.valid and self.minute >= OUTPUT_MINUTE
+
+    @property
+    def macd(self) -> float:
+        return self.ema12 - self.ema26
+
+    def row(self) -> tuple:
+        """Current values in INDICATOR_COLUMNS order."""
+        return (self.vwap, self.sma5, self.sma8, self.sma13, self.ema12, self.ema26, self.ema12 - self.ema26, self.macds, self.rsi)
+
+    def update(self, day: int, minute: int, high: float, low: float, close: float, volume: float) -> bool:
+        """
+        Add the bar starting at minute (minutes after midnight, New York time)
+        of day. Missing minutes since the previous bar are filled with the
+        previous close and no volume, like the Go generator. Returns ready.
+        """
+        if day != self.day:
+            self.reset(day)
+
+        # only 6:00 AM to 4:00 PM is used, and late or duplicate bars are ignored
+        if minute < GRID_START or minute > GRID_END or minute <= self.minute:
+            return self.ready
+
+        if self.minute < 0:
+            # the session needs an early first bar with volume to seed the indicators
+            self.valid = minute < FIRST_BAR_DEADLINE and volume > 0
+        elif self.valid:
+            previous_close = self.closes[(self.head - 1) % RING_SIZE]
+            for gap_minute in range(self.minute + 1, minute):
+                self._step(gap_minute, previous_close, previous_close, previous_close, 0.0)
+
+        if self.valid:
+            self._step(minute, high, low, close, volume)
+        self.minute = minute
+
+        return self.ready
+
+    def _close(self, back: int) -> float:
+        """Close of the bar back minutes ago (0 is the latest)."""
+        return self.closes[(self.head - 1 - back) % RING_SIZE]
+
+    def _mean(self, n: int) -> float:
+        total = 0.0
+        for back in range(n - 1, -1, -1):
+            total += self._close(back)
+        return total / n
+
+    def _step(self, minute: int, high: float, low: float, close: float, volume: float):
+        previous_close = self._close(0)
+        self.closes[self.head] = close
+        self.head = (self.head + 1) % RING_SIZE
+
+        # VWAP accumulates from the first bar and restarts at 9:30
+        price_volume = ((high + low + close) / 3) * volume
+        if minute == VWAP_RESET_MINUTE:
+            self.cum_price_volume = price_volume
+            self.cum_volume = volume
+        else:
+            self.cum_price_volume += price_volume
+            self.cum_volume += volume
+
+        if minute < INIT_MINUTE:
+            return
+
+        if minute == INIT_MINUTE:
+            # seed the EMAs and RSI averages with simple averages
+            self.ema12 = self._mean(12)
+            self.ema26 = self._mean(26)
+            self.macd_seed[0] = self.ema12 - self.ema26
+            self.macd_count = 1
+            gain_sum = loss_sum = 0.0
+            for back in range(RSI_PERIOD - 1, -1, -1):
+                change = self._close(back) - self._close(back + 1)
+                gain_sum += max(change, 0.0)
+                loss_sum += max(-change, 0.0)
+            self.avg_gain = gain_sum / RSI_PERIOD
+            self.avg_loss = loss_sum / RSI_PERIOD
+            return
+
+        change = close - previous_close
+        self.avg_gain = (self.avg_gain * (RSI_PERIOD - 1) + max(change, 0.0)) / RSI_PERIOD
+        self.avg_loss = (self.avg_loss * (RSI_PERIOD - 1) + max(-change, 0.0)) / RSI_PERIOD
+
+        self.ema12 = close * EMA12_MULTIPLIER + self.ema12 * (1 - EMA12_MULTIPLIER)
+        self.ema26 = close * EMA26_MULTIPLIER + self.ema26 * (1 - EMA26_MULTIPLIER)
+        macd = self.ema12 - self.ema26
+
+        if minute <= MACDS_INIT_MINUTE:
+            # collect the nine MACD values the signal line is seeded from
+            self.macd_seed[self.macd_count] = macd
+            self.macd_count += 1
+            if minute == MACDS_INIT_MINUTE:
+                total = 0.0
+                for value in self.macd_seed:
+                    total += value
+                self.macds = total / 9
+            return
+
+        self.macds = macd * MACDS_MULTIPLIER + self.macds * (1 - MACDS_MULTIPLIER)
+
+        if minute < OUTPUT_MINUTE:
+            return
+
+        self.vwap = self.cum_price_volume / self.cum_volume if self.cum_volume else float('nan')
+        self.sma5 = self._mean(5)
+        self.sma8 = self._mean(8)
+        self.sma13 = self._mean(13)
+        self.rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss) if self.avg_loss else (float('nan') if not self.avg_gain else 100.0)
+
+
+class IndicatorBank:
+    """Preallocated IndicatorState per symbol, updated from timestamped bars."""
+
+    def __init__(self, symbols: list[str] = ()):
+        self.states = {symbol: IndicatorState() for symbol in symbols}
+
+        # UTC offset of New York time for the UTC hour of the latest bar; offsets
+        # only change on the hour, so the local date is exact for every bar
+        self.offset_hour = None
+        self.offset = 0
+
+    def state(self, symbol: str) -> IndicatorState:
+        state = self.states.get(symbol)
+        if state is None:
+            state = self.states[symbol] = IndicatorState()
+        return state
+
+    def _local_minute(self, timestamp: datetime.datetime) -> tuple[int, int]:
+        """Return (day, minute after midnight) in New York time for a UTC timestamp."""
+        epoch = int(timestamp.timestamp())
+        hour = epoch // 3600
+        if hour != self.offset_hour:
+            self.offset_hour = hour
+            self.offset = int(timestamp.astimezone(NEW_YORK).utcoffset().total_seconds())
+        local = epoch + self.offset
+        return UNIX_EPOCH_ORDINAL + local // 86400, (local % 86400) // 60
+
+    def update(self, symbol: str, timestamp: datetime.datetime, high: float, low: float, close: float, volume: float) -> IndicatorState:
+        """Add a bar (timestamp is its timezone-aware start time) and return the symbol's state."""
+        state = self.state(symbol)
+        day, minute = self._local_minute(timestamp)
+        state.update(day, minute, high, low, close, volume)
+        return state
+
+    def warm_up(self, bars):
+        """Feed a DataFrame of today's historical bars (symbol, timestamp, high, low, close, volume)."""
+        for row in bars.sort_values('timestamp').itertuples(index=False):
+            self.update(row.symbol, row.timestamp.to_pydatetime(), row.high, row.low, row.close, row.volume)
+
+
+def make_bar_handler(bank: IndicatorBank, callback=None):
+    """
+    Build an async StockDataStream bar handler which updates bank and, once a
+    symbol's state is ready, awaits callback(symbol, state) if given.
+    """
+    async def bar_data_handler(bar):
+        state = bank.update(bar.symbol, bar.timestamp, bar.high, bar.low, bar.close, bar.volume)
+        if callback is not None and state.ready:
+            await callback(bar.symbol, state)
+
+    return bar_data_handler
@@ -0,0 +1,221 @@
+'''
+SQLite manifest of the data/tickers day files.
+
+One row per (version, symbol, date) holds the paths of the day's data and meta
+files (relative to the tickers directory), their sizes and modification times,
+a SHA-256 checksum of both, the row count and time range of the data file, its
+dogtrader.data_quality flags and the meta file's prev_* fields:
+
+    manifest = TickersManifest()
+    manifest.refresh()  # only new or changed files are read
+    days = manifest.select(['AAPL', 'MSFT'], start, end, clean=True)
+    day_files = manifest.day_files(start=start)
+
+refresh lists the ticker directories and compares each file's size and
+mtime with the manifest, so only files which were added or changed since the
+last refresh are opened; rows of deleted files are removed. select is a single
+query on the (version, symbol, date) primary key or the (version, date)
+index, so loaders pick a subset without touching the small files at all.
+'''
+
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+
+import pandas as pd
+
+from dogtrader import corpus, data_quality
+from dogtrader.paths import TICKERS_DIR, TICKERS_MANIFEST_PATH
+
+TABLE = 'day_files'
+
+COLUMNS = [
+    'version', 'symbol', 'date', 'data_path', 'meta_path',
+    'data_size', 'data_mtime_ns', 'meta_size', 'meta_mtime_ns', 'checksum',
+    'rows', 'first_time', 'last_time', 'flags',
+] + corpus.META_FIELDS
+
+SCHEMA = f'''
+    CREATE TABLE IF NOT EXISTS {TABLE} (
+        version TEXT NOT NULL,
+        symbol TEXT NOT NULL,
+        date TEXT NOT NULL,
+        data_path TEXT NOT NULL,
+        meta_path TEXT NOT NULL,
+        data_size INTEGER NOT NULL,
+        data_mtime_ns INTEGER NOT NULL,
+        meta_size INTEGER NOT NULL,
+        meta_mtime_ns INTEGER NOT NULL,
+        checksum TEXT NOT NULL,
+        rows INTEGER NOT NULL,
+        first_time TEXT,
+        last_time TEXT,
+        flags INTEGER NOT NULL,
+        prev_date TEXT,
+        prev_open REAL,
+        prev_high REAL,
+        prev_low REAL,
+        prev_close REAL,
+        prev_volume INTEGER,
+        prev_vwap REAL,
+        PRIMARY KEY (version, symbol, date)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS {TABLE}_version_date ON {TABLE} (version, date);
+'''
+
+
+def checksum(day_file: corpus.DayFile) -> str:
+    """SHA-256 of the data file followed by the meta file."""
+    digest = hashlib.sha256()
+    for path in (day_file.data_path, day_file.meta_path):
+        with open(path, 'rb') as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+def _time(minute: int):
+    return f'{minute // 60:02d}:{minute % 60:02d}' if minute >= 0 else None
+
+
+def _date(value):
+    return datetime.date.fromisoformat(value) if isinstance(value, str) else None
+
+
+class TickersManifest:
+    """Incrementally refreshed index of the day files in a tickers directory."""
+
+    def __init__(self, path: str = TICKERS_MANIFEST_PATH, tickers_dir: str = TICKERS_DIR):
+        self.path = path
+        self.tickers_dir = tickers_dir
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def scan(self, symbols: list[str] = None, versions: list[str] = None) -> dict[tuple, tuple]:
+        """
+        List the day files of symbols (default: all) without opening them:
+        (version, symbol, date) -> (DayFile, data stat, meta stat), where a
+        stat is (size, mtime_ns). Days missing one of their files are skipped.
+        """
+        found = {}
+        for symbol in symbols or corpus.list_symbols(self.tickers_dir):
+            symbol_dir = os.path.join(self.tickers_dir, symbol)
+            if not os.path.isdir(symbol_dir):
+                continue
+            with os.scandir(symbol_dir) as entries:
+                for entry in entries:
+                    parsed = corpus.parse_day_filename(entry.name)
+                    if parsed is None or parsed[0] != symbol or (versions is not None and parsed[3] not in versions):
+                        continue
+                    _, date, kind, version = parsed
+                    stat = entry.stat()
+                    found.setdefault((version, symbol, date), {})[kind] = (entry.path, (stat.st_size, stat.st_mtime_ns))
+
+        days = {}
+        for (version, symbol, date), kinds in found.items():
+            if 'data' in kinds and 'meta' in kinds:
+                day_file = corpus.DayFile(symbol, date, version, kinds['data'][0], kinds['meta'][0])
+                days[(version, symbol, date)] = (day_file, kinds['data'][1], kinds['meta'][1])
+        return days
+
+    def _stored(self, symbols: list[str] = None, versions: list[str] = None) -> dict[tuple, tuple]:
+        conditions, params = [], []
+        if symbols is not None:
+            conditions.append(f'symbol IN ({", ".join("?" * len(symbols))})')
+            params += symbols
+        if versions is not None:
+            conditions.append(f'version IN ({", ".join("?" * len(versions))})')
+            params += versions
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self.conn.execute(f'SELECT version, symbol, date, data_size, data_mtime_ns, meta_size, meta_mtime_ns FROM {TABLE}{where}', params)
+        return {(version, symbol, datetime.date.fromisoformat(date)): ((data_size, data_mtime), (meta_size, meta_mtime)) for version, symbol, date, data_size, data_mtime, meta_size, meta_mtime in rows}
+
+    def _rows(self, scanned: list[tuple]) -> list[tuple]:
+        # row counts, time ranges and flags of all changed files in one vectorized pass per version
+        rows = []
+        by_version = {}
+        for entry in scanned:
+            by_version.setdefault(entry[0].version, []).append(entry)
+
+        for version, entries in by_version.items():
+            quality = data_quality.check_files([day_file for day_file, _, _ in entries])
+            quality = quality.set_index(['symbol', 'date'])
+
+            for day_file, data_stat, meta_stat in entries:
+                check = quality.loc[(day_file.symbol, day_file.date)]
+                try:
+                    with open(day_file.meta_path) as file:
+                        meta = json.load(file)
+                    prev = [meta.get(field) for field in corpus.META_FIELDS]
+                    if prev[0] is not None:
+                        prev[0] = datetime.datetime.strptime(prev[0], '%Y%m%d').date().isoformat()
+                except (OSError, ValueError):
+                    prev = [None] * len(corpus.META_FIELDS)
+
+                rows.append((
+                    version, day_file.symbol, day_file.date.isoformat(),
+                    os.path.relpath(day_file.data_path, self.tickers_dir), os.path.relpath(day_file.meta_path, self.tickers_dir),
+                    data_stat[0], data_stat[1], meta_stat[0], meta_stat[1], checksum(day_file),
+                    int(check['rows']), _time(int(check['first_minute'])), _time(int(check['last_minute'])), int(check['flags']),
+                    *prev,
+                ))
+        return rows
+
+    def refresh(self, symbols: list[str] = None, versions: list[str] = None) -> dict[str, int]:
+        """
+        Bring the rows of symbols (default: all) up to date with the files,
+        reading only new or changed ones. Returns the number of added,
+        updated, removed and unchanged days.
+        """
+        scanned = self.scan(symbols, versions)
+        stored = self._stored(symbols, versions)
+
+        changed = [entry for key, entry in scanned.items() if stored.get(key) != (entry[1], entry[2])]
+        removed = [key for key in stored if key not in scanned]
+
+        rows = self._rows(changed) if changed else []
+        with self.conn:
+            self.conn.executemany(f'INSERT OR REPLACE INTO {TABLE} ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})', rows)
+            self.conn.executemany(f'DELETE FROM {TABLE} WHERE version = ? AND symbol = ? AND date = ?', [(version, symbol, date.isoformat()) for version, symbol, date in removed])
+
+        added = sum(1 for day_file, _, _ in changed if (day_file.version, day_file.symbol, day_file.date) not in stored)
+        return {'added': added, 'updated': len(changed) - added, 'removed': len(removed), 'unchanged': len(scanned) - len(changed)}
+
+    def select(self, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, version: str = corpus.DEFAULT_VERSION, clean: bool = False) -> pd.DataFrame:
+        """
+        Rows of the days of symbols (default: all) between start and end
+        (inclusive), ordered by symbol and date, with dates as datetime.date
+        and absolute paths. clean keeps only days without data_quality flags.
+        """
+        conditions, params = ['version = ?'], [version]
+        if symbols is not None:
+            conditions.append(f'symbol IN ({", ".join("?" * len(symbols))})')
+            params += list(symbols)
+        if start is not None:
+            conditions.append('date >= ?')
+            params.append(start.isoformat())
+        if end is not None:
+            conditions.append('date <= ?')
+            params.append(end.isoformat())
+        if clean:
+            conditions.append('flags = 0')
+
+        rows = pd.read_sql_query(f'SELECT {", ".join(COLUMNS)} FROM {TABLE} WHERE {" AND ".join(conditions)} ORDER BY symbol, date', self.conn, params=params)
+        rows['date'] = rows['date'].map(datetime.date.fromisoformat)
+        rows['prev_date'] = rows['prev_date'].map(_date)
+        for column in ('data_path', 'meta_path'):
+            rows[column] = [os.path.join(self.tickers_dir, path) for path in rows[column]]
+        return rows
+
+    def day_files(self, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, version: str = corpus.DEFAULT_VERSION, clean: bool = False) -> list[corpus.DayFile]:
+        """DayFiles of select, ordered by symbol and date."""
+        rows = self.select(symbols, start, end, version, clean)
+        return [corpus.DayFile(symbol, date, version, data_path, meta_path) for symbol, date, data_path, meta_path in zip(rows['symbol'], rows['date'], rows['data_path'], rows['meta_path'])]
+
+    def symbols(self, version: str = corpus.DEFAULT_VERSION) -> list[str]:
+        return [symbol for symbol, in self.conn.execute(f'SELECT DISTINCT symbol FROM {TABLE} WHERE version = ? ORDER BY symbol', (version,))]
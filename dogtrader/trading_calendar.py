@@ -0,0 +1,128 @@
+'''
+Precomputed NYSE trading calendar built from properties/market-holidays.json.
+
+The holiday file is read once and every trading session of the covered years
+is precomputed into a sorted list with its UTC open/close and early-close
+flag. Lookups by date are binary searches over date ordinals, so scripts no
+longer need per-day weekend, holiday and DST checks.
+
+Holiday entries with "early-close": false are full closures; entries with
+"early-close": true are sessions which close at 1:00 PM New York time.
+
+Only years with holiday entries are covered (every NYSE year has some, so an
+empty year has simply not been filled in). Dates outside of the covered years
+raise ValueError instead of being treated as weekday sessions; add the next
+year's holidays to the file before it starts.
+'''
+
+import bisect
+import collections
+import datetime
+import functools
+import json
+import zoneinfo
+
+from dogtrader.paths import HOLIDAYS_PATH
+
+NEW_YORK = zoneinfo.ZoneInfo('America/New_York')
+
+OPEN_TIME = datetime.time(9, 30)
+CLOSE_TIME = datetime.time(16, 0)
+EARLY_CLOSE_TIME = datetime.time(13, 0)
+
+# open and close are timezone-aware UTC datetimes
+Session = collections.namedtuple('Session', ['date', 'open', 'close', 'early_close'])
+
+
+def to_utc(date: datetime.date, time: datetime.time) -> datetime.datetime:
+    """Convert a New York wall-clock time on a date to a UTC datetime."""
+    return datetime.datetime.combine(date, time, tzinfo=NEW_YORK).astimezone(datetime.timezone.utc)
+
+
+class TradingCalendar:
+    """Sorted array of trading sessions answering range and neighbour queries in O(log n)."""
+
+    def __init__(self, holidays: dict[str, list]):
+        years = sorted(int(year) for year, entries in holidays.items() if entries)
+        if not years:
+            raise ValueError('holiday calendar has no years with holidays')
+        if years != list(range(years[0], years[-1] + 1)):
+            missing = sorted(set(range(years[0], years[-1] + 1)) - set(years))
+            raise ValueError(f'holiday calendar has no holidays for {", ".join(map(str, missing))}')
+
+        # index holidays by date: True for early closes, False for full closures
+        closures = {}
+        for year, entries in holidays.items():
+            for entry in entries:
+                closures[datetime.date(int(year), entry['month'], entry['day'])] = entry['early-close']
+
+        self.first_date = datetime.date(years[0], 1, 1)
+        self.last_date = datetime.date(years[-1], 12, 31)
+
+        self.sessions = []
+        day = self.first_date
+        while day <= self.last_date:
+            if day.weekday() < 5 and closures.get(day, True):
+                early_close = day in closures
+                close_time = EARLY_CLOSE_TIME if early_close else CLOSE_TIME
+                self.sessions.append(Session(day, to_utc(day, OPEN_TIME), to_utc(day, close_time), early_close))
+            day += datetime.timedelta(days=1)
+
+        self.ordinals = [session.date.toordinal() for session in self.sessions]
+
+    @classmethod
+    def from_file(cls, path: str = HOLIDAYS_PATH) -> 'TradingCalendar':
+        with open(path) as file:
+            return cls(json.load(file))
+
+    def _check_range(self, date: datetime.date):
+        if date < self.first_date or date > self.last_date:
+            raise ValueError(f'{date} is outside of the holiday calendar ({self.first_date} to {self.last_date}), add its year to market-holidays.json')
+
+    def is_session(self, date: datetime.date) -> bool:
+        self._check_range(date)
+        index = bisect.bisect_left(self.ordinals, date.toordinal())
+        return index < len(self.ordinals) and self.ordinals[index] == date.toordinal()
+
+    def session(self, date: datetime.date) -> Session:
+        """Return the session on date, raising KeyError if the market is closed."""
+        self._check_range(date)
+        index = bisect.bisect_left(self.ordinals, date.toordinal())
+        if index == len(self.ordinals) or self.ordinals[index] != date.toordinal():
+            raise KeyError(f'{date} is not a trading session')
+        return self.sessions[index]
+
+    def session_bounds(self, date: datetime.date) -> tuple[datetime.datetime, datetime.datetime]:
+        """Return the UTC (open, close) of the session on date."""
+        session = self.session(date)
+        return session.open, session.close
+
+    def sessions_between(self, start: datetime.date, end: datetime.date) -> list[Session]:
+        """Return the sessions from start to end (inclusive) in date order."""
+        self._check_range(start)
+        self._check_range(end)
+        lo = bisect.bisect_left(self.ordinals, start.toordinal())
+        hi = bisect.bisect_right(self.ordinals, end.toordinal())
+        return self.sessions[lo:hi]
+
+    def previous_session(self, date: datetime.date) -> Session:
+        """Return the last session strictly before date."""
+        self._check_range(date)
+        index = bisect.bisect_left(self.ordinals, date.toordinal())
+        if index == 0:
+            raise KeyError(f'no trading session before {date} in the holiday calendar')
+        return self.sessions[index - 1]
+
+    def next_session(self, date: datetime.date) -> Session:
+        """Return the first session strictly after date."""
+        self._check_range(date)
+        index = bisect.bisect_right(self.ordinals, date.toordinal())
+        if index == len(self.sessions):
+            raise KeyError(f'no trading session after {date} in the holiday calendar')
+        return self.sessions[index]
+
+
+@functools.lru_cache(maxsize=None)
+def load_calendar(path: str = HOLIDAYS_PATH) -> TradingCalendar:
+    """Return the calendar for a holiday file, loading it only once per process."""
+    return TradingCalendar.from_file(path)
@@ -0,0 +1,136 @@
+'''
+Streaming tf.data input pipeline of fixed-length indicator windows with
+next-minute targets.
+
+Days are the unit of streaming: the pipeline starts from a list of day keys
+(data file paths by default), and tf.data interleaves several days at a time,
+loading each one in a worker thread, normalizing it and cutting it into
+sliding windows. Only the days currently being interleaved, the shuffle
+buffer and the prefetched batches are ever in memory, never the full
+multi-ticker history.
+
+Normalization is per day and causal: prices and price-like indicators are
+expressed relative to the open of the day's first bar (9:00 AM), volume is
+log-scaled and RSI is scaled to [0, 1], so no statistic of the rest of the day
+leaks into a window. The meta file's prev_close is not used as the reference,
+since it is the close of the file date itself (see dogtrader.corpus).
+
+Windows never cross days, and the target of a window is the normalized close
+of the minute after its last row.
+'''
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from dogtrader import corpus
+
+# columns fed to the model, in order
+FEATURE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'VWAP', '5SMA', '8SMA', '13SMA', '12EMA', '26EMA', 'MACD', 'MACDS', 'RSI']
+
+# columns normalized as returns relative to the first open
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'VWAP', '5SMA', '8SMA', '13SMA', '12EMA', '26EMA']
+
+# columns normalized as a fraction of the first open (differences of prices)
+SPREAD_COLUMNS = ['MACD', 'MACDS']
+
+DEFAULT_WINDOW = 30
+
+
+def normalize_features(values: np.ndarray, reference) -> np.ndarray:
+    """
+    Normalize raw FEATURE_COLUMNS values (..., features) against the open of
+    the day's first bar (a scalar or an array broadcasting against
+    values[..., 0]), as float32. Shared by training and live inference.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)[..., None]
+    features = np.empty(values.shape, dtype=np.float32)
+
+    for i, column in enumerate(FEATURE_COLUMNS):
+        if column in PRICE_COLUMNS:
+            features[..., i] = values[..., i] / reference[..., 0] - 1
+        elif column in SPREAD_COLUMNS:
+            features[..., i] = values[..., i] / reference[..., 0]
+        elif column == 'volume':
+            features[..., i] = np.log1p(values[..., i])
+        elif column == 'RSI':
+            features[..., i] = values[..., i] / 100
+
+    # RSI is NaN when a stock did not move for 14 minutes
+    return np.nan_to_num(features, nan=0.5)
+
+
+def normalize_day(day: pd.DataFrame) -> np.ndarray:
+    """Return the normalized FEATURE_COLUMNS of a day (read with corpus.read_day) as float32."""
+    values = np.stack([day[column].to_numpy(dtype=np.float64) for column in FEATURE_COLUMNS], axis=1)
+    return normalize_features(values, float(day['open'].iloc[0]))
+
+
+def load_corpus_day(key: bytes) -> np.ndarray:
+    """Load and normalize a day from its data file path (the default day loader)."""
+    return normalize_day(corpus.read_day(corpus.day_file_from_path(key.decode()), with_meta=False))
+
+
+def day_windows(features: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """Cut a normalized day into (windows, targets) with next-minute close targets."""
+    close = features[:, FEATURE_COLUMNS.index('close')]
+    if len(features) <= window:
+        return np.empty((0, window, features.shape[1]), np.float32), np.empty((0,), np.float32)
+
+    # windows ending at row t are paired with the close of row t + 1
+    windows = np.lib.stride_tricks.sliding_window_view(features[:-1], window, axis=0).transpose(0, 2, 1)
+    return np.ascontiguousarray(windows), close[window:].copy()
+
+
+def make_dataset(day_keys: list[str], window: int = DEFAULT_WINDOW, batch_size: int = 256, load_day=load_corpus_day, shuffle_buffer: int = 10000, cycle_length: int = 4, seed: int = None) -> tf.data.Dataset:
+    """
+    Build a dataset of (window, target) batches streamed from day_keys.
+
+    load_day(key: bytes) must return a normalized (rows, len(FEATURE_COLUMNS))
+    float32 array; the default reads data/tickers files, keyed by data file
+    path. Set shuffle_buffer to 0 for evaluation datasets. Raises ValueError
+    if day_keys is empty.
+    """
+    if not len(day_keys):
+        raise ValueError('no days to build the dataset from')
+
+    feature_count = len(FEATURE_COLUMNS)
+
+    def load_windows(key):
+        return day_windows(load_day(key), window)
+
+    def day_dataset(key):
+        windows, targets = tf.numpy_function(load_windows, [key], [tf.float32, tf.float32])
+        windows.set_shape([None, window, feature_count])
+        targets.set_shape([None])
+        return tf.data.Dataset.from_tensor_slices((windows, targets))
+
+    dataset = tf.data.Dataset.from_tensor_slices(list(day_keys))
+    if shuffle_buffer:
+        dataset = dataset.shuffle(len(day_keys), seed=seed)
+
+    # load several days concurrently and mix their windows
+    dataset = dataset.interleave(day_dataset, cycle_length=cycle_length, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not shuffle_buffer)
+
+    if shuffle_buffer:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed)
+
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def corpus_day_keys(symbols: list[str] = None, start=None, end=None, version: str = corpus.DEFAULT_VERSION, manifest=None) -> list[str]:
+    """
+    List data file paths of the corpus for symbols (default all) between start
+    and end dates (inclusive), from a dogtrader.tickers_manifest.TickersManifest
+    if one is given.
+    """
+    if manifest is not None:
+        return list(manifest.select(symbols, start, end, version)['data_path'])
+
+    keys = []
+    for symbol in symbols or corpus.list_symbols():
+        for day_file in corpus.list_day_files(symbol, version=version):
+            if (start is None or day_file.date >= start) and (end is None or day_file.date <= end):
+                keys.append(day_file.data_path)
+    return keys
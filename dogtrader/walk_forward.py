@@ -0,0 +1,317 @@
+'''
+Walk-forward retraining of the next-minute close model on an incrementally
+built feature store.
+
+Each night only the sessions after the last one in the store are ingested,
+from the data/tickers files (through a TickersManifest) or from bars_minute
+(one session per query, indicators computed with dogtrader.indicators). A
+session is stored once as the normalized minute grid of all its tickers, in
+the layout of dogtrader.joint_tensor:
+
+    data/store/walk-forward/features/20230802.npz  # tickers, features, mask
+    data/store/walk-forward/checkpoints/20230802.keras
+    data/store/walk-forward/metrics.csv
+    data/store/walk-forward/state.json  # window, trained_through, checkpoint
+
+The model is then warm-started from the checkpoint trained through the
+previous session and trained only on the new sessions (plus a few replayed
+ones), step_days at a time, so the nightly cost grows with the new data and
+not with the history. Every new session is also an out-of-sample fold: the
+checkpoint from before it is evaluated on it (with the persistence forecast,
+the last close of the window, as a baseline). Folds run in worker processes
+while the next step trains. On the first run, the model is trained from
+scratch on all but the last initial_folds sessions, which are walked forward.
+
+    pipeline = WalkForward()
+    ingest_files(pipeline.store, manifest)
+    metrics = pipeline.retrain()
+'''
+
+import concurrent.futures
+import datetime
+import io
+import json
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+from dogtrader import bars_query, corpus, indicators, joint_tensor, training_dataset, trading_calendar
+from dogtrader.paths import WALK_FORWARD_DIR
+
+DEFAULT_EPOCHS = 2
+DEFAULT_INITIAL_EPOCHS = 5
+DEFAULT_STEP_DAYS = 1
+DEFAULT_REPLAY_DAYS = 5
+DEFAULT_INITIAL_FOLDS = 5
+DEFAULT_KEEP_CHECKPOINTS = 5
+DEFAULT_WORKERS = 2
+DEFAULT_BATCH_SIZE = 256
+
+STATE_FILE = 'state.json'
+METRICS_FILE = 'metrics.csv'
+
+METRICS_COLUMNS = ['session', 'checkpoint', 'windows', 'mse', 'mae', 'baseline_mse', 'baseline_mae']
+
+_CLOSE = training_dataset.FEATURE_COLUMNS.index('close')
+
+
+#------------------------------------------------------------------------------
+# Feature store
+#------------------------------------------------------------------------------
+
+class FeatureStore:
+    """One .npz file of the gridded, normalized features per session."""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    def session_path(self, date: datetime.date) -> str:
+        return os.path.join(self.path, f'{date:%Y%m%d}.npz')
+
+    def sessions(self) -> list[datetime.date]:
+        return sorted(datetime.datetime.strptime(name[:-4], '%Y%m%d').date() for name in os.listdir(self.path) if name.endswith('.npz'))
+
+    def last_session(self):
+        sessions = self.sessions()
+        return sessions[-1] if sessions else None
+
+    def write(self, date: datetime.date, tickers: list[str], features: np.ndarray, mask: np.ndarray):
+        """Store a session's (minutes, tickers, features) values and (minutes, tickers) mask."""
+        buffer = io.BytesIO()
+        np.savez(buffer, tickers=np.array(tickers), features=features, mask=mask)
+        path = self.session_path(date)
+        with open(path + '.tmp', 'wb') as file:
+            file.write(buffer.getbuffer())
+        os.replace(path + '.tmp', path)
+
+    def read(self, date: datetime.date) -> tuple[list[str], np.ndarray, np.ndarray]:
+        with np.load(self.session_path(date)) as session:
+            return [str(ticker) for ticker in session['tickers']], session['features'], session['mask']
+
+
+def _write_session(store: FeatureStore, date: datetime.date, series: dict) -> bool:
+    # series: symbol -> (minutes after midnight, normalized features)
+    if not series:
+        return False
+    tickers = sorted(series)
+    features, mask = joint_tensor.grid_day(((i, *series[ticker]) for i, ticker in enumerate(tickers)), len(tickers))
+    store.write(date, tickers, features, mask)
+    return True
+
+
+def ingest_files(store: FeatureStore, manifest, symbols: list[str] = None, end: datetime.date = None, version: str = corpus.DEFAULT_VERSION, clean: bool = False) -> list[datetime.date]:
+    """
+    Add the sessions of a refreshed TickersManifest after the store's last
+    one (through end, if given). Returns the ingested dates.
+    """
+    last = store.last_session()
+    rows = manifest.select(symbols, last + datetime.timedelta(days=1) if last else None, end, version, clean)
+
+    ingested = []
+    for date, day_rows in rows.groupby('date', sort=True):
+        series = {}
+        for symbol, data_path, meta_path in zip(day_rows['symbol'], day_rows['data_path'], day_rows['meta_path']):
+            day = corpus.read_day(corpus.DayFile(symbol, date, version, data_path, meta_path), with_meta=False)
+            series[symbol] = ((day['timestamp'].dt.hour * 60 + day['timestamp'].dt.minute).to_numpy(), training_dataset.normalize_day(day))
+        if _write_session(store, date, series):
+            ingested.append(date)
+    return ingested
+
+
+def ingest_db(conn, store: FeatureStore, symbols: list[str] = None, start: datetime.date = None, end: datetime.date = None, calendar: trading_calendar.TradingCalendar = None) -> list[datetime.date]:
+    """
+    Add the sessions in bars_minute after the store's last one (or from
+    start, for an empty store) through end (default: yesterday), querying one
+    session at a time. Dates outside of the holiday calendar are left out with
+    a warning. Returns the ingested dates.
+    """
+    calendar = calendar or trading_calendar.load_calendar()
+    last = store.last_session()
+    first = last + datetime.timedelta(days=1) if last else start
+    if first is None:
+        raise ValueError('start is required for an empty feature store')
+    end = end or datetime.datetime.now(trading_calendar.NEW_YORK).date() - datetime.timedelta(days=1)
+
+    # sessions are only known within the holiday calendar
+    if end > calendar.last_date:
+        print(f'[ WARN ] The holiday calendar ends on {calendar.last_date}, ingesting through it instead of {end}')
+        end = calendar.last_date
+    if first < calendar.first_date:
+        print(f'[ WARN ] The holiday calendar starts on {calendar.first_date}, ingesting from it instead of {first}')
+        first = calendar.first_date
+
+    ingested = []
+    for session in calendar.sessions_between(first, end) if first <= end else []:
+        date = session.date
+        chunks = list(bars_query.iter_bars(conn, symbols, trading_calendar.to_utc(date, datetime.time(6, 0)), trading_calendar.to_utc(date, datetime.time(16, 1))))
+        if not chunks:
+            continue
+        bars = pd.concat(chunks, ignore_index=True)
+        bars['timestamp'] = pd.to_datetime(bars['timestamp'], utc=True)
+
+        series = {}
+        for symbol, rows in indicators.compute_frame(bars).groupby('symbol', sort=True):
+            minutes = np.array([int(time[:2]) * 60 + int(time[3:]) for time in rows['time']])
+            values = rows[training_dataset.FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+            series[symbol] = (minutes, training_dataset.normalize_features(values, values[0, training_dataset.FEATURE_COLUMNS.index('open')]))
+        if _write_session(store, date, series):
+            ingested.append(date)
+    return ingested
+
+
+def session_windows(features: np.ndarray, mask: np.ndarray, window: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Single-ticker (windows, next-minute close targets) of a stored session,
+    from every ticker's runs of real rows (forward-filled minutes are never
+    part of a window or a target).
+    """
+    minutes = len(mask)
+    if minutes <= window:
+        return np.empty((0, window, features.shape[2]), np.float32), np.empty((0,), np.float32)
+
+    gaps = np.concatenate([np.zeros((1, mask.shape[1]), dtype=np.int64), np.cumsum(~mask, axis=0)])
+    ends = np.arange(window, minutes)
+    valid = (gaps[ends + 1] - gaps[ends - window]) == 0
+    end_index, tickers = np.nonzero(valid)
+    ends = ends[end_index]
+
+    rows = ends[:, None] + np.arange(-window, 0)[None, :]
+    return features[rows, tickers[:, None]], features[ends, tickers, _CLOSE]
+
+
+def load_windows(store: FeatureStore, sessions: list[datetime.date], window: int) -> tuple[np.ndarray, np.ndarray]:
+    pairs = [session_windows(*store.read(date)[1:], window) for date in sessions]
+    if not pairs:
+        return np.empty((0, window, len(training_dataset.FEATURE_COLUMNS)), np.float32), np.empty((0,), np.float32)
+    return np.concatenate([windows for windows, _ in pairs]), np.concatenate([targets for _, targets in pairs])
+
+
+#------------------------------------------------------------------------------
+# Training and evaluation
+#------------------------------------------------------------------------------
+
+def build_model(window: int) -> tf.keras.Model:
+    """The train-next-minute.py model."""
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(window, len(training_dataset.FEATURE_COLUMNS))),
+        tf.keras.layers.LSTM(32),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+    return model
+
+
+def evaluate_fold(store_path: str, checkpoint_path: str, session: datetime.date, window: int) -> dict:
+    """Out-of-sample metrics of a checkpoint on a later session (run in a worker process)."""
+    windows, targets = load_windows(FeatureStore(store_path), [session], window)
+    metrics = {'session': session, 'checkpoint': os.path.basename(checkpoint_path), 'windows': len(targets)}
+    if not len(targets):
+        return metrics | {column: np.nan for column in METRICS_COLUMNS[3:]}
+
+    model = tf.keras.models.load_model(checkpoint_path, compile=False)
+    errors = model.predict(windows, batch_size=4096, verbose=0)[:, 0] - targets
+    baseline = windows[:, -1, _CLOSE] - targets
+    return metrics | {
+        'mse': float(np.mean(errors**2)),
+        'mae': float(np.mean(np.abs(errors))),
+        'baseline_mse': float(np.mean(baseline**2)),
+        'baseline_mae': float(np.mean(np.abs(baseline))),
+    }
+
+
+class WalkForward:
+    """Checkpoints, state and fold metrics of a walk-forward run over a FeatureStore."""
+
+    def __init__(self, path: str = WALK_FORWARD_DIR):
+        self.path = path
+        self.store = FeatureStore(os.path.join(path, 'features'))
+        self.checkpoints_dir = os.path.join(path, 'checkpoints')
+        os.makedirs(self.checkpoints_dir, exist_ok=True)
+
+        try:
+            with open(os.path.join(path, STATE_FILE)) as file:
+                self.state = json.load(file)
+        except FileNotFoundError:
+            self.state = {'window': None, 'trained_through': None, 'checkpoint': None}
+
+    def _save_state(self):
+        with open(os.path.join(self.path, STATE_FILE + '.tmp'), 'w') as file:
+            json.dump(self.state, file)
+        os.replace(os.path.join(self.path, STATE_FILE + '.tmp'), os.path.join(self.path, STATE_FILE))
+
+    @property
+    def trained_through(self):
+        value = self.state['trained_through']
+        return datetime.date.fromisoformat(value) if value else None
+
+    @property
+    def checkpoint(self):
+        return os.path.join(self.path, self.state['checkpoint']) if self.state['checkpoint'] else None
+
+    def checkpoint_path(self, date: datetime.date) -> str:
+        return os.path.join(self.checkpoints_dir, f'{date:%Y%m%d}.keras')
+
+    def _train(self, model: tf.keras.Model, sessions: list[datetime.date], epochs: int, batch_size: int, through: datetime.date) -> str:
+        windows, targets = load_windows(self.store, sessions, self.state['window'])
+        if len(targets):
+            model.fit(windows, targets, epochs=epochs, batch_size=batch_size, shuffle=True, verbose=0)
+        path = self.checkpoint_path(through)
+        model.save(path)
+        self.state['trained_through'] = through.isoformat()
+        self.state['checkpoint'] = os.path.relpath(path, self.path)
+        self._save_state()
+        return path
+
+    def read_metrics(self) -> pd.DataFrame:
+        path = os.path.join(self.path, METRICS_FILE)
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=METRICS_COLUMNS)
+        return pd.read_csv(path, parse_dates=['session'])
+
+    def retrain(self, window: int = training_dataset.DEFAULT_WINDOW, epochs: int = DEFAULT_EPOCHS, initial_epochs: int = DEFAULT_INITIAL_EPOCHS, step_days: int = DEFAULT_STEP_DAYS, replay_days: int = DEFAULT_REPLAY_DAYS, initial_folds: int = DEFAULT_INITIAL_FOLDS, batch_size: int = DEFAULT_BATCH_SIZE, workers: int = DEFAULT_WORKERS, keep_checkpoints: int = DEFAULT_KEEP_CHECKPOINTS) -> pd.DataFrame:
+        """
+        Walk the model forward over the stored sessions after trained_through
+        and return the metrics of their folds (also appended to metrics.csv).
+        """
+        if self.state['window'] not in (None, window):
+            raise ValueError(f'the run was trained with {self.state["window"]} minute windows, not {window}')
+        self.state['window'] = window
+
+        sessions = self.store.sessions()
+        through = self.trained_through
+        new = [date for date in sessions if through is None or date > through]
+        if not new:
+            return pd.DataFrame(columns=METRICS_COLUMNS)
+
+        if self.checkpoint is None:
+            # first run: train from scratch on the history before the held-out folds
+            initial, new = new[:max(1, len(new) - initial_folds)], new[max(1, len(new) - initial_folds):]
+            self._train(build_model(window), initial, initial_epochs, batch_size, initial[-1])
+
+        model = tf.keras.models.load_model(self.checkpoint)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = []
+            for i in range(0, len(new), step_days):
+                step = new[i:i + step_days]
+
+                # the checkpoint from before the step is out of sample on all of its sessions
+                for session in step:
+                    futures.append(executor.submit(evaluate_fold, self.store.path, self.checkpoint, session, window))
+
+                replay = [date for date in sessions if date < step[0]][-replay_days:] if replay_days else []
+                self._train(model, replay + step, epochs, batch_size, step[-1])
+
+            metrics = pd.DataFrame([future.result() for future in futures], columns=METRICS_COLUMNS)
+
+        path = os.path.join(self.path, METRICS_FILE)
+        metrics.to_csv(path, mode='a', header=not os.path.exists(path), index=False)
+
+        # folds are done with the older checkpoints
+        for name in sorted(os.listdir(self.checkpoints_dir))[:-keep_checkpoints]:
+            os.remove(os.path.join(self.checkpoints_dir, name))
+
+        return metrics
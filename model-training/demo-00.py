@@ -8,7 +8,11 @@ import numpy as np
 import pandas as pd
 import seaborn as sns
 import tensorflow as tf
-from sqlalchemy import create_engine, sql
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import bars_query
 
 mpl.rcParams['figure.figsize'] = (8, 6)
 mpl.rcParams['axes.grid'] = False
@@ -47,7 +51,9 @@ def main() -> int:
     # Pull data from db
     #------------------------------------------------------------------------------
 
-    stock_bars_minute_df = pd.read_sql_query(sql=sql.text(f'select * from { PG_TABLE } where SYMBOL=\'NVDA\''), con=conn)
+    # stream only the plotted columns in chunks on a server-side cursor
+    chunks = bars_query.iter_bars(conn, symbols=['NVDA'], columns=['timestamp', 'close', 'volume'], table=PG_TABLE)
+    stock_bars_minute_df = pd.concat(chunks, ignore_index=True)
     print('[ INFO ] Data from database:')
     print(stock_bars_minute_df)
 
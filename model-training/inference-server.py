@@ -0,0 +1,160 @@
+'''
+Description:
+This script serves next-minute close predictions of every ticker in a market
+state block: the model is loaded once and all tickers are predicted in a
+single batched forward pass per minute through dogtrader.inference.
+
+Usage:
+$ python inference-server.py [-m/--model next-minute.keras] [-n/--name dogtrader-market-state] [--backend tflite|keras] [--no-quantize] [--threads 1] [--max-wait 0.5] [-s/--status 60] [-v/--verbose]
+$ python inference-server.py --benchmark 500 [--minutes 60] [--backend tflite|keras] [--no-quantize]
+
+Details:
+Start data/tools/market-data-service.py with the tickers first (before 9:00 AM,
+so each ticker's windows are normalized against its 9:00 AM open as in
+training). The model is saved by train-next-minute.py; the tflite backend
+exports it to a dynamic-range quantized TensorFlow Lite file next to it on
+first use. Every minute the batch latency and the time since the bar close
+are logged, and with --verbose every ready prediction.
+
+With --benchmark N, no market state is needed: N synthetic tickers are fed
+random minute bars and the per-batch latency histograms are printed.
+'''
+
+import argparse
+import asyncio
+import datetime
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import inference, market_state, training_dataset
+from dogtrader.paths import MODELS_DIR
+from dogtrader.trading_calendar import NEW_YORK
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'inference-server.py',
+        description = 'This script serves batched next-minute close predictions of all tickers in a market state block.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-m', '--model', dest='model', action='store', default=os.path.join(MODELS_DIR, 'next-minute.keras'), help='Path of the saved Keras model.')
+    parser.add_argument('-n', '--name', dest='name', action='store', default=market_state.DEFAULT_NAME, help='Name of the shared memory block.')
+    parser.add_argument('--backend', dest='backend', action='store', choices=['tflite', 'keras'], default='tflite', help='Inference backend.')
+    parser.add_argument('--no-quantize', dest='quantize', action='store_false', help='Export the TFLite model without quantization.')
+    parser.add_argument('--threads', dest='threads', action='store', type=int, default=None, help='TFLite interpreter threads (default: TFLite decides).')
+    parser.add_argument('--max-wait', dest='max_wait', action='store', type=float, default=inference.DEFAULT_MAX_WAIT, help='Seconds to wait for the last bars of a minute.')
+    parser.add_argument('-s', '--status', dest='status', action='store', type=float, default=60, help='Seconds between latency summaries.')
+    parser.add_argument('-v', '--verbose', dest='verbose', action='store_true', help='Print every prediction.')
+    parser.add_argument('--benchmark', dest='benchmark', action='store', type=int, default=None, help='Benchmark with this many synthetic tickers instead of serving.')
+    parser.add_argument('--minutes', dest='minutes', action='store', type=int, default=60, help='Minutes to benchmark.')
+
+    args = parser.parse_args()
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    if not os.path.exists(args.model):
+        print(f'[ ERROR ] Model {args.model} not found (train it with train-next-minute.py).')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+
+    reader = None
+    if args.benchmark is not None:
+        symbols = [f'SYM{i}' for i in range(args.benchmark)]
+    else:
+        try:
+            reader = market_state.MarketStateReader(args.name)
+        except FileNotFoundError:
+            print(f'[ ERROR ] Shared memory block {args.name} not found (is the market-data service running?).')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+        symbols = reader.symbols
+
+    # the model is loaded (and exported) once, for a batch of every symbol
+    if args.backend == 'tflite':
+        predictor = inference.TFLitePredictor(args.model, len(symbols), args.quantize, args.threads)
+        print(f'[ INFO ] Loaded {predictor.path}')
+    else:
+        predictor = inference.KerasPredictor(args.model, len(symbols))
+        print(f'[ INFO ] Loaded {args.model}')
+
+    server = inference.InferenceServer(predictor, symbols)
+
+    #--------------------------------------------------------------------------
+    # Benchmark
+    #--------------------------------------------------------------------------
+
+    if args.benchmark is not None:
+        rng = np.random.default_rng(0)
+        rows = np.zeros(len(symbols), dtype=market_state.STATE_DTYPE)
+        close = rng.uniform(20, 500, len(symbols))
+        start = datetime.datetime.combine(datetime.date.today(), datetime.time(9, 0), NEW_YORK)
+
+        for minute in range(args.minutes):
+            previous = close
+            close = previous * np.exp(rng.normal(0, 0.001, len(symbols)))
+            for column in training_dataset.FEATURE_COLUMNS:
+                rows[column] = close
+            rows['open'] = previous
+            rows['high'] = np.maximum(previous, close)
+            rows['low'] = np.minimum(previous, close)
+            rows['volume'] = rng.integers(0, 10000, len(symbols))
+            rows['MACD'] = rows['MACDS'] = 0
+            rows['RSI'] = 50
+            rows['bar_time'] = int((start + datetime.timedelta(minutes=minute)).timestamp()) * 10**9
+            predictions = server.predict_minute(int(rows['bar_time'][0]), rows)
+
+        print(f'[ INFO ] {len(symbols)} ticker(s), {args.minutes} batch(es), {int(predictions.ready.sum())} ready in the last')
+        for line in server.summary()[:3]:
+            print(f'[ INFO ] latency {line}')
+
+        print('[ INFO ] Exiting normally with code 0.')
+        return 0
+
+    #--------------------------------------------------------------------------
+    # Serve predictions
+    #--------------------------------------------------------------------------
+
+    async def handle_predictions(predictions):
+        minute = datetime.datetime.fromtimestamp(predictions.minute / 1e9, NEW_YORK)
+        print(f'[ INFO ] {minute:%H:%M} {int(predictions.ready.sum())}/{len(predictions.symbols)} ticker(s) predicted in {predictions.latency_ns / 1e6:.2f}ms')
+        if args.verbose:
+            for symbol, close in zip(predictions.symbols, predictions.close):
+                if not np.isnan(close):
+                    print(f'{symbol:<8}{close:.3f}')
+
+    async def log_status():
+        while True:
+            await asyncio.sleep(args.status)
+            for line in server.summary():
+                print(f'[ INFO ] latency {line}')
+
+    async def serve():
+        await asyncio.gather(server.run(reader, handle_predictions, max_wait=args.max_wait), log_status())
+
+    print(f'[ INFO ] Serving predictions of {len(symbols)} ticker(s) from shared memory block {args.name}')
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.close()
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,104 @@
+'''
+Description:
+This script trains a next-minute close model for several tickers at once on
+cross-sectional windows of the data/tickers indicator columns, sliced from the
+memory-mapped joint tensor of dogtrader.joint_tensor.
+
+Usage:
+$ python train-cross-section.py [-t/--tickers AAPL,MSFT] -s/--split 20230601 [-w/--window 30] [-n/--epochs 5] [-c/--clean] [-r/--rebuild]
+
+Details:
+The tensor is built under data/store/tensors on the first run and reopened on
+later runs as long as the selected day files are unchanged. Only windows in
+which every ticker has real (not forward-filled) rows are used. Days before
+the split date are used for training and days on or after it for validation.
+'''
+
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import joint_tensor, training_dataset
+from dogtrader.tickers_manifest import TickersManifest
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'train-cross-section.py',
+        description = 'This script trains a next-minute close model on cross-sectional windows of several tickers.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-s', '--split', dest='split', action='store', required=True, help='First validation date in YYYYMMDD format.')
+    parser.add_argument('-w', '--window', dest='window', action='store', type=int, default=training_dataset.DEFAULT_WINDOW, help='Minutes per input window.')
+    parser.add_argument('-n', '--epochs', dest='epochs', action='store', type=int, default=5, help='Number of training epochs.')
+    parser.add_argument('-b', '--batch-size', dest='batch_size', action='store', type=int, default=256, help='Windows per batch.')
+    parser.add_argument('-c', '--clean', dest='clean', action='store_true', help='Only use days without data quality flags.')
+    parser.add_argument('-r', '--rebuild', dest='rebuild', action='store_true', help='Rebuild the joint tensor even if it is up to date.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    split = datetime.datetime.strptime(args.split, '%Y%m%d').date()
+
+    #--------------------------------------------------------------------------
+    # Build joint tensor
+    #--------------------------------------------------------------------------
+
+    # only new or changed day files are read to update the manifest
+    manifest = TickersManifest()
+    manifest.refresh(tickers)
+
+    started = time.perf_counter()
+    tensor = joint_tensor.build(manifest, tickers, clean=args.clean, force=args.rebuild)
+    manifest.close()
+    print(f'[ INFO ] Joint tensor {tensor.features.shape} of {",".join(tensor.tickers)} ready in {time.perf_counter() - started:.2f}s at {tensor.path}')
+
+    positions = joint_tensor.window_positions(tensor, args.window)
+    first_validation_day = np.searchsorted(np.array(tensor.dates), split)
+    train_positions = positions[positions[:, 0] < first_validation_day]
+    validation_positions = positions[positions[:, 0] >= first_validation_day]
+    print(f'[ INFO ] Training on {len(train_positions)} window(s), validating on {len(validation_positions)} window(s).')
+
+    shape = (args.window, len(tensor.tickers), len(tensor.feature_columns))
+    signature = (
+        tf.TensorSpec(shape=(None, *shape), dtype=tf.float32),
+        tf.TensorSpec(shape=(None, len(tensor.tickers)), dtype=tf.float32),
+    )
+
+    train = tf.data.Dataset.from_generator(lambda: joint_tensor.batches(tensor, train_positions, args.window, args.batch_size, shuffle=True), output_signature=signature).prefetch(tf.data.AUTOTUNE)
+    validation = tf.data.Dataset.from_generator(lambda: joint_tensor.batches(tensor, validation_positions, args.window, args.batch_size), output_signature=signature).prefetch(tf.data.AUTOTUNE)
+
+    #--------------------------------------------------------------------------
+    # Train model
+    #--------------------------------------------------------------------------
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=shape),
+        tf.keras.layers.Reshape((args.window, shape[1] * shape[2])),
+        tf.keras.layers.LSTM(64),
+        tf.keras.layers.Dense(len(tensor.tickers)),
+    ])
+    model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+    model.fit(train, validation_data=validation, epochs=args.epochs)
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
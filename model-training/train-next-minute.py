@@ -0,0 +1,97 @@
+'''
+Description:
+This script trains a small next-minute close model on sliding windows of the
+data/tickers indicator columns, streamed through dogtrader.training_dataset.
+
+Usage:
+$ python train-next-minute.py [-t/--tickers AAPL,MSFT] -s/--split 20230601 [-w/--window 30] [-n/--epochs 5] [-o/--output next-minute.keras]
+
+Details:
+Days before the split date are used for training and days on or after it for
+validation. Days are streamed and windowed by tf.data, so memory use does not
+grow with the number of tickers or days. The trained model is saved to
+data/store/models for model-training/inference-server.py.
+'''
+
+import argparse
+import datetime
+import os
+import sys
+
+import tensorflow as tf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import training_dataset
+from dogtrader.paths import MODELS_DIR
+from dogtrader.tickers_manifest import TickersManifest
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'train-next-minute.py',
+        description = 'This script trains a next-minute close model on windows of the data/tickers indicator columns.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('-s', '--split', dest='split', action='store', required=True, help='First validation date in YYYYMMDD format.')
+    parser.add_argument('-w', '--window', dest='window', action='store', type=int, default=training_dataset.DEFAULT_WINDOW, help='Minutes per input window.')
+    parser.add_argument('-n', '--epochs', dest='epochs', action='store', type=int, default=5, help='Number of training epochs.')
+    parser.add_argument('-b', '--batch-size', dest='batch_size', action='store', type=int, default=256, help='Windows per batch.')
+    parser.add_argument('-o', '--output', dest='output', action='store', default=os.path.join(MODELS_DIR, 'next-minute.keras'), help='Path to save the trained model to.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    split = datetime.datetime.strptime(args.split, '%Y%m%d').date()
+
+    #--------------------------------------------------------------------------
+    # Build datasets
+    #--------------------------------------------------------------------------
+
+    # only new or changed day files are read to update the manifest
+    manifest = TickersManifest()
+    manifest.refresh(tickers)
+
+    train_keys = training_dataset.corpus_day_keys(tickers, end=split - datetime.timedelta(days=1), manifest=manifest)
+    validation_keys = training_dataset.corpus_day_keys(tickers, start=split, manifest=manifest)
+    manifest.close()
+    print(f'[ INFO ] Training on {len(train_keys)} day(s), validating on {len(validation_keys)} day(s).')
+
+    if not train_keys or not validation_keys:
+        print(f'[ ERROR ] No {"training" if not train_keys else "validation"} days with split date {split}.')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+
+    train = training_dataset.make_dataset(train_keys, window=args.window, batch_size=args.batch_size)
+    validation = training_dataset.make_dataset(validation_keys, window=args.window, batch_size=args.batch_size, shuffle_buffer=0)
+
+    #--------------------------------------------------------------------------
+    # Train model
+    #--------------------------------------------------------------------------
+
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(args.window, len(training_dataset.FEATURE_COLUMNS))),
+        tf.keras.layers.LSTM(32),
+        tf.keras.layers.Dense(1),
+    ])
+    model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+    model.fit(train, validation_data=validation, epochs=args.epochs)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    model.save(args.output)
+    print(f'[ INFO ] Model saved to {args.output}')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,143 @@
+'''
+Description:
+This script is the nightly retraining job of the next-minute close model: it
+ingests only the sessions since its last run into the walk-forward feature
+store, evaluates the previous checkpoint on each of them and warm-starts the
+model on them through dogtrader.walk_forward.
+
+Usage:
+$ python walk-forward.py [-t/--tickers AAPL,MSFT] [--source files|db] [-s/--start 20230103] [-e/--end 20230802] [-w/--window 30] [-n/--epochs 2] [--initial-epochs 5] [--step-days 1] [--replay-days 5] [--folds 5] [-j/--workers 2] [-o/--output next-minute.keras]
+
+Required Environment Variables:
+PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, PG_PASSWORD (--source db only)
+
+Details:
+The feature store, checkpoints and fold metrics are kept in
+data/store/walk-forward. With --source db, --start is required on the first
+run and sessions through yesterday are read from bars_minute one at a time.
+The first run trains from scratch on all but the last --folds sessions, which
+are then walked forward. Folds are evaluated in --workers processes while the
+model trains. The latest checkpoint is copied to --output for
+inference-server.py.
+'''
+
+import argparse
+import datetime
+import os
+import shutil
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import training_dataset, walk_forward
+from dogtrader.paths import MODELS_DIR
+from dogtrader.tickers_manifest import TickersManifest
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'walk-forward.py',
+        description = 'This script incrementally retrains and evaluates the next-minute close model.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default=None, help='Comma separated list of ticker symbol(s) (default: all tickers).')
+    parser.add_argument('--source', dest='source', action='store', choices=['files', 'db'], default='files', help='Ingest from the data/tickers files or the bars_minute table.')
+    parser.add_argument('-s', '--start', dest='start', action='store', default=None, help='First session in YYYYMMDD format for an empty feature store (--source db).')
+    parser.add_argument('-e', '--end', dest='end', action='store', default=None, help='Last session to ingest in YYYYMMDD format (default: latest, or yesterday with --source db).')
+    parser.add_argument('-w', '--window', dest='window', action='store', type=int, default=training_dataset.DEFAULT_WINDOW, help='Minutes per input window.')
+    parser.add_argument('-n', '--epochs', dest='epochs', action='store', type=int, default=walk_forward.DEFAULT_EPOCHS, help='Epochs per walk-forward step.')
+    parser.add_argument('--initial-epochs', dest='initial_epochs', action='store', type=int, default=walk_forward.DEFAULT_INITIAL_EPOCHS, help='Epochs of the first training from scratch.')
+    parser.add_argument('--step-days', dest='step_days', action='store', type=int, default=walk_forward.DEFAULT_STEP_DAYS, help='Sessions per walk-forward step.')
+    parser.add_argument('--replay-days', dest='replay_days', action='store', type=int, default=walk_forward.DEFAULT_REPLAY_DAYS, help='Earlier sessions trained on again in each step.')
+    parser.add_argument('--folds', dest='folds', action='store', type=int, default=walk_forward.DEFAULT_INITIAL_FOLDS, help='Sessions walked forward on the first run.')
+    parser.add_argument('-j', '--workers', dest='workers', action='store', type=int, default=walk_forward.DEFAULT_WORKERS, help='Number of fold evaluation processes.')
+    parser.add_argument('-b', '--batch-size', dest='batch_size', action='store', type=int, default=walk_forward.DEFAULT_BATCH_SIZE, help='Windows per batch.')
+    parser.add_argument('-o', '--output', dest='output', action='store', default=os.path.join(MODELS_DIR, 'next-minute.keras'), help='Path to copy the latest model to.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    start = datetime.datetime.strptime(args.start, '%Y%m%d').date() if args.start else None
+    end = datetime.datetime.strptime(args.end, '%Y%m%d').date() if args.end else None
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    conn = None
+    if args.source == 'db':
+        # get postgres environment variables
+        PG_HOST = os.getenv('PG_HOST')
+        PG_PORT = os.getenv('PG_PORT')
+        PG_DB_NAME = os.getenv('PG_DB_NAME')
+        PG_USERNAME = os.getenv('PG_USERNAME')
+        PG_PASSWORD = os.getenv('PG_PASSWORD')
+
+        # check for missing environment variables
+        if PG_HOST == None or PG_PORT == None or PG_DB_NAME == None or PG_USERNAME == None or PG_PASSWORD == None:
+            print('[ ERROR ] Environment variables PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, or PG_PASSWORD not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        conn_string = "postgresql://{}:{}@{}:{}/{}".format(PG_USERNAME, PG_PASSWORD, PG_HOST, PG_PORT, PG_DB_NAME)
+        conn = create_engine(conn_string).connect()
+
+    pipeline = walk_forward.WalkForward()
+
+    #--------------------------------------------------------------------------
+    # Ingest new sessions
+    #--------------------------------------------------------------------------
+
+    started = time.perf_counter()
+    if conn is not None:
+        if pipeline.store.last_session() is None and start is None:
+            print('[ ERROR ] --start is required for the first run with --source db.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+        ingested = walk_forward.ingest_db(conn, pipeline.store, tickers, start, end)
+        conn.close()
+    else:
+        # only new or changed day files are read to update the manifest
+        manifest = TickersManifest()
+        manifest.refresh(tickers)
+        ingested = walk_forward.ingest_files(pipeline.store, manifest, tickers, end)
+        manifest.close()
+    print(f'[ INFO ] Ingested {len(ingested)} new session(s) in {time.perf_counter() - started:.2f}s')
+
+    #--------------------------------------------------------------------------
+    # Walk forward
+    #--------------------------------------------------------------------------
+
+    started = time.perf_counter()
+    try:
+        metrics = pipeline.retrain(args.window, args.epochs, args.initial_epochs, args.step_days, args.replay_days, args.folds, args.batch_size, args.workers)
+    except ValueError as error:
+        print(f'[ ERROR ] {error}')
+        print('[ INFO ] Exiting with code -1.')
+        return -1
+    print(f'[ INFO ] Walked forward over {len(metrics)} session(s) in {time.perf_counter() - started:.2f}s, trained through {pipeline.trained_through}')
+
+    for row in metrics.itertuples(index=False):
+        print(f'{row.session}  windows {row.windows:>6}  mse {row.mse:.3e}  mae {row.mae:.3e}  baseline mse {row.baseline_mse:.3e}  mae {row.baseline_mae:.3e}')
+
+    if pipeline.checkpoint is not None:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        shutil.copyfile(pipeline.checkpoint, args.output)
+        print(f'[ INFO ] Model copied to {args.output}')
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
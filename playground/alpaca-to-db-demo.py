@@ -6,6 +6,7 @@ reads the same bars from the table.
 
 from datetime import datetime, timezone
 import os
+import sys
 
 import pandas as pd
 from alpaca.data import StockHistoricalDataClient
@@ -13,6 +14,10 @@ from alpaca.data.requests import StockBarsRequest
 from alpaca.data.timeframe import TimeFrame
 from sqlalchemy import create_engine, sql
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import bulk_load
+
 #------------------------------------------------------------------------------
 # Environment setup
 #------------------------------------------------------------------------------
@@ -75,8 +80,8 @@ stock_bars_minute = stock_client.get_stock_bars(request_params)
 stock_bars_minute_df = stock_bars_minute.df
 stock_bars_minute_df.reset_index(inplace=True)
 
-# insert rows and commit
-stock_bars_minute_df.to_sql(name='bars_minute', con=conn, if_exists='append', index=False)
+# upsert rows (COPY into staging, then ON CONFLICT merge) without committing
+bulk_load.BulkWriter(conn).write(stock_bars_minute_df, commit=False)
 # conn.commit() # uncomment to commit changes to db
 
 #------------------------------------------------------------------------------
@@ -1,113 +1,112 @@
 '''
-This script should pull earnings dates for a single ticker and then pull post-market prices at 
-different times and export it as a csv so it can be copied into a google sheets for analysis.
+This script pulls earnings dates for a list of tickers and then post-market prices at
+different times and exports them as a single csv so it can be copied into a google sheets for analysis.
 Google sheets: https://docs.google.com/spreadsheets/d/1UxmLRIjj0FW-c8tXj40IWlSjulzNBA1r07jE0qD6QW8/edit?usp=sharing
+
+Usage:
+$ python earnings-post-market.py [-t/--tickers MSFT,AAPL] [-l/--limit 28] [-w/--workers 8] [-o/--output ./earnings/earnings_post_market.csv]
+
+Earnings dates are looked up for all tickers concurrently. The 16:00-19:00 post-market window
+of every earnings date is then fetched once, in one request for every ticker reporting that date
+(see dogtrader/post_market.py), and bars are cached by day in data/cache so re-runs make no requests.
 '''
 __author__ = "Ethan Chang"
 __email__ = "ethanchang34@yahoo.com"
 
+import argparse
 import datetime
-from datetime import timezone
-from typing import List
-import pandas as pd
 import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import yfinance as yf
-from alpaca.data import StockHistoricalDataClient, TimeFrame, StockBarsRequest
+from alpaca.data import StockHistoricalDataClient
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import bar_cache, post_market
+from dogtrader.trading_calendar import NEW_YORK
 
 
-def main():
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
 
-    # declare ticker
-    ticker = "MSFT"
+    parser = argparse.ArgumentParser(
+        prog = 'earnings-post-market.py',
+        description = 'This script exports post-market prices after the earnings releases of a list of tickers.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', default='MSFT', help='Comma separated list of ticker symbol(s).')
+    parser.add_argument('-l', '--limit', dest='limit', action='store', type=int, default=28, help='Number of earnings dates to look up per ticker (includes upcoming ones).')
+    parser.add_argument('-w', '--workers', dest='workers', action='store', type=int, default=post_market.DEFAULT_WORKERS, help='Number of concurrent requests.')
+    parser.add_argument('-o', '--output', dest='output', action='store', default='./earnings/earnings_post_market.csv', help='Output CSV file.')
+
+    args = parser.parse_args()
+    tickers = args.tickers.split(',')
 
     # get Alpaca environment variables
-    API_KEY = os.getenv('APCA_API_KEY_ID')
-    SECRET_KEY = os.getenv('APCA_API_SECRET_KEY')
+    API_KEY = os.getenv('ALPACA_API_KEY_ID')
+    SECRET_KEY = os.getenv('ALPACA_SECRET_KEY')
 
     # check for missing alpaca environment variables
     if API_KEY is None or SECRET_KEY is None:
         print('[ ERROR ] Environment variables ALPACA_API_KEY_ID or ALPACA_SECRET_KEY not found.')
         print('[ INFO ] Exiting...')
-        quit()
-
-    # create Alpaca clients
-    stock_client = StockHistoricalDataClient(API_KEY, SECRET_KEY)
-
-    # create empty dataframe to populate and export as csv at the end
-    data = {
-        'Date': [],
-        '4:00PM': [],
-        '4:01PM': [],
-        '4:05PM': [],
-        '4:30PM': [],
-        '5:00PM': [],
-        '5:30PM': [],
-        '6:00PM': [],
-        '6:30PM': [],
-        '7:00PM': []
-    }
-    earnings_df = pd.DataFrame(data)
-
-
-    # get earnings dates
-    today = datetime.datetime.now(tz=timezone.utc)
-    df = yf.Ticker(ticker)
-    earnings_dates = df.get_earnings_dates(limit=28).index # error when limit=28 cuz of no data on some prices
-
-    # [TOGGLE] Check that earnings are post-market by looking at the time
-    for index, val in enumerate(earnings_dates):
-        print(index, val)
-
-    for date in earnings_dates:
-        # convert Timestamp to datetime and set to 4PM
-        datetime_obj = date.to_pydatetime().replace(hour=16, minute = 0, second = 0)
-
-        # create datetime array of times you want to pull prices
-        time_arr = create_time_arr(datetime_obj)
-        
-        # new_row to be appended to earnings_df dataframe
-        new_row = [None]*10
-
-        # only grab dates in the past
-        if datetime_obj < today:
-            new_row[0] = datetime_obj.date() # [TOGGLE] remove .date() if you want to see time/timezone
-
-            # get stock bar at a specific time
-            for index, time in enumerate(time_arr):
-                request_params = StockBarsRequest(symbol_or_symbols=ticker, start=time, end=time, timeframe=TimeFrame.Minute)
-                try:
-                    price = stock_client.get_stock_bars(request_params)[ticker][0]
-                    new_row[index+1] = price.close
-                except Exception as e:
-                    # print("Error: " + str(e))
-                    print(f"No data found for {ticker} at {time}")                
-
-            # append new_row to earnings_df dataframe
-            earnings_df.loc[len(earnings_df.index)] = new_row
-    
+        return -1
+
+    # create Alpaca clients (bars are cached by day in data/cache, so re-runs make no requests)
+    stock_client = bar_cache.CachedBarsClient(StockHistoricalDataClient(API_KEY, SECRET_KEY))
+
+    #--------------------------------------------------------------------------
+    # Get earnings dates
+    #--------------------------------------------------------------------------
+
+    started = time.perf_counter()
+    today = datetime.datetime.now(NEW_YORK).date()
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        earnings = dict(zip(tickers, executor.map(lambda ticker: earnings_dates(ticker, args.limit, today), tickers)))
+
+    for ticker, dates in earnings.items():
+        print(f'[ INFO ] {ticker}: {len(dates)} past earnings date(s)')
+
+    #--------------------------------------------------------------------------
+    # Get post-market prices
+    #--------------------------------------------------------------------------
+
+    earnings_df = post_market.analyze(stock_client, earnings, args.workers)
+
     print(earnings_df)
+    print(f'[ INFO ] {len(earnings_df)} row(s) in {time.perf_counter() - started:.2f}s')
+    print(f'[ INFO ] {stock_client.requests} bar request(s) sent, {stock_client.hits} cached day(s) used')
+
+    # export dataframe as csv
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    earnings_df.to_csv(args.output, index=False)
+    print(f'[ INFO ] Wrote {args.output}')
 
-    # export datafram as csv to earnings folder
-    earnings_df.to_csv(f"./earnings/{ticker}_earnings.csv")
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
 
+    return 0
 
 
-def create_time_arr(datetime_obj) -> List[datetime.datetime]:
-    """Create an array of datetimes: 4:01PM, 4:05PM, etc."""
-    time_arr = []
-    time_arr.append(datetime_obj)
-    time_arr.append(datetime_obj + datetime.timedelta(minutes=1))
-    time_arr.append(datetime_obj + datetime.timedelta(minutes=5))
-    time_arr.append(datetime_obj + datetime.timedelta(minutes=30))
-    time_arr.append(datetime_obj + datetime.timedelta(hours=1))
-    time_arr.append(datetime_obj + datetime.timedelta(hours=1, minutes=30))
-    time_arr.append(datetime_obj + datetime.timedelta(hours=2))
-    time_arr.append(datetime_obj + datetime.timedelta(hours=2, minutes=30))
-    time_arr.append(datetime_obj + datetime.timedelta(hours=3))
-    return time_arr
+def earnings_dates(ticker: str, limit: int, today: datetime.date) -> list[datetime.date]:
+    """Past earnings dates of ticker, newest first."""
+    try:
+        dates = yf.Ticker(ticker).get_earnings_dates(limit=limit)
+    except Exception as e:
+        print(f'[ ERROR ] No earnings dates found for {ticker}: {e}')
+        return []
+    if dates is None:
+        return []
+    return [date for date in dict.fromkeys(timestamp.date() for timestamp in dates.index) if date < today]
 
 
 if __name__ == '__main__':
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -1,6 +1,12 @@
 import os
+import sys
+
 import psycopg2
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import bars_query
+
 # get environment variables
 PG_HOST = os.getenv('PG_HOST')
 PG_PORT = os.getenv('PG_PORT')
@@ -17,15 +23,9 @@ if PG_HOST == None or PG_PORT == None or PG_DB_NAME == None or PG_USERNAME == No
 # connect to db
 conn = psycopg2.connect("host='{}' port='{}' dbname='{}' user='{}' password='{}'".format(PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, PG_PASSWORD))
 
-# open a cursor to perform database operations
-cur = conn.cursor()
-
-# select all rows from public.bars_minute
-cur.execute("SELECT * FROM public.bars_minute")
-
-# retrieve and print query results
-records = cur.fetchall()
-print(records)
+# select rows from public.bars_minute in chunks on a server-side cursor
+for chunk in bars_query.iter_bars(conn, chunk_size=10000):
+    print(chunk)
 
 # close db connection
 conn = None
\ No newline at end of file
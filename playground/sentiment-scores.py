@@ -0,0 +1,113 @@
+'''
+Description:
+This script gets 0-9 sentiment scores for a list of tickers through
+dogtrader.sentiment, which batches the tickers into as few requests as
+possible, rate-limits them and caches the scores per ticker and hour.
+
+Usage:
+$ python sentiment-scores.py -t/--tickers AAPL,TSLA [--scorer stub|openai] [--model gpt-3.5-turbo] [--rpm 3] [--bucket 60] [--db]
+
+Required Environment Variables:
+OPENAI_API_KEY (--scorer openai only)
+PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, PG_PASSWORD (--db only)
+
+Details:
+Scores are stored in the sentiment_scores table of the PostgreSQL database with
+--db, otherwise in a SQLite file in data/cache. Running again within the same
+bucket reads the stored scores and makes no requests. The stub scorer needs no
+API key and returns deterministic scores.
+'''
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from dogtrader import sentiment
+from dogtrader.paths import CACHE_DIR
+
+def main() -> int:
+    #--------------------------------------------------------------------------
+    # Collect arguments
+    #--------------------------------------------------------------------------
+
+    parser = argparse.ArgumentParser(
+        prog = 'sentiment-scores.py',
+        description = 'This script gets cached 0-9 sentiment scores for a list of tickers.',
+        epilog = 'Made with love at Udon Code Studios ❤️'
+    )
+
+    parser.add_argument('-t', '--tickers', dest='tickers', action='store', required=True, help='Comma separated list of ticker symbol(s).')
+    parser.add_argument('--scorer', dest='scorer', action='store', choices=['stub', 'openai'], default='stub', help='Scorer backend.')
+    parser.add_argument('--model', dest='model', action='store', default='gpt-3.5-turbo', help='Chat model of the openai scorer.')
+    parser.add_argument('--rpm', dest='rpm', action='store', type=float, default=sentiment.DEFAULT_RATE * 60, help='Requests per minute allowed.')
+    parser.add_argument('--bucket', dest='bucket', action='store', type=int, default=sentiment.DEFAULT_BUCKET_MINUTES, help='Minutes a score is valid for.')
+    parser.add_argument('--db', dest='db', action='store_true', help='Cache scores in the PostgreSQL database.')
+
+    args = parser.parse_args()
+
+    tickers = args.tickers.split(',')
+
+    #--------------------------------------------------------------------------
+    # Environment setup
+    #--------------------------------------------------------------------------
+
+    if args.scorer == 'openai':
+        if os.getenv('OPENAI_API_KEY') == None:
+            print('[ ERROR ] Environment variable OPENAI_API_KEY not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+        scorer = sentiment.LLMScorer(args.model)
+    else:
+        scorer = sentiment.StubScorer()
+
+    if args.db:
+        # get postgres environment variables
+        PG_HOST = os.getenv('PG_HOST')
+        PG_PORT = os.getenv('PG_PORT')
+        PG_DB_NAME = os.getenv('PG_DB_NAME')
+        PG_USERNAME = os.getenv('PG_USERNAME')
+        PG_PASSWORD = os.getenv('PG_PASSWORD')
+
+        # check for missing environment variables
+        if PG_HOST == None or PG_PORT == None or PG_DB_NAME == None or PG_USERNAME == None or PG_PASSWORD == None:
+            print('[ ERROR ] Environment variables PG_HOST, PG_PORT, PG_DB_NAME, PG_USERNAME, or PG_PASSWORD not found.')
+            print('[ INFO ] Exiting with code -1.')
+            return -1
+
+        conn_string = "postgresql://{}:{}@{}:{}/{}".format(PG_USERNAME, PG_PASSWORD, PG_HOST, PG_PORT, PG_DB_NAME)
+    else:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        conn_string = f'sqlite:///{os.path.join(CACHE_DIR, "sentiment.sqlite")}'
+
+    conn = create_engine(conn_string).connect()
+    limiter = sentiment.TokenBucket(rate=args.rpm / 60, capacity=max(1, args.rpm / 60 * 10))
+    service = sentiment.SentimentService(scorer, conn, limiter, args.bucket)
+
+    #--------------------------------------------------------------------------
+    # Get scores
+    #--------------------------------------------------------------------------
+
+    started = time.perf_counter()
+    scores = asyncio.run(service.refresh(tickers))
+    print(f'[ INFO ] {len(scores)} score(s) in {time.perf_counter() - started:.2f}s with {service.requested} request(s)')
+    for ticker in tickers:
+        score = scores.get(ticker)
+        print(f'{ticker:<8}{score if score is not None else "-"}')
+
+    conn.close()
+
+    #--------------------------------------------------------------------------
+    # Exit program
+    #--------------------------------------------------------------------------
+
+    print('[ INFO ] Exiting normally with code 0.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())